@@ -13,8 +13,11 @@
     Access to the "score", "prey", and "move" data fields is protected by critical sections. In other words, a mutex must be acquired for all shared resources,
     except for "game_over", for which we use a binary semaphore (i.e. value = 0 if game not over, 1 otherwise).
 
-    *Note that in this redesign, the prey coordinates are tracked within the `Game` class as well.*
-    This is updated with logic in the `Game` class, and read by the `Gui` class to update the Tkinter widgets.
+    *Note that in this redesign, the prey coordinates are tracked within the shared memory as well.*
+    Since the game may hold many prey at once, they are kept as a set, and the `Gui` class only creates or deletes
+    the canvas items of the prey which were added or captured since the last update.
+    The headless `Game` class (see `engine.py`) produces the tasks, the `SharedState` class attached to it as an observer
+    writes them to the shared memory, and the `Gui` class reads them to update the Tkinter widgets.
 
     Note that the `Gui` class read access has been designed to have non-blocking semaphore and blocking mutex acquisition for all data fields.
     If a certain mutex from the dict cannot be acquired (i.e. data being written to when context-switch occurs), it is momentarily skipped in favor of updating the other `Tkinter` widgets.
@@ -22,41 +25,118 @@
     This is done through scheduling an update every 100ms to behave similarly as in the original program design (i.e. with the `Tk.after(...)` method). Since the game has a speed of 150 ms,
     these "full" semaphores eliminate the need to update the widget unless needed.
 
+    By default, the polling is replaced by wakeups : after producing a value, the game thread sets an event, which the Tk main loop
+    checks every WAKEUP_CHECK ms before running the update (i.e. the game thread never calls into Tk, which is not thread-safe
+    and would block it while the gui redraws). Wakeups are coalesced, so a single update runs no matter how many values
+    are produced before the main loop checks. The --poll option (i.e. python alternative.py --poll) restores the polling design,
+    and the latency from each move to the redrawn canvas is printed on exit for comparison.
+
+    The --prey N option places N prey on the board at once.
+
+    The --stats FILE option instruments the game, the locks and the `Gui.update()` method (see `instrumentation.py`),
+    and flushes their timings, the semaphore counts, the lock wait and hold times and the frames dropped to the file every second
+    (as Prometheus text if it ends with .prom).
+
+    The --record FILE option records the game into a replay file (see `replay.py`), and the seed of the game
+    is printed on exit (i.e. to be given back with the --seed N option).
+
+    The --snapshot option (i.e. python alternative.py --snapshot) replaces the locks and semaphores with the `SnapshotState` class.
+    The game thread is then the single writer of an immutable `Frame` (i.e. snake, prey, score, game over and a version counter),
+    which it builds at the end of each tick and publishes by swapping a single reference. The gui reads that reference once per update,
+    so it never takes a lock and never shows a torn state (e.g. a new prey with an old score), and redraws only when the version changed.
+
+    The --fps N option (i.e. python alternative.py --fps 60, which implies --snapshot) decouples the drawing from the ticks :
+    a render loop runs N times per second on deadlines of the Tk main loop, whatever the tick rate, and draws the snake with its head
+    and tail moved back towards their positions in the previous frame by the fraction of the tick period not elapsed yet
+    (i.e. the snake glides one cell per tick, drawn one tick behind). Each frame carries the tail and head of the previous one,
+    so both states are read through the same single reference. A frame is skipped when the latest state is already drawn
+    in full (i.e. nothing changed), and the frame time and the frames drawn and skipped are printed on exit.
+
     **IMPORTANT** Tkinter is intended to be single-threaded and we cannot perform Gui updates outside of the main thread. This is problematic since the `Tk.mainloop()` method is blocking
     as long as the gui instance is running. (See The Python Software Foundation. (n.d.). Tkinter - Python interface to TCL/TK. Python Documentation. https://docs.python.org/3/library/tkinter.html#threading-model)
     More is described in the supplementary .pdf report.
 """
 
-import threading
+import threading, time
+from collections import namedtuple
 
 from tkinter import Tk, Canvas, Button
-import random, time
+
+from engine import SNAKE_ICON_WIDTH, Game, PolylineBuffer
+from instrumentation import LatencyRecorder, Stats, TimedLock, instrumentGame
+from replay import Recorder
+
+BACKGROUND_COLOUR = "black" # you may change this colour if you wish
+ICON_COLOUR = "blue"        # you may change this colour if you wish
+WAKEUP_CHECK = 5     #interval (ms) at which the Tk main loop checks for values produced by the game thread
+
+#an immutable state of the game, published by the SnapshotState class
+Frame = namedtuple("Frame", ("version", "snakePoints", "snakeLength", "previousTail", "previousHead", "prey", "score", "gameOver", "producedAt"))
+
+def interpolate(frame: Frame, alpha: float, step: int = SNAKE_ICON_WIDTH) -> tuple:
+    """
+        This function returns the flat points of the snake of a frame, with its tail and head moved back towards
+        their positions in the previous frame by 1 - alpha of the way (i.e. alpha = 1 gives the frame itself).
+        The previous head is on the last segment of the line, and the previous tail is either on its first segment
+        or on the segment just before it (i.e. the corner the tail has just passed), so only the ends change.
+        The frame is returned as it is unless the head moved exactly one step (of the given snake icon width)
+        and the tail at most one (e.g. not after a state loaded, or a keyframe following a gap).
+    """
+    points = frame.snakePoints
+    if alpha >= 1.0 or len(points) < 4:
+        return points
+    (tailX, tailY), (headX, headY) = frame.previousTail, frame.previousHead
+    if (abs(points[-2] - headX) + abs(points[-1] - headY) != step
+            or abs(points[0] - tailX) + abs(points[1] - tailY) > step): # Not A Single Step (e.g. A State Loaded)
+        return points
+    tail = (tailX + (points[0] - tailX) * alpha, tailY + (points[1] - tailY) * alpha)
+    if tailX == points[0] == points[2] or tailY == points[1] == points[3]: # On The First Segment
+        body = points[2:-2]
+    else: # Keep The Corner Just Passed
+        body = points[:-2]
+    return (*tail, *body, headX + (points[-2] - headX) * alpha, headY + (points[-1] - headY) * alpha)
 
 class Gui():
     """
         This class takes care of the game's graphic user interface (gui)
         creation and termination.
     """
-    def __init__(self):
+    def __init__(self, game: Game, state, polling: bool = False, fps: float = None):
         """
             The initializer instantiates the main window and
             creates the starting icons for the snake and the prey,
             and displays the initial gamer score.
+            The gui reads the game state from the given shared memory
+            (i.e. a SharedState or a SnapshotState), and is woken up by it
+            unless polling is requested. With fps (i.e. a SnapshotState only),
+            it is drawn by a render loop at that rate instead.
         """
+        self.state = state
+        self.polling = polling
+        self.framePeriod = 1 / fps if fps else None
+        self.tickPeriod = game.speed
+        self.step = game.snakeIconWidth # Length Of A Move (i.e. Interpolated Within A Tick)
+        self.frameTime = LatencyRecorder() # Time Spent Drawing A Frame
+        self.framesDrawn = 0
+        self.framesSkipped = 0 # Render Loop Frames Without Any Change
+        self.drawnAlpha = 0.0 # Fraction Of The Tick Drawn For The Latest Frame
+        self.latency = LatencyRecorder() # Move To Redrawn Canvas
+        self.pending = threading.Event() # Coalesces Wakeups
+        self.drawnFrame = None # Last Snapshot Drawn
+        self.framesDropped = 0 # Snapshots Published But Never Drawn
         #some GUI constants
         scoreTextXLocation = 60
         scoreTextYLocation = 15
         textColour = "white"
         #instantiate and create gui
         self.root = Tk()
-        self.canvas = Canvas(self.root, width = WINDOW_WIDTH,
-            height = WINDOW_HEIGHT, bg = BACKGROUND_COLOUR)
+        self.canvas = Canvas(self.root, width = game.width,
+            height = game.height, bg = BACKGROUND_COLOUR)
         self.canvas.pack()
-        #create starting game icons for snake and the prey
+        #create starting game icon for snake, and the prey icons by prey coordinates
         self.snakeIcon = self.canvas.create_line(
-            (0, 0), (0, 0), fill=ICON_COLOUR, width=SNAKE_ICON_WIDTH)
-        self.preyIcon = self.canvas.create_rectangle(
-            0, 0, 0, 0, fill=ICON_COLOUR, outline=ICON_COLOUR)
+            (0, 0), (0, 0), fill=ICON_COLOUR, width=game.snakeIconWidth)
+        self.preyIcons = {}
         #display starting score of 0
         self.score = self.canvas.create_text(
             scoreTextXLocation, scoreTextYLocation, fill=textColour,
@@ -64,42 +144,157 @@ class Gui():
         #binding the arrow keys to be able to control the snake
         for key in ("Left", "Right", "Up", "Down"):
             self.root.bind(f"<Key-{key}>", game.whenAnArrowKeyIsPressed)
+        if self.framePeriod is not None:
+            self.nextFrameAt = time.perf_counter()
+            self.render()
+            return
+        if not polling:
+            state.wakeup = self.wakeup
+            self.checkWakeup()
         self.update()
 
+    def wakeup(self) -> None:
+        """
+            This method is called by the shared memory (i.e. from the game thread)
+            after a new value is produced. It sets the wakeup event checked by the Tk main loop
+            (see checkWakeup()), and never calls into Tk.
+        """
+        self.pending.set()
+
+    def checkWakeup(self) -> None:
+        """
+            This method runs on the Tk main loop every WAKEUP_CHECK ms, and updates the gui
+            if a value was produced since the last update.
+        """
+        if self.pending.is_set():
+            self.update()
+        self.root.after(WAKEUP_CHECK, self.checkWakeup)
+
+    def drawn(self, producedAt: float) -> None:
+        """
+            This method records the latency from a move being produced
+            to the canvas being redrawn.
+        """
+        self.latency.record(time.perf_counter() - producedAt)
+
     def update(self) -> None:
         '''
             This method handles the state by trying to retrieve
             data from the game and accordingly taking the corresponding
             action. These include : game_over, move, prey, score.
-            Before exiting, this method schedules to call itself after a short delay.
+            It is called on every wakeup from the game (or, in the polling design,
+            schedules to call itself after a short delay before exiting).
 
             For general gameplay, non-blocking semaphore acquisition is used to determine whether the
             gui should be updated. In order for these to occur, it must be confirmed that the game is not over.
         '''
+        if isinstance(self.state, SnapshotState):
+            self.updateFromSnapshot()
+            return
+
+        state = self.state
+        self.pending.clear() # Values Produced From Now On Wake Up Again
         def updateSnake() -> None:
-            if game.full["move"].acquire(blocking = False): # Consume New Value
-                game.locks["move"].acquire() # Critical Section (Start)
-                self.canvas.coords(self.snakeIcon, *[coord for point in game.snakeCoordinates for coord in point])
-                game.locks["move"].release() # Critical Section (End)
+            if state.full["move"].acquire(blocking = False): # Consume New Value
+                state.locks["move"].acquire() # Critical Section (Start)
+                self.canvas.coords(self.snakeIcon, *state.snake.points)
+                producedAt = state.moveProducedAt
+                state.locks["move"].release() # Critical Section (End)
+                self.root.after_idle(self.drawn, producedAt) # Runs After The Canvas Redraw
         def updatePrey() -> None:
-            if game.full["prey"].acquire(blocking = False): # Consume New Value
-                game.locks["prey"].acquire() # Critical Section (Start)
-                self.canvas.coords(self.preyIcon, *game.preyCoordinates)
-                game.locks["prey"].release() # Critical Section (End)
+            if state.full["prey"].acquire(blocking = False): # Consume New Value
+                state.locks["prey"].acquire() # Critical Section (Start)
+                prey = frozenset(state.prey)
+                state.locks["prey"].release() # Critical Section (End)
+                self.updatePreyIcons(prey)
         def updateScore() -> None:
-            if game.full["score"].acquire(blocking = False): # Consume New Value
-                game.locks["score"].acquire() # Critical Section (Start)
-                self.canvas.itemconfigure(self.score, text=f"Your Score: {game.score}")
-                game.locks["score"].release() # Critical Section (End)
+            if state.full["score"].acquire(blocking = False): # Consume New Value
+                state.locks["score"].acquire() # Critical Section (Start)
+                self.canvas.itemconfigure(self.score, text=f"Your Score: {state.score}")
+                state.locks["score"].release() # Critical Section (End)
 
         updateSnake()
         updatePrey()
         updateScore()
-        if game.full["game_over"].acquire(blocking = False): # Consume New Value (i.e. Game Over)
+        if state.full["game_over"].acquire(blocking = False): # Consume New Value (i.e. Game Over)
             self.gameOver()
-        else:
+        elif self.polling:
+            self.root.after(100, self.update) # Call Function Every 100 ms
+
+    def updateFromSnapshot(self) -> None:
+        '''
+            This method handles the state published by a SnapshotState.
+            The current frame is read through a single reference (i.e. without any lock),
+            and the widgets are only updated if its version differs from the last frame drawn.
+        '''
+        self.pending.clear() # Frames Published From Now On Wake Up Again
+        frame = self.state.frame # Single Reference Read
+        drawn = self.drawnFrame
+        if drawn is None or frame.version != drawn.version:
+            self.canvas.coords(self.snakeIcon, *frame.snakePoints)
+            self.drawFrame(frame)
+
+        if frame.gameOver:
+            self.gameOver()
+        elif self.polling:
             self.root.after(100, self.update) # Call Function Every 100 ms
 
+    def drawFrame(self, frame: Frame) -> None:
+        """
+            This method updates the prey and score widgets for a new frame (i.e. the snake is drawn by the caller),
+            and counts the frames published since the last one drawn.
+        """
+        drawn = self.drawnFrame
+        if drawn is not None:
+            self.framesDropped += frame.version - drawn.version - 1
+        self.root.after_idle(self.drawn, frame.producedAt) # Runs After The Canvas Redraw
+        if drawn is None or frame.prey is not drawn.prey: # Same Set Unless A Prey Changed
+            self.updatePreyIcons(frame.prey)
+        if drawn is None or frame.score != drawn.score:
+            self.canvas.itemconfigure(self.score, text=f"Your Score: {frame.score}")
+        self.drawnFrame = frame
+
+    def render(self) -> None:
+        '''
+            This method is the render loop of the fps option. It draws the snake of the latest frame
+            interpolated by the fraction of the tick period elapsed since it was published (see interpolate()),
+            unless that frame is already drawn in full, and then schedules itself on the next deadline
+            of the frame period (i.e. skipping the deadlines already missed).
+        '''
+        start = time.perf_counter()
+        frame = self.state.frame # Single Reference Read
+        drawn = self.drawnFrame
+        alpha = min(1.0, (start - frame.producedAt) / self.tickPeriod)
+        if drawn is not None and frame.version == drawn.version and self.drawnAlpha >= 1.0: # Nothing Changed
+            self.framesSkipped += 1
+        else:
+            self.canvas.coords(self.snakeIcon, *interpolate(frame, alpha, self.step))
+            if drawn is None or frame.version != drawn.version:
+                self.drawFrame(frame)
+            self.drawnAlpha = alpha
+            self.framesDrawn += 1
+            self.frameTime.record(time.perf_counter() - start)
+
+        if frame.gameOver:
+            self.gameOver()
+            return
+        self.nextFrameAt += self.framePeriod
+        now = time.perf_counter()
+        if self.nextFrameAt < now: # Late (i.e. Skip The Missed Deadlines)
+            self.nextFrameAt = now + self.framePeriod - (now - self.nextFrameAt) % self.framePeriod
+        self.root.after(max(0, round(1000 * (self.nextFrameAt - now))), self.render)
+
+    def updatePreyIcons(self, prey: frozenset) -> None:
+        """
+            This method deletes the icons of the prey which are not in the given set anymore
+            (i.e. captured), and creates the icons of the new ones.
+        """
+        for preyCoordinates in self.preyIcons.keys() - prey:
+            self.canvas.delete(self.preyIcons.pop(preyCoordinates))
+        for preyCoordinates in prey - self.preyIcons.keys():
+            self.preyIcons[preyCoordinates] = self.canvas.create_rectangle(
+                *preyCoordinates, fill=ICON_COLOUR, outline=ICON_COLOUR)
+
     def gameOver(self) -> None:
         """
             This method is used at the end to display a
@@ -110,15 +305,15 @@ class Gui():
             command=self.root.destroy)
         self.canvas.create_window(200, 100, anchor="nw", window=gameOverButton)
 
-class Game():
+class SharedState():
     '''
-        This class implements most of the game functionalities.
+        This class implements the shared memory between the game and the gui.
+        It is attached to the game as an observer and writes each task produced
+        by the game into the data field protected by the corresponding mutex.
     '''
     def __init__(self):
         """
            This initializer sets the locks and full semaphores for the producer-consumer synchronization problem.
-           It also sets the initial snake coordinate list, movement,
-           direction, and arranges for the first prey to be created.
         """
         self.locks = {
             "move": threading.Lock(),
@@ -133,190 +328,136 @@ class Game():
             "score": threading.Semaphore(value = 0),
         }
 
-        #starting length and location of the snake
-        #note that it is a list of tuples, each being an
-        # (x, y) tuple. Initially its size is 5 tuples.
         self.score: int = 0
-        self.snakeCoordinates = [(495, 55), (485, 55), (475, 55),
-                                 (465, 55), (455, 55)]
-        #initial direction of the snake
-        self.direction = "Left"
-        self.gameNotOver = True
-
-        self.createNewPrey() # Generate First Prey
-
-    def superloop(self) -> None:
-        """
-            This method implements a main loop
-            of the game. It constantly generates "move"
-            tasks to cause the constant movement of the snake.
-            Use the SPEED constant to set how often the move tasks
-            are generated.
-        """
-        SPEED = 0.15     #speed of snake updates (sec)
-        while self.gameNotOver:
-            #complete the method implementation below
-            time.sleep(SPEED)
-            self.move()
-
-    def whenAnArrowKeyIsPressed(self, e) -> None:
-        """
-            This method is bound to the arrow keys
-            and is called when one of those is clicked.
-            It sets the movement direction based on
-            the key that was pressed by the gamer.
-            Use as is.
-        """
-        currentDirection = self.direction
-        #ignore invalid keys
-        if (currentDirection == "Left" and e.keysym == "Right" or
-            currentDirection == "Right" and e.keysym == "Left" or
-            currentDirection == "Up" and e.keysym == "Down" or
-            currentDirection == "Down" and e.keysym == "Up"):
-            return
-        self.direction = e.keysym
+        self.snake = PolylineBuffer() # Corners Rebuilt From Move Deltas
+        self.moveProducedAt = 0.0
+        self.prey = set() # Prey Coordinates On The Board
+        self.wakeup = None # Called After Each Produced Value (From The Game Thread)
 
-    def move(self) -> None:
+    def __call__(self, task: dict) -> None:
         """
-            This method implements what is needed to be done
-            for the movement of the snake.
-            It generates a new snake coordinate.
-            If based on this new movement, the prey has been
-            captured, it updates the score and also creates a new prey.
-            It also calls a corresponding method to check if
-            the game should be over.
-            The snake coordinates list (representing its length
-            and position) should be correctly updated.
+            This method is called by the game with every task it produces.
+            The data field is written inside its critical section, after
+            which the corresponding full semaphore is released and the
+            gui is woken up.
         """
-        def isCaptured(snakeCoordinates: tuple, preyCoordinates: list) -> bool:
-            captureCoordinates = (
-                snakeCoordinates[0] - SNAKE_ICON_WIDTH // 2, # x0
-                snakeCoordinates[1] - SNAKE_ICON_WIDTH // 2, # y0
-                snakeCoordinates[0] + SNAKE_ICON_WIDTH // 2, # x1
-                snakeCoordinates[1] + SNAKE_ICON_WIDTH // 2 # y1
-            )
-
-            isCaptured: bool = False
-            # Checks if Snake Coordinates are in Prey Coordinates (instance where Prey could be much larger than Snake)
-            if (captureCoordinates[0] <= preyCoordinates[2] and captureCoordinates[1] <= preyCoordinates[3]) and (captureCoordinates[0] >= preyCoordinates[0] and captureCoordinates[1] >= preyCoordinates[1]): # Snake Point 0 "inside" Prey
-                isCaptured = True
-            elif (captureCoordinates[2] >= preyCoordinates[0] and captureCoordinates[3] >= preyCoordinates[1]) and (captureCoordinates[2] <= preyCoordinates[2] and captureCoordinates[3] <= preyCoordinates[3]): # Snake Point 1 "inside" Prey
-                isCaptured = True
-            # Checks if Prey Coordinates are in Snake Coordinates (instance where Snake could be much larger than Prey)
-            elif (preyCoordinates[2] >= captureCoordinates[0] and preyCoordinates[3] >= captureCoordinates[1]) and (preyCoordinates[2] <= captureCoordinates[2] and preyCoordinates[3] <= captureCoordinates[3]): # Prey Point 0 "inside" Snake
-                isCaptured = True
-            elif (preyCoordinates[0] <= captureCoordinates[2] and preyCoordinates[1] <= captureCoordinates[3]) and (preyCoordinates[0] >= captureCoordinates[0] and preyCoordinates[1] >= captureCoordinates[1]): # Prey Point 1 "inside" Snake
-                isCaptured = True
-            return isCaptured
-
-        def moveSnake(isPreyCaptured: bool, newCoordinates: tuple) -> None:
+        if "game_over" in task:
+            self.full["game_over"].release() # Produce Value (i.e. Game Over)
+        elif "move" in task or "keyframe" in task:
             self.locks["move"].acquire() # Critical Section (Start)
-            if isPreyCaptured:
-                self.snakeCoordinates = [*self.snakeCoordinates, newCoordinates] # Append New Snake Head
-            else:
-                self.snakeCoordinates = [*self.snakeCoordinates[1:], newCoordinates] # Move Snake
+            self.snake.apply(task)
+            self.moveProducedAt = time.perf_counter()
             self.locks["move"].release() # Critical Section (End)
             self.full["move"].release() # Produce Value
-
-        def incrementScore() -> None:
+        elif "prey" in task or "captured" in task:
+            self.locks["prey"].acquire() # Critical Section (Start)
+            if "prey" in task:
+                self.prey.add(task["prey"])
+            else:
+                self.prey.discard(task["captured"])
+            self.locks["prey"].release() # Critical Section (End)
+            self.full["prey"].release() # Produce Value
+        elif "score" in task:
             self.locks["score"].acquire() # Critical Section (Start)
-            self.score += 1
+            self.score = task["score"]
             self.locks["score"].release() # Critical Section (End)
             self.full["score"].release() # Produce Value
+        if self.wakeup is not None:
+            self.wakeup()
 
-        NewSnakeCoordinates = self.calculateNewCoordinates()
-
-        self.isGameOver(NewSnakeCoordinates)
-
-        preyCaptured = isCaptured(NewSnakeCoordinates, preyCoordinates = gui.canvas.coords(gui.preyIcon))
-        moveSnake(isPreyCaptured = preyCaptured, newCoordinates = NewSnakeCoordinates)
-
-        if preyCaptured:
-            self.createNewPrey()
-            incrementScore()
-
-    def calculateNewCoordinates(self) -> tuple:
-        """
-            This method calculates and returns the new
-            coordinates to be added to the snake
-            coordinates list based on the movement
-            direction and the current coordinate of
-            head of the snake.
-            It is used by the move() method.
-        """
-
-        lastX, lastY = self.snakeCoordinates[-1] # Read Head Coordinate for Processing (Don't Need Critical Section)
-
-        #complete the method implementation below
-        if self.direction == "Left":
-            lastX -= SNAKE_ICON_WIDTH
-        elif self.direction == "Right":
-            lastX += SNAKE_ICON_WIDTH
-        elif self.direction == "Up":
-            lastY -= SNAKE_ICON_WIDTH
-        else:
-            lastY += SNAKE_ICON_WIDTH
-        return (lastX, lastY)
-
-    def isGameOver(self, snakeCoordinates: tuple) -> None:
+class SnapshotState():
+    '''
+        This class implements the single-writer snapshot publication between the game and the gui.
+        It is attached to the game as an observer, and keeps the working state of the game thread.
+        At the end of each tick (i.e. on the "move" or "keyframe" task), it builds an immutable Frame
+        with the next version number and publishes it by swapping the frame data field.
+        The frozen set of prey is only rebuilt on the ticks where a prey was added or captured,
+        and shared by the frames in between.
+    '''
+    def __init__(self):
         """
-            This method checks if the game is over by
-            checking if now the snake has passed any wall
-            or if it has bit itself.
-            If that is the case, it updates the gameNotOver
-            field and releases the binary semaphore for the gui.
+           This initializer publishes an empty first frame.
         """
-        x, y = snakeCoordinates
-        #complete the method implementation below
-
-        x_collision: bool = (x <= 0) or (x >= WINDOW_WIDTH)
-        y_collision: bool = (y <= 0) or (y >= WINDOW_HEIGHT)
+        self.snake = PolylineBuffer() # Working Copies (Game Thread Only)
+        self.prey = set()
+        self.preyChanged = False
+        self.score: int = 0
+        self.gameOver = False
 
-        if (x_collision) or (y_collision) or ((x, y) in self.snakeCoordinates[:-1]):
-            self.gameNotOver = False
-            self.full["game_over"].release() # Produce Value (i.e. Game Over)
-        return
+        self.frame = Frame(0, (), 0, None, None, frozenset(), 0, False, 0.0) # Published Reference
+        self.wakeup = None # Called After Each Published Frame (From The Game Thread)
 
-    def createNewPrey(self) -> None:
+    def __call__(self, task: dict) -> None:
         """
-            This methods picks an x and a y randomly as the coordinate
-            of the new prey and uses that to calculate the
-            coordinates (x - 5, y - 5, x + 5, y + 5). [you need to replace 5 with a constant]
-            It then updates the self.preyCoordinates data field with the calculated
-            rectangle coordinates as its value. This is used by the
-            gui to represent the new prey.
-            To make playing the game easier, set the x and y to be THRESHOLD
-            away from the walls.
+            This method is called by the game with every task it produces.
+            It updates the working state, and publishes a new frame at the end of each tick.
         """
-        THRESHOLD = 15
-
-        generatedCoordinates: tuple = (
-            random.randint(THRESHOLD, WINDOW_WIDTH - THRESHOLD),  # Generate X Coordinate Threshold Away From Walls
-            random.randint(THRESHOLD, WINDOW_HEIGHT - THRESHOLD)  # Generate X Coordinate Threshold Away From Walls
-        )
-
-        self.locks["prey"].acquire() # Critical Section (Start)
-        self.preyCoordinates = (
-            generatedCoordinates[0] - PREY_ICON_WIDTH // 2, # x0
-            generatedCoordinates[1] - PREY_ICON_WIDTH // 2, # y0
-            generatedCoordinates[0] + PREY_ICON_WIDTH // 2, # x1
-            generatedCoordinates[1] + PREY_ICON_WIDTH // 2 # y1
-        )
-        self.locks["prey"].release() # Critical Section (End)
-        self.full["prey"].release() # Produce Value
+        if "game_over" in task:
+            self.gameOver = True
+        elif "prey" in task:
+            self.prey.add(task["prey"])
+            self.preyChanged = True
+        elif "captured" in task:
+            self.prey.discard(task["captured"])
+            self.preyChanged = True
+        elif "score" in task:
+            self.score = task["score"]
+        elif self.snake.apply(task):
+            prey = frozenset(self.prey) if self.preyChanged else self.frame.prey
+            self.preyChanged = False
+            points = tuple(self.snake.points)
+            previous = self.frame.snakePoints or points # Tail And Head Of The Previous Tick
+            self.frame = Frame(self.frame.version + 1, points, self.snake.length, previous[:2], previous[-2:], prey,
+                self.score, self.gameOver, time.perf_counter()) # Swap Reference (Atomic)
+            if self.wakeup is not None:
+                self.wakeup()
 
 if __name__ == "__main__":
-    #some constants for our GUI
-    WINDOW_WIDTH = 500
-    WINDOW_HEIGHT = 300
-    SNAKE_ICON_WIDTH = 15
-    PREY_ICON_WIDTH = 10 # add the specified constant PREY_ICON_WIDTH here
-
-    BACKGROUND_COLOUR = "black" # you may change this colour if you wish
-    ICON_COLOUR = "blue"        # you may change this colour if you wish
-
-    game = Game() # instantiate the game object
-    gui = Gui() # instantiate the game user interface
+    import sys
+
+    preyCount = int(sys.argv[sys.argv.index("--prey") + 1]) if "--prey" in sys.argv else 1
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None
+    game = Game(seed = seed, preyCount = preyCount) # instantiate the game object
+    recorder = Recorder(game, sys.argv[sys.argv.index("--record") + 1]) if "--record" in sys.argv else None
+    fps = float(sys.argv[sys.argv.index("--fps") + 1]) if "--fps" in sys.argv else None
+    if "--snapshot" in sys.argv or fps:
+        state = SnapshotState() # instantiate the snapshot publication
+    else:
+        state = SharedState() # instantiate the shared memory
+    game.attach(state) # the shared memory observes the game
+
+    gui = Gui(game, state, polling = "--poll" in sys.argv, fps = fps) # instantiate the game user interface
+
+    stats = None
+    if "--stats" in sys.argv:
+        statsPath = sys.argv[sys.argv.index("--stats") + 1]
+        stats = Stats() # hooks are only installed when the stats are requested
+        instrumentGame(stats, game)
+        before = None
+        if isinstance(state, SharedState):
+            for name in state.locks:
+                state.locks[name] = TimedLock(state.locks[name], stats, name)
+            samples = [stats.sample(f"semaphore {name}", lambda semaphore = semaphore: semaphore._value) # Pending Permits
+                       for name, semaphore in state.full.items()]
+            before = lambda: [sample() for sample in samples]
+        stats.instrument(gui, ("update", "render"), "gui ", before)
+        stats.gauge("frames dropped", lambda: gui.framesDropped)
+        stats.gauge("frames skipped", lambda: gui.framesSkipped)
+        stats.gauge("frame time p99 s", lambda: gui.frameTime.percentile(0.99))
+        stats.gauge("tick to pixel p99 s", lambda: gui.latency.percentile(0.99))
+        stats.gauge("key to move p99 s", lambda: game.inputLatency.percentile(0.99))
+        stats.startFlushing(statsPath)
 
     threading.Thread(target = game.superloop, daemon = True).start() # start a thread with the superloop of the game
-    gui.root.mainloop() # start the GUI's own event loop
\ No newline at end of file
+    gui.root.mainloop() # start the GUI's own event loop
+
+    print("tick to pixel latency :", gui.latency.summary())
+    if fps:
+        print("frame time :", gui.frameTime.summary())
+        print(f"frames : {gui.framesDrawn} drawn, {gui.framesSkipped} skipped, {gui.framesDropped} ticks never drawn")
+    print("key to move latency :", game.inputLatency.summary(), "dropped", game.inputsDropped)
+    if stats is not None:
+        stats.flush(statsPath)
+    if recorder is not None:
+        recorder.close()
+    print("seed :", game.seed)
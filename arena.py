@@ -0,0 +1,285 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This program implements an arena of the snake game, in which many snakes share a single board.
+
+    Usage : python arena.py [--snakes N] [--humans 0|1] [--prey N] [--world COLUMNSxROWS] [--respawn] [--seed N]
+
+    The `Arena` class extends the headless `Game` class (see `engine.py`) : its occupancy index, free cell index
+    and prey are shared by every snake, and each `Snake` only holds its own body, direction and score.
+    The snakes are driven by humans (i.e. the first snake follows the arrow keys) or by bots (i.e. a policy
+    returning the direction of a snake on each tick, `arenaPolicy` by default).
+
+    The moves of all snakes in a tick are resolved together against the shared occupancy index :
+        - every head is moved first, and heads reaching the same cell all die (i.e. head-to-head collisions),
+          so two snakes never capture the same prey
+        - the tails are moved next, so a head may follow any tail (i.e. of a snake which does not grow on this tick)
+        - a head outside the board dies (WALL), and a head on a cell occupied by any other segment dies (COLLISION)
+        - the bodies of the dead snakes are then removed from the board, and the prey captured are respawned
+    Each step costs O(1) per snake, so a tick costs O(number of snakes) rather than O(snakes x body length)
+    (i.e. the removal of a dead body is paid once for the segments it added).
+
+    The tasks sent to the observers are those of the `Game` class, with the id of the snake they concern :
+    {"move": (x, y, dropped), "snake": id}, {"keyframe": body, "snake": id}, {"score": score, "snake": id}
+    and {"died": cause, "snake": id}. The "prey", "captured" and "game_over" tasks are shared.
+    The keyframes of the snakes are staggered over keyframeInterval ticks, so that they are not all sent on the same tick.
+    The Tk front-end draws a single canvas line per snake (see `ArenaQueueHandler` in `original.py`).
+"""
+
+from collections import deque
+
+from engine import SPEED, SNAKE_ICON_WIDTH, PREY_ICON_WIDTH, KEYFRAME_INTERVAL, DIRECTIONS, OPPOSITES, ALIVE, WALL, \
+    isCaptured, Game
+
+#cause of death of a snake whose head ran into another head or into a body (i.e. its own included)
+COLLISION = 4
+
+#moves of the head per direction, in steps of the snake icon width
+STEPS = {"Left": (-1, 0), "Right": (1, 0), "Up": (0, -1), "Down": (0, 1)}
+
+class Snake():
+    '''
+        This class holds the state of a single snake of an arena.
+        A snake grows by growth segments after it spawns, and by one segment per prey captured.
+    '''
+    def __init__(self, snakeId: int, policy = None):
+        self.id = snakeId
+        self.policy = policy # None For A Human
+        self.body = deque() # Tail First, Head Last
+        self.direction = "Left"
+        self.growth = 0 # Segments Left To Grow
+        self.score = 0
+        self.alive = False
+        self.cause = ALIVE
+        self.target = None # Prey Cell Chased By A Bot
+
+    def changeDirection(self, direction: str) -> None:
+        """
+            This method sets the movement direction,
+            ignoring reversals into the snake's own body.
+        """
+        if direction not in OPPOSITES or (OPPOSITES[direction] == self.direction and len(self.body) > 1):
+            return
+        self.direction = direction
+
+def arenaPolicy(arena: "Arena", snake: Snake) -> str:
+    """
+        This function returns the direction which brings the head of a bot closest to its target prey,
+        among the directions which do not immediately run into a wall or a body.
+        The target is the latest prey placed when the bot needs a new one, so that the bots
+        chase different prey and the policy costs O(1).
+    """
+    if snake.target not in arena.prey:
+        snake.target = next(reversed(arena.prey), None) # Latest Prey Placed
+    headX, headY = snake.body[-1]
+    targetX, targetY = snake.target if snake.target is not None else (headX, headY)
+    step = arena.snakeIconWidth
+
+    best = None
+    for direction in DIRECTIONS:
+        if OPPOSITES[direction] == snake.direction and len(snake.body) > 1:
+            continue
+        x, y = headX + STEPS[direction][0] * step, headY + STEPS[direction][1] * step
+        safe = (0 < x < arena.width) and (0 < y < arena.height) and (x, y) not in arena.occupancy
+        candidate = (not safe, abs(targetX - x) + abs(targetY - y), direction)
+        if best is None or candidate < best:
+            best = candidate
+    return best[2]
+
+class Arena(Game):
+    '''
+        This class implements a board shared by many snakes, with the rules of the `Game` class.
+        The first `humans` snakes are steered by the arrow keys (or step()), and the others by the policy.
+    '''
+    def __init__(self, width: int, height: int, snakes: int = 100, humans: int = 0, policy = arenaPolicy,
+                 seed: int = None, speed: float = SPEED, snakeIconWidth: int = SNAKE_ICON_WIDTH,
+                 preyIconWidth: int = PREY_ICON_WIDTH, keyframeInterval: int = KEYFRAME_INTERVAL,
+                 preyCount: int = None, spawnLength: int = 5, respawn: bool = False):
+        """
+            This initializer sets up the board like the `Game` class, without its single snake,
+            then spawns the snakes on random free cells and places preyCount prey (one per snake by default).
+            With respawn, a dead bot spawns again on the same tick.
+        """
+        super().__init__(width, height, seed = seed, speed = speed, snakeIconWidth = snakeIconWidth,
+                         preyIconWidth = preyIconWidth, keyframeInterval = keyframeInterval, preyCount = 0)
+        self.setSnakeCoordinates(()) # The Snakes Are Indexed Below
+        self.humans = humans
+        self.spawnLength = spawnLength
+        self.respawn = respawn
+        self.snakes = [Snake(i, None if i < humans else policy) for i in range(snakes)]
+        for snake in self.snakes:
+            self.spawn(snake)
+        self.createNewPrey(snakes if preyCount is None else preyCount)
+
+    def spawn(self, snake: Snake) -> None:
+        """
+            This method places a snake of a single segment on a random free cell, facing a random direction.
+            It then grows to spawnLength segments as it moves. It stays dead if no cell is free.
+        """
+        if len(self.cover) >= self.preyCellCount: # No Free Cell Left
+            return
+        cell = self.randomFreeCell()
+        snake.body = deque((cell,))
+        snake.direction = self.random.choice(DIRECTIONS)
+        snake.growth = self.spawnLength - 1
+        snake.alive = True
+        snake.cause = ALIVE
+        snake.target = None
+        self.occupancy[cell] = self.occupancy.get(cell, 0) + 1
+        self.coverCells(cell)
+        self.notify({"keyframe": tuple(snake.body), "snake": snake.id})
+
+    def attach(self, observer) -> None:
+        """
+            This method attaches an observer to the arena, and immediately sends it
+            the current prey, and the body and score of every snake alive.
+        """
+        self.observers.append(observer)
+        for preyCoordinates in self.prey.values():
+            observer({"prey": preyCoordinates})
+        for snake in self.snakes:
+            if snake.alive:
+                observer({"score": snake.score, "snake": snake.id})
+                observer({"keyframe": tuple(snake.body), "snake": snake.id})
+
+    def step(self, directions: dict = None) -> bool:
+        """
+            This method advances the arena by a single tick without any delay.
+            The directions of the human snakes may be given by id (e.g. {0: "Up"}).
+            It returns whether the game is still running.
+        """
+        for snakeId, direction in (directions or {}).items():
+            self.snakes[snakeId].changeDirection(direction)
+        if self.gameNotOver:
+            self.move()
+        return self.gameNotOver
+
+    def whenAnArrowKeyIsPressed(self, e) -> None:
+        """
+            This method is bound to the arrow keys, and queues the direction of the first human snake
+            for the next ticks (see `Game.queueDirection()`).
+        """
+        if self.humans:
+            self.queueDirection(e.keysym)
+
+    def vacate(self, cell: tuple) -> None:
+        """
+            This method removes a body segment from the occupancy and free cell indices.
+        """
+        if self.occupancy[cell] == 1:
+            del self.occupancy[cell]
+        else:
+            self.occupancy[cell] -= 1
+        self.uncoverCells(cell)
+
+    def move(self) -> None:
+        """
+            This method moves every snake alive by one cell, and resolves
+            the collisions and captures of all of them together (see the module documentation).
+        """
+        self.ticks += 1
+        step = self.snakeIconWidth
+        occupancy = self.occupancy
+        alive = [snake for snake in self.snakes if snake.alive]
+
+        heads = {} # Number Of Heads Per Cell
+        moves = []
+        if self.inputs and self.snakes[0].alive and self.humans: # Key Presses Since The Previous Tick
+            turn = self.nextInput(self.snakes[0].direction)
+            if turn is not None:
+                self.snakes[0].changeDirection(turn)
+        for snake in alive:
+            if snake.policy is not None:
+                snake.changeDirection(snake.policy(self, snake))
+            x, y = snake.body[-1]
+            dx, dy = STEPS[snake.direction]
+            head = (x + dx * step, y + dy * step)
+            heads[head] = heads.get(head, 0) + 1
+            moves.append((snake, head))
+
+        captures = []
+        dropped = {} # Whether Each Snake Dropped Its Tail
+        for snake, head in moves: # Tails First (i.e. Heads May Follow Them)
+            cellPrey = self.prey.get(head)
+            if cellPrey is not None and heads[head] == 1 and isCaptured(head, cellPrey, step):
+                captures.append(snake)
+                dropped[snake.id] = False
+            elif snake.growth > 0:
+                snake.growth -= 1
+                dropped[snake.id] = False
+            else:
+                self.vacate(snake.body.popleft())
+                dropped[snake.id] = True
+        for snake, head in moves:
+            snake.body.append(head)
+            occupancy[head] = occupancy.get(head, 0) + 1
+            self.coverCells(head)
+
+        dead = []
+        for snake, head in moves:
+            x, y = head
+            if (x <= 0) or (x >= self.width) or (y <= 0) or (y >= self.height):
+                snake.cause = WALL
+            elif occupancy[head] > 1: # Head Shares Its Cell With Another Head Or A Body
+                snake.cause = COLLISION
+            else:
+                if self.observers:
+                    if (self.ticks + snake.id) % self.keyframeInterval == 0: # Staggered Keyframes
+                        self.notify({"keyframe": tuple(snake.body), "snake": snake.id})
+                    else:
+                        self.notify({"move": (x, y, dropped[snake.id]), "snake": snake.id})
+                continue
+            dead.append(snake)
+
+        for snake in dead: # After Every Collision Is Found (e.g. Both Snakes Of A Head-To-Head)
+            snake.alive = False
+            for point in snake.body:
+                self.vacate(point)
+            snake.body.clear()
+            self.notify({"died": snake.cause, "snake": snake.id})
+        for snake in captures:
+            self.removePrey(snake.body[-1])
+            snake.score += 1
+            self.score += 1
+            self.notify({"score": snake.score, "snake": snake.id})
+            self.createNewPrey()
+        if self.respawn:
+            for snake in dead:
+                if snake.policy is not None:
+                    self.spawn(snake)
+
+        players = self.snakes[:self.humans] or self.snakes
+        if self.gameNotOver and not any(snake.alive for snake in players):
+            self.gameNotOver = False
+            self.cause = COLLISION
+            self.notify({"game_over": True})
+
+if __name__ == "__main__":
+    import argparse, queue, threading
+
+    from original import Gui, ArenaQueueHandler
+
+    parser = argparse.ArgumentParser(description = "Play the snake game in an arena of many snakes.")
+    parser.add_argument("--snakes", type = int, default = 50, help = "number of snakes")
+    parser.add_argument("--humans", type = int, choices = (0, 1), default = 1, help = "whether the first snake follows the arrow keys")
+    parser.add_argument("--prey", type = int, default = None, help = "number of prey (default: one per snake)")
+    parser.add_argument("--world", default = "80x50", help = "board size in cells (COLUMNSxROWS)")
+    parser.add_argument("--respawn", action = "store_true", help = "respawn the bots when they die")
+    parser.add_argument("--seed", type = int, default = None, help = "seed of the arena")
+    args = parser.parse_args()
+
+    columns, rows = map(int, args.world.split("x"))
+    arena = Arena(columns * SNAKE_ICON_WIDTH, rows * SNAKE_ICON_WIDTH, snakes = args.snakes, humans = args.humans,
+                  seed = args.seed, preyCount = args.prey, respawn = args.respawn)
+    gui = Gui(arena)    #the canvas is sized after the board
+    queueHandler = ArenaQueueHandler(queue.Queue(), gui, humans = args.humans)
+    arena.attach(queueHandler.put)
+
+    threading.Thread(target = arena.superloop, daemon = True).start()
+    gui.root.mainloop()
+
+    print("tick to pixel latency :", queueHandler.latency.summary())
+    print("key to move latency :", arena.inputLatency.summary())
+    print("scores :", sorted((snake.score for snake in arena.snakes), reverse = True)[:10])
+    print("seed :", arena.seed)
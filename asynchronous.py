@@ -0,0 +1,185 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This program implements a variety of the snake
+    game (https://en.wikipedia.org/wiki/Snake_(video_game_genre))
+
+    Usage : python asynchronous.py [--prey N] [--world COLUMNSxROWS] [--stats FILE] [--seed N] [--record FILE]
+
+    This is the third IPC design, next to the message passing of `original.py` and the shared memory of `alternative.py`.
+    There is no thread for the `superloop()` method of the `Game` class : the game and the gui are coroutines of a single
+    asyncio event loop on the main thread. The game coroutine (`Game.asyncSuperloop()`) awaits the deadline of each tick,
+    and its tasks are put on an `asyncio.Queue` along with the time they were produced. The `AsyncQueueHandler` coroutine
+    awaits new tasks, draws them through the same `Gui` class as `original.py`, and then runs the Tk event loop
+    for a single pass (i.e. `Tk.update()`), which also handles the key presses.
+    When no task is produced, Tk is still updated every pollPeriod so that the window stays responsive.
+
+    Since a single thread runs everything, no lock is needed, and a tick and its drawing never preempt each other.
+    On the other hand, a slow drawing delays the next tick (i.e. it shows as tick jitter rather than as latency),
+    and the ticks are woken up by the timers of the event loop, whose resolution is about a millisecond on Linux (i.e. epoll).
+    The tick to pixel latency, the tick jitter and the CPU time per tick are printed on exit, to be compared with
+    the other designs (see also python benchmark.py ipc --designs queue,locks,asyncio).
+
+    The --prey, --world, --stats, --seed and --record options are the same as those of `original.py`.
+    The stats are flushed by a coroutine of the same event loop.
+"""
+
+import asyncio, time
+
+from tkinter import TclError
+
+from engine import WINDOW_WIDTH, WINDOW_HEIGHT, SNAKE_ICON_WIDTH, Game, PolylineBuffer
+from instrumentation import LatencyRecorder, Stats, instrumentGame
+from original import Gui
+from replay import Recorder
+from viewport import CulledSnakeBuffer
+
+class AsyncQueueHandler():
+    """
+        This class implements the queue handler for the game, as a coroutine
+        of the same event loop as the game.
+    """
+    def __init__(self, gameQueue: asyncio.Queue, gui: Gui, pollPeriod: float = 1 / 60):
+        self.queue = gameQueue
+        self.gui = gui
+        self.pollPeriod = pollPeriod
+        if gui.camera is not None:
+            self.snake = CulledSnakeBuffer(max(gui.camera.width, gui.camera.height)) # Body Indexed By Tiles
+        else:
+            self.snake = PolylineBuffer() # Corners Rebuilt From Move Deltas
+        self.latency = LatencyRecorder() # Move Task To Redrawn Canvas
+        self.pending = asyncio.Event() # Set When Tasks Are Put
+
+    def put(self, task: dict) -> None:
+        """
+            This method is attached to the game as an observer.
+            It adds the task to the queue along with the time it was produced,
+            and wakes up the handler coroutine (i.e. once the game coroutine awaits its next tick).
+            It must be called from the thread of the event loop.
+        """
+        self.queue.put_nowait((time.perf_counter(), task))
+        self.pending.set()
+
+    def queueHandler(self) -> float:
+        '''
+            This method retrieves every task of the queue and takes the corresponding action,
+            like QueueHandler.queueHandler() in `original.py`.
+            The snake icon is redrawn once after the queue is drained.
+            It returns the time produced of the latest "move" or "keyframe" task, or None.
+        '''
+        self.pending.clear() # Tasks Added From Now On Wake Up Again
+        movedAt = None
+        try:
+            while True:
+                producedAt, task = self.queue.get_nowait()
+                if "game_over" in task:
+                    self.gui.gameOver()
+                elif self.snake.apply(task):
+                    movedAt = producedAt
+                elif "prey" in task:
+                    self.gui.addPrey(task["prey"])
+                elif "captured" in task:
+                    self.gui.removePrey(task["captured"])
+                elif "score" in task:
+                    self.gui.canvas.itemconfigure(
+                        self.gui.score, text=f"Your Score: {task['score']}")
+                self.queue.task_done()
+        except asyncio.QueueEmpty:
+            if movedAt is not None:
+                if self.gui.camera is not None:
+                    self.gui.drawView(self.snake)
+                else:
+                    self.gui.canvas.coords(self.gui.snakeIcon, *self.snake.points)
+        return movedAt
+
+    async def run(self) -> None:
+        """
+            This method handles the queue as tasks are put, and updates Tk after each drain
+            (or every pollPeriod without tasks), until the window is destroyed.
+            The latency of a "move" task is recorded once Tk has redrawn the canvas.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self.pending.wait(), self.pollPeriod)
+            except asyncio.TimeoutError: # No Task (i.e. Only Handle Key Presses)
+                pass
+            movedAt = self.queueHandler()
+            try:
+                self.gui.root.update() # Redraws The Canvas And Handles The Key Presses
+            except TclError: # Window Destroyed
+                return
+            if movedAt is not None:
+                self.latency.record(time.perf_counter() - movedAt)
+
+async def flushLoop(stats: Stats, path: str, period: float = 1.0) -> None:
+    """
+        This function flushes the stats to the file every period (sec) from the event loop.
+    """
+    while True:
+        await asyncio.sleep(period)
+        stats.flush(path)
+
+async def main(game: Game, queueHandler: AsyncQueueHandler, coroutines: list) -> None:
+    """
+        This function runs the game and the other coroutines until the queue handler returns
+        (i.e. the window is destroyed), and then cancels them.
+    """
+    tasks = [asyncio.create_task(coroutine) for coroutine in [game.asyncSuperloop(), *coroutines]]
+    try:
+        await queueHandler.run()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+
+if __name__ == "__main__":
+    import sys
+
+    preyCount = int(sys.argv[sys.argv.index("--prey") + 1]) if "--prey" in sys.argv else 1
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None
+    if "--world" in sys.argv:
+        columns, rows = map(int, sys.argv[sys.argv.index("--world") + 1].split("x"))
+        game = Game(columns * SNAKE_ICON_WIDTH, rows * SNAKE_ICON_WIDTH, seed = seed, preyCount = preyCount)
+    else:
+        game = Game(seed = seed, preyCount = preyCount)        #instantiate the game object
+
+    #record the game before any observer can see it move
+    recorder = Recorder(game, sys.argv[sys.argv.index("--record") + 1]) if "--record" in sys.argv else None
+
+    gui = Gui(game, viewport = (WINDOW_WIDTH, WINDOW_HEIGHT))    #instantiate the game user interface
+
+    gameQueue = asyncio.Queue()     #only accessed from the thread of the event loop
+    queueHandler = AsyncQueueHandler(gameQueue, gui)  #instantiate the queue handler
+
+    game.attach(queueHandler.put)  #the queue observes the game
+
+    coroutines = []
+    stats = None
+    if "--stats" in sys.argv:
+        statsPath = sys.argv[sys.argv.index("--stats") + 1]
+        stats = Stats()     #hooks are only installed when the stats are requested
+        instrumentGame(stats, game)
+        stats.instrument(queueHandler, ("queueHandler",), "gui ",
+            before = stats.sample("queue backlog", gameQueue.qsize))
+        stats.gauge("tick to pixel p99 s", lambda: queueHandler.latency.percentile(0.99))
+        stats.gauge("key to move p99 s", lambda: game.inputLatency.percentile(0.99))
+        stats.gauge("tick jitter max s", lambda: game.scheduler.maxJitter if game.scheduler is not None else 0)
+        coroutines.append(flushLoop(stats, statsPath))
+
+    cpu = time.process_time()
+    #run the game and the gui as coroutines of the same event loop (i.e. on this thread)
+    asyncio.run(main(game, queueHandler, coroutines))
+    cpu = time.process_time() - cpu
+
+    print("tick to pixel latency :", queueHandler.latency.summary())
+    print("key to move latency :", game.inputLatency.summary(), "dropped", game.inputsDropped)
+    if game.scheduler is not None:
+        metrics = game.scheduler.metrics()
+        print(f"tick jitter : mean {1000 * metrics['mean jitter']:.3f} ms, max {1000 * metrics['max jitter']:.3f} ms")
+    print(f"cpu time : {1e6 * cpu / max(1, game.ticks):.0f} us/tick")
+    if stats is not None:
+        stats.flush(statsPath)
+    if recorder is not None:
+        recorder.close()
+    print("seed :", game.seed)
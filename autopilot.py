@@ -0,0 +1,310 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This module implements an autopilot which steers a game (see `engine.py`) in place of the arrow keys.
+    It does not depend on Tkinter.
+
+    The `Autopilot` class is attached to the game as an observer, so it plans on the thread playing the game,
+    at the end of each tick, and sets the direction of the next one with `Game.changeDirection()`.
+    It follows a path to a prey found with A* on the grid the head moves on. Since the body moves while the head
+    follows the path, a body segment is considered free from the tick it will leave its cell (i.e. the tail leaves first),
+    so that paths may run through the body behind the tail.
+
+    The path is cached between ticks and only the next REPAIR_LOOKAHEAD cells of it are checked on each tick
+    (e.g. a prey captured on the way keeps the tail in place for one more tick). When one of them is blocked, the path is
+    repaired by a short search from the cell before it to any of the following cells of the path, instead of planning
+    again from the head. A new path is only planned when the prey chased is gone or the head left the path.
+    If no path is found, the autopilot follows its tail : it takes the safe move leading to enough room for its body
+    (i.e. a flood fill bounded by its length) which is closest to the tail.
+
+    Every search stops at the planning deadline of the tick, which is a fraction of the tick period (i.e. game.speed).
+    A search cut short falls back on the safe move, and is started again on the next tick, so planning never
+    stalls `Game.superloop()` even on large boards. The planning time of each tick is recorded in a `Histogram`
+    (i.e. the "autopilot planning" histogram of the stats, if given), along with the number of ticks which reused,
+    repaired or replanned the path, fell back on the safe move, or exceeded the budget.
+"""
+
+import heapq, time
+from collections import deque
+
+from engine import OPPOSITES
+from instrumentation import Histogram
+
+BUDGET = 0.25     #fraction of the tick period the autopilot may spend planning
+REPAIR_LOOKAHEAD = 8     #cells of the cached path checked on each tick
+REJOIN_WINDOW = 16     #cells of the cached path after a blocked cell a repair may rejoin
+CHECK_EVERY = 64     #expansions between two checks of the planning deadline
+
+#moves of the head per direction, in steps of the snake icon width
+STEPS = {"Left": (-1, 0), "Right": (1, 0), "Up": (0, -1), "Down": (0, 1)}
+
+class PlanningTimeout(Exception):
+    '''
+        This exception is raised by a search reaching the planning deadline of the tick.
+    '''
+
+class Autopilot():
+    '''
+        This class steers a game towards its prey, planning at the end of each tick within a time budget.
+        It mirrors the body of the snake from the "move" and "keyframe" tasks, along with the order
+        of each segment (i.e. its serial number), so the tick each body cell becomes free is known in O(1).
+    '''
+    def __init__(self, game, budget: float = None, stats = None):
+        """
+            This initializer sets the planning budget (sec), BUDGET of the tick period by default,
+            and attaches the autopilot to the game.
+        """
+        self.game = game
+        self.budget = budget if budget is not None else BUDGET * game.speed
+        self.step = game.snakeIconWidth
+        self.body = deque() # Mirror Of The Body (Tail First)
+        self.serials = {} # Serial Number Of The Latest Segment On Each Cell
+        self.headSerial = 0
+        self.path = deque() # Cells From The Next One To The Target
+        self.target = None
+        self.frontier = None # Search From The Target In Progress (i.e. Resumed On The Next Tick)
+        self.cameFrom = {}
+        self.deadline = 0.0
+        self.planning = stats.histogram("autopilot planning", 1e-9) if stats is not None else Histogram(1e-9)
+        self.counts = {"reused": 0, "repaired": 0, "replanned": 0, "fallback": 0, "timeouts": 0, "overruns": 0}
+        if stats is not None:
+            for name in self.counts:
+                stats.gauge(f"autopilot {name}", lambda name = name: self.counts[name])
+        game.attach(self)
+
+    def __call__(self, task: dict) -> None:
+        """
+            This method is called by the game with every task it produces.
+            On the "move" or "keyframe" task ending a tick, it updates the mirror of the body
+            and plans the direction of the next tick.
+        """
+        if "move" in task:
+            x, y, dropped = task["move"]
+            if dropped:
+                tail = self.body.popleft()
+                if self.serials.get(tail) == self.headSerial - len(self.body):
+                    del self.serials[tail]
+            self.headSerial += 1
+            self.body.append((x, y))
+            self.serials[(x, y)] = self.headSerial
+        elif "keyframe" in task:
+            self.body = deque(task["keyframe"])
+            self.serials = {cell: serial for serial, cell in enumerate(self.body)}
+            self.headSerial = len(self.body) - 1
+        else:
+            return
+        if self.game.gameNotOver:
+            self.steer()
+
+    def steer(self) -> None:
+        """
+            This method plans the direction of the next tick and applies it,
+            and records the time it took.
+        """
+        start = time.perf_counter_ns()
+        self.deadline = time.perf_counter() + self.budget
+        direction = self.plan()
+        if direction is not None:
+            self.game.changeDirection(direction)
+        elapsed = time.perf_counter_ns() - start
+        self.planning.record(elapsed)
+        if elapsed > self.budget * 1e9:
+            self.counts["overruns"] += 1
+
+    def freeAt(self, cell: tuple) -> int:
+        """
+            This method returns the number of ticks after which the head may enter a cell of the board
+            (i.e. 0 if it is free, or the number of segments up to the one on it from the tail).
+        """
+        if cell not in self.game.occupancy:
+            return 0
+        return self.serials.get(cell, self.headSerial) - (self.headSerial - len(self.body) + 1) + 1
+
+    def isOpen(self, cell: tuple, ticks: int) -> bool:
+        """
+            This method checks whether the head may enter a cell in the given number of ticks
+            (i.e. within the walls, and not covered by a segment still there by then).
+        """
+        return (0 < cell[0] < self.game.width) and (0 < cell[1] < self.game.height) and self.freeAt(cell) <= ticks
+
+    def neighbours(self, cell: tuple) -> list:
+        """
+            This method returns the (direction, cell) pairs one step away from a cell.
+        """
+        x, y = cell
+        return [(direction, (x + dx * self.step, y + dy * self.step)) for direction, (dx, dy) in STEPS.items()]
+
+    def distance(self, cell: tuple, other: tuple) -> int:
+        """
+            This method returns the Manhattan distance between two cells, in steps of the head.
+        """
+        return (abs(cell[0] - other[0]) + abs(cell[1] - other[1])) // self.step
+
+    def search(self, start: tuple, ticks: int, goals, target: tuple) -> deque:
+        """
+            This method finds a shortest path (A*, towards the target) from a cell reached in the given number of ticks
+            to any of the goal cells, and returns its cells after the start, or None if there is none.
+            It raises PlanningTimeout if the planning deadline is reached first.
+        """
+        cameFrom = {start: None}
+        cost = {start: 0}
+        frontier = [(self.distance(start, target), 0, start)] # (Estimate, -Cost, Cell)
+        expansions = 0
+        while frontier:
+            _, g, cell = heapq.heappop(frontier)
+            g = -g
+            if cell in goals:
+                path = deque()
+                while cell != start:
+                    path.appendleft(cell)
+                    cell = cameFrom[cell]
+                return path
+            if g > cost[cell]: # Stale Entry
+                continue
+            expansions += 1
+            if expansions % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+                raise PlanningTimeout()
+            for _, neighbour in self.neighbours(cell):
+                if g + 1 < cost.get(neighbour, g + 2) and self.isOpen(neighbour, ticks + g + 1):
+                    cost[neighbour] = g + 1
+                    cameFrom[neighbour] = cell
+                    heapq.heappush(frontier, (g + 1 + self.distance(neighbour, target), -(g + 1), neighbour)) # Deepest First On Ties
+        return None
+
+    def searchFromTarget(self, head: tuple) -> deque:
+        """
+            This method runs the search for a new path, from the target back to the head, until the planning deadline.
+            Since it is rooted at the target, the cells it reached stay valid while the head moves,
+            so a search cut short by the deadline resumes on the next tick, until it reaches a cell next to the head.
+            A cell is considered open if it is free by the time the head could reach it at the earliest.
+            It returns the path from that cell to the target, or an empty path if the search is not over
+            (or the target cannot be reached).
+        """
+        if self.frontier is None or self.target not in self.game.prey:
+            self.target = min(self.game.prey, key = lambda cell: self.distance(cell, head))
+            self.frontier = [(self.distance(self.target, head), 0, self.target)] # (Estimate, -Depth, Cell)
+            self.cameFrom = {self.target: None}
+            self.counts["replanned"] += 1
+        entries = {cell for _, cell in self.neighbours(head) if self.isOpen(cell, 1)}
+        reached = next((cell for cell in entries if cell in self.cameFrom), None)
+
+        expansions = 0
+        while reached is None and self.frontier:
+            expansions += 1
+            if expansions % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+                raise PlanningTimeout()
+            _, depth, cell = heapq.heappop(self.frontier)
+            depth = -depth
+            for _, neighbour in self.neighbours(cell):
+                if neighbour not in self.cameFrom and self.isOpen(neighbour, self.distance(neighbour, head)):
+                    self.cameFrom[neighbour] = cell
+                    if neighbour in entries:
+                        reached = neighbour
+                        break
+                    heapq.heappush(self.frontier, (depth + 1 + self.distance(neighbour, head), -(depth + 1), neighbour))
+
+        self.frontier = None # Reached Or Unreachable
+        path = deque()
+        while reached is not None:
+            path.append(reached)
+            reached = self.cameFrom[reached]
+        self.cameFrom = {}
+        return path
+
+    def plan(self) -> str:
+        """
+            This method returns the direction of the next tick : along the cached path if it is still open,
+            along a repaired or new path otherwise, or the safe move if no path is found in time
+            (i.e. towards the target while its search goes on).
+        """
+        head = self.body[-1]
+        if self.path and self.path[0] == head:
+            self.path.popleft()
+        elif self.path: # Steered Off The Path (e.g. By The Arrow Keys)
+            self.path.clear()
+        if self.path and self.target not in self.game.prey:
+            self.path.clear()
+
+        try:
+            if self.path:
+                reused = self.checkPath()
+                if self.path: # Not Dropped (i.e. Counted As Replanned Below Otherwise)
+                    self.counts["reused" if reused else "repaired"] += 1
+            if not self.path and self.game.prey:
+                self.path = self.searchFromTarget(head)
+        except PlanningTimeout:
+            self.path.clear()
+            self.counts["timeouts"] += 1
+
+        if self.path:
+            for direction, cell in self.neighbours(head):
+                if cell == self.path[0]:
+                    return direction
+        self.counts["fallback"] += 1
+        return self.safeMove(self.target if self.frontier is not None else None)
+
+    def checkPath(self) -> bool:
+        """
+            This method checks the next REPAIR_LOOKAHEAD cells of the cached path, and returns whether they are open.
+            The first blocked cell is bypassed by a search rejoining the path within REJOIN_WINDOW cells,
+            and the path is dropped if there is none.
+        """
+        for i, cell in enumerate(list(self.path)[:REPAIR_LOOKAHEAD]):
+            if self.isOpen(cell, i + 1):
+                continue
+            start = self.path[i - 1] if i > 0 else self.body[-1]
+            rejoin = {self.path[j]: j for j in range(i + 1, min(len(self.path), i + 1 + REJOIN_WINDOW))}
+            detour = self.search(start, i, rejoin, self.path[min(len(self.path) - 1, i + 1)]) if rejoin else None
+            if detour is None:
+                self.path.clear()
+            else:
+                rest = list(self.path)[rejoin[detour[-1]] + 1:]
+                self.path = deque(list(self.path)[:i] + list(detour) + rest)
+            return False
+        return True
+
+    def room(self, start: tuple, limit: int) -> int:
+        """
+            This method counts the cells reachable from a cell entered on the next tick,
+            up to the given limit (i.e. a flood fill bounded by the length of the snake).
+        """
+        seen = {start}
+        frontier = deque([(start, 1)])
+        expansions = 0
+        while frontier and len(seen) < limit:
+            expansions += 1
+            if expansions % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+                break
+            cell, ticks = frontier.popleft()
+            for _, neighbour in self.neighbours(cell):
+                if neighbour not in seen and self.isOpen(neighbour, ticks + 1):
+                    seen.add(neighbour)
+                    frontier.append((neighbour, ticks + 1))
+        return len(seen)
+
+    def safeMove(self, goal: tuple = None) -> str:
+        """
+            This method returns the move closest to the goal (the tail by default, i.e. following it)
+            among those leading to enough room for the body,
+            or the move leading to the most room if there is none (i.e. the snake is trapped).
+        """
+        head, tail = self.body[-1], goal or self.body[0]
+        best = None
+        for direction, cell in self.neighbours(head):
+            if OPPOSITES[direction] == self.game.direction or not self.isOpen(cell, 1):
+                continue
+            room = self.room(cell, len(self.body) + 1)
+            candidate = (room <= len(self.body), abs(cell[0] - tail[0]) + abs(cell[1] - tail[1]), -room, direction)
+            if best is None or candidate < best:
+                best = candidate
+        return best[3] if best is not None else None
+
+    def metrics(self) -> dict:
+        """
+            This method returns the planning time percentiles (ms) and the number of ticks
+            per planning outcome.
+        """
+        summary = self.planning.summary()
+        return {**{f"planning {key} ms": 1000 * value for key, value in summary.items() if key != "count"},
+                "ticks": summary["count"], **self.counts}
@@ -0,0 +1,374 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This module implements a batched version of the headless game engine (see `engine.py`).
+
+    The `BatchGame` class steps N independent games in lockstep with vectorized NumPy operations.
+    The heads, directions, body ring buffers, occupancy grids and free cell indices of all games are kept in arrays,
+    and each tick performs the same rules as the scalar `Game` class for every game at once :
+        - movement (i.e. `Game.calculateNewCoordinates()`)
+        - capture of the prey (i.e. `isCaptured()`)
+        - wall and self collision (i.e. `Game.isGameOver()`)
+        - respawn of the prey (i.e. `Game.createNewPrey()`)
+
+    The prey of all games are drawn at once from a counter-based generator (i.e. SplitMix64 of the seed
+    and the number of prey drawn by the game), so that no tick or reset runs a Python loop over the games.
+    A game of the batch produces exactly the same ticks as `referenceGame(seed)` given the same directions,
+    which is a scalar `Game` drawing its prey from `SplitMixRandom(seed)` instead of `random.Random(seed)`.
+    Finished games are automatically reset with the next seed, and their final results are kept
+    in the `last...` arrays until they finish again.
+
+    Usage : python batch.py [--games N] [--ticks T] [--width W] [--height H]
+    checks the parity of a batch with the reference games over random directions (see `checkParity()`).
+
+    *Note that this module requires NumPy, unlike the rest of the game.*
+"""
+
+import random
+
+import numpy as np
+
+from engine import (WINDOW_WIDTH, WINDOW_HEIGHT, SNAKE_ICON_WIDTH, PREY_ICON_WIDTH, SPEED,
+                    DIRECTIONS, WALL, SELF, FULL, Game)
+
+#unit movement (dx, dy) of each direction code (i.e. index in DIRECTIONS)
+DELTAS = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)], dtype = np.int32)
+
+#constants of the SplitMix64 generator
+SPLITMIX_MASK = (1 << 64) - 1
+SPLITMIX_GAMMA = 0x9E3779B97F4A7C15
+SPLITMIX_MULTIPLIERS = (0xBF58476D1CE4E5B9, 0x94D049BB133111EB)
+
+class SplitMixRandom():
+    '''
+        This class implements the SplitMix64 generator of a single game, with the randrange() method used by `Game`.
+        Draw k of a seed only depends on (seed, k), so the `BatchGame` class draws it for many games at once.
+    '''
+    def __init__(self, seed: int):
+        self.state = seed & SPLITMIX_MASK
+
+    def randrange(self, stop: int) -> int:
+        """
+            This method returns the next integer in [0, stop), from the high 32 bits of the next output
+            (i.e. stop must be below 2 ** 32).
+        """
+        self.state = (self.state + SPLITMIX_GAMMA) & SPLITMIX_MASK
+        z = self.state
+        z = ((z ^ (z >> 30)) * SPLITMIX_MULTIPLIERS[0]) & SPLITMIX_MASK
+        z = ((z ^ (z >> 27)) * SPLITMIX_MULTIPLIERS[1]) & SPLITMIX_MASK
+        z ^= z >> 31
+        return ((z >> 32) * stop) >> 32
+
+def referenceGame(seed: int, width: int = WINDOW_WIDTH, height: int = WINDOW_HEIGHT, **gameOptions) -> Game:
+    """
+        This function returns the scalar game played by a `BatchGame` with the given seed
+        (i.e. a `Game` drawing its prey from a `SplitMixRandom`).
+    """
+    game = Game(width, height, seed = seed, preyCount = 0, **gameOptions)
+    game.random = SplitMixRandom(seed)
+    game.preyCount = 1
+    game.createNewPrey()
+    return game
+
+def splitMix(seeds: np.ndarray, draws: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """
+        This function returns draw number `draws` (from 1) of `SplitMixRandom(seed).randrange(stop)`
+        for every (seed, draws, stop) at once.
+    """
+    z = seeds.astype(np.uint64) + draws.astype(np.uint64) * np.uint64(SPLITMIX_GAMMA) # Wraps Around Like The Mask
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(SPLITMIX_MULTIPLIERS[0])
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(SPLITMIX_MULTIPLIERS[1])
+    z ^= z >> np.uint64(31)
+    return (((z >> np.uint64(32)) * stops.astype(np.uint64)) >> np.uint64(32)).astype(np.int64)
+
+class BatchGame():
+    '''
+        This class implements N games stepped in lockstep.
+        Direction codes are the indices of the DIRECTIONS tuple ("Left", "Right", "Up", "Down"),
+        and -1 keeps the current direction of a game.
+    '''
+    def __init__(self, count: int, width: int = WINDOW_WIDTH, height: int = WINDOW_HEIGHT,
+                 seed: int = 0, speed: float = SPEED,
+                 snakeIconWidth: int = SNAKE_ICON_WIDTH, preyIconWidth: int = PREY_ICON_WIDTH):
+        """
+           This initializer allocates the arrays for `count` games on a board of the given size.
+           Game i is started with the seed `seed + i`, and finished games are reset with
+           the following seeds in order.
+        """
+        self.count = count
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.snakeIconWidth = snakeIconWidth
+        self.preyIconWidth = preyIconWidth
+
+        #the body of a scalar game (before its first prey), used as the starting state of every game
+        template = Game(width, height, seed = 0, speed = speed,
+                        snakeIconWidth = snakeIconWidth, preyIconWidth = preyIconWidth, preyCount = 0)
+        self.initialCoordinates = np.array(template.snakeCoordinates, dtype = np.int32)
+        self.initialDirection = DIRECTIONS.index(template.direction)
+
+        #the head only ever visits the lattice of its starting coordinate
+        headX, headY = template.snakeCoordinates[-1]
+        self.origin = np.array((headX % snakeIconWidth, headY % snakeIconWidth), dtype = np.int32)
+        self.columns = (width - 1 - int(self.origin[0])) // snakeIconWidth + 1
+        self.rows = (height - 1 - int(self.origin[1])) // snakeIconWidth + 1
+        self.capacity = self.columns * self.rows + len(self.initialCoordinates)
+        initialCells, initialOnLattice = self.cellIndex(self.initialCoordinates)
+        self.initialCells, self.initialCounts = np.unique(initialCells[initialOnLattice], return_counts = True)
+
+        #the prey cells (i.e. Game.freeCells) are numbered in the order of the free cell index of a new game,
+        #and the free cell index of each game mirrors the swaps of the scalar one
+        preyCells = template.freeCells + sorted(template.cover, key = lambda cell: (cell[1], cell[0]))
+        self.preyCellCoordinates = np.array(preyCells, dtype = np.int32)
+        self.preyId = np.full(self.columns * self.rows, -1, dtype = np.int32)
+        latticeCells, _ = self.cellIndex(self.preyCellCoordinates)
+        self.preyId[latticeCells] = np.arange(len(preyCells), dtype = np.int32)
+        self.initialFreeCount = len(template.freeCells)
+        self.initialCover = np.zeros(len(preyCells), dtype = np.uint8)
+        for cell, segments in template.cover.items():
+            self.initialCover[preyCells.index(cell)] = segments
+        #the prey cells overlapped by each segment off the grid (i.e. of the starting body, which is written
+        #at the start of the ring buffer by reset()), by ring buffer index and padded with -1
+        self.offGridCells = np.full((len(self.initialCoordinates), 4), -1, dtype = np.int32)
+        for index, point in enumerate(template.snakeCoordinates):
+            cells = [preyCells.index(cell) for cell in template.coveredCells(tuple(point))]
+            self.offGridCells[index, :len(cells)] = cells
+
+        self.body = np.zeros((count, self.capacity, 2), dtype = np.int32) # Ring Buffers (Tail To Head)
+        self.occupancy = np.zeros((count, self.columns * self.rows), dtype = np.uint8)
+        self.free = np.zeros((count, len(preyCells)), dtype = np.int32) # Free Prey Cell Ids (First freeCount)
+        self.freePosition = np.zeros((count, len(preyCells)), dtype = np.int32) # Position In free (-1 If Covered)
+        self.freeCount = np.zeros(count, dtype = np.int64)
+        self.cover = np.zeros((count, len(preyCells)), dtype = np.uint8)
+        self.headIndex = np.zeros(count, dtype = np.int64)
+        self.length = np.zeros(count, dtype = np.int64)
+        self.direction = np.zeros(count, dtype = np.int8)
+        self.preyCoordinates = np.zeros((count, 4), dtype = np.int32)
+        self.preyCell = np.zeros(count, dtype = np.int32) # Prey Cell Id (Covered While It Holds The Prey)
+        self.score = np.zeros(count, dtype = np.int64)
+        self.ticks = np.zeros(count, dtype = np.int64)
+        self.seeds = np.arange(seed, seed + count, dtype = np.int64)
+        self.draws = np.zeros(count, dtype = np.int64) # Prey Drawn By Each Game (i.e. SplitMixRandom Calls)
+        self.nextSeed = seed + count
+
+        self.lastScore = np.zeros(count, dtype = np.int64)
+        self.lastLength = np.zeros(count, dtype = np.int64)
+        self.lastTicks = np.zeros(count, dtype = np.int64)
+        self.lastCause = np.zeros(count, dtype = np.int8)
+        self.lastSeed = np.full(count, -1, dtype = np.int64)
+
+        self.reset(np.arange(count), self.seeds.copy())
+
+    def cellIndex(self, coordinates: np.ndarray) -> tuple:
+        """
+            This method returns the flat occupancy grid index of each (x, y) coordinate,
+            and whether that coordinate is a lattice cell on the board.
+        """
+        relative = coordinates - self.origin
+        cell = relative // self.snakeIconWidth
+        onLattice = ((relative % self.snakeIconWidth == 0).all(axis = -1)
+            & (cell[..., 0] >= 0) & (cell[..., 0] < self.columns)
+            & (cell[..., 1] >= 0) & (cell[..., 1] < self.rows))
+        index = np.where(onLattice, cell[..., 1] * self.columns + cell[..., 0], 0)
+        return index, onLattice
+
+    def reset(self, games: np.ndarray, seeds: np.ndarray) -> None:
+        """
+            This method restarts the given games with the given seeds, each in the same state
+            as a new `referenceGame(seed)`.
+        """
+        length = len(self.initialCoordinates)
+        self.body[games, :length] = self.initialCoordinates
+        self.headIndex[games] = length - 1
+        self.length[games] = length
+        self.direction[games] = self.initialDirection
+        self.score[games] = 0
+        self.ticks[games] = 0
+        self.seeds[games] = seeds
+
+        self.occupancy[games] = 0
+        self.occupancy[np.ix_(games, self.initialCells)] = self.initialCounts
+        self.free[games] = np.arange(self.free.shape[1])
+        self.freePosition[games] = np.where(np.arange(self.free.shape[1]) < self.initialFreeCount,
+            np.arange(self.free.shape[1]), -1)
+        self.freeCount[games] = self.initialFreeCount
+        self.cover[games] = self.initialCover
+        self.draws[games] = 0
+        self.createNewPrey(games)
+
+    def createNewPrey(self, games: np.ndarray) -> np.ndarray:
+        """
+            This method draws the new prey of the given games from their free cell indices,
+            exactly as `Game.createNewPrey()` does with a `SplitMixRandom`.
+            The cell of the prey is covered until it is captured.
+            It returns whether each game got a prey (i.e. False if no free cell is left and the game is won).
+        """
+        placed = self.freeCount[games] > 0
+        games = games[placed]
+        self.draws[games] += 1
+        cells = self.free[games, splitMix(self.seeds[games], self.draws[games], self.freeCount[games])]
+        x, y = self.preyCellCoordinates[cells].T
+        half = self.preyIconWidth // 2
+        self.preyCoordinates[games] = np.stack((x - half, y - half, x + half, y + half), axis = 1)
+        self.preyCell[games] = cells
+        self.coverCells(games, cells)
+        return placed
+
+    def coverCells(self, games: np.ndarray, cells: np.ndarray) -> None:
+        """
+            This method removes the given prey cells from the free cell index of the given games
+            (at most one cell per game), when a body segment or a prey starts to cover them.
+        """
+        count = self.cover[games, cells]
+        self.cover[games, cells] = count + 1
+        games, cells = games[count == 0], cells[count == 0]
+        index = self.freePosition[games, cells]
+        self.freeCount[games] -= 1
+        last = self.free[games, self.freeCount[games]]
+        self.free[games, index] = last # Swap With Last Free Cell And Remove
+        self.freePosition[games, last] = index
+        self.freePosition[games, cells] = -1
+
+    def uncoverCells(self, games: np.ndarray, cells: np.ndarray) -> None:
+        """
+            This method adds the given prey cells back to the free cell index of the given games
+            (at most one cell per game), when no body segment or prey covers them anymore.
+        """
+        count = self.cover[games, cells] - 1
+        self.cover[games, cells] = count
+        games, cells = games[count == 0], cells[count == 0]
+        self.free[games, self.freeCount[games]] = cells
+        self.freePosition[games, cells] = self.freeCount[games]
+        self.freeCount[games] += 1
+
+    def heads(self) -> np.ndarray:
+        """
+            This method returns the (x, y) head coordinates of every game.
+        """
+        return self.body[np.arange(self.count), self.headIndex]
+
+    def snakeCoordinates(self, i: int) -> list:
+        """
+            This method returns the body of game i as a list of (x, y) tuples (tail first, head last).
+        """
+        indices = (self.headIndex[i] - np.arange(self.length[i] - 1, -1, -1)) % self.capacity
+        return [tuple(point) for point in self.body[i, indices].tolist()]
+
+    def step(self, directions = None) -> np.ndarray:
+        """
+            This method advances every game by a single tick.
+            The directions are applied with the same rules as an arrow key press
+            (i.e. reversals are ignored) before moving.
+            It returns a boolean array of the games which finished on this tick.
+            These have been reset, and their results are in the `last...` arrays.
+        """
+        games = np.arange(self.count)
+        if directions is not None:
+            directions = np.asarray(directions, dtype = np.int8)
+            valid = (directions >= 0) & (directions != (self.direction ^ 1)) # Opposite Codes Differ In Lowest Bit
+            self.direction = np.where(valid, directions, self.direction).astype(np.int8)
+
+        #calculate the new coordinates (i.e. Game.calculateNewCoordinates())
+        head = self.body[games, self.headIndex] + DELTAS[self.direction] * self.snakeIconWidth
+        x, y = head[:, 0], head[:, 1]
+        self.ticks += 1
+
+        #check whether the prey has been captured (i.e. isCaptured())
+        half = self.snakeIconWidth // 2
+        x0, y0, x1, y1 = x - half, y - half, x + half, y + half
+        p0, p1, p2, p3 = self.preyCoordinates.T
+        captured = (((x0 <= p2) & (y0 <= p3) & (x0 >= p0) & (y0 >= p1))
+            | ((x1 >= p0) & (y1 >= p1) & (x1 <= p2) & (y1 <= p3))
+            | ((p2 >= x0) & (p3 >= y0) & (p2 <= x1) & (p3 <= y1))
+            | ((p0 <= x1) & (p1 <= y1) & (p0 >= x0) & (p1 >= y0)))
+
+        #move the snake (i.e. drop the tail unless the prey has been captured)
+        moving = ~captured
+        tailIndex = (self.headIndex - self.length + 1) % self.capacity
+        tail = self.body[games, tailIndex]
+        tailCell, tailOnLattice = self.cellIndex(tail)
+        dropped = moving & tailOnLattice
+        self.occupancy[games[dropped], tailCell[dropped]] -= 1
+        tailPrey = self.preyId[tailCell]
+        freed = dropped & (tailPrey >= 0)
+        self.uncoverCells(games[freed], tailPrey[freed])
+        offGrid = moving & ~tailOnLattice # Starting Body Off The Grid
+        if offGrid.any():
+            offGridGames, offGridCells = games[offGrid], self.offGridCells[tailIndex[offGrid]]
+            for cells in offGridCells.T: # One Cell Per Game At Once, In The Order Of Game.coveredCells()
+                self.uncoverCells(offGridGames[cells >= 0], cells[cells >= 0])
+        self.length += captured
+        self.score += captured
+
+        self.headIndex = (self.headIndex + 1) % self.capacity
+        self.body[games, self.headIndex] = head
+        headCell, onBoard = self.cellIndex(head)
+        self.occupancy[games[onBoard], headCell[onBoard]] += 1
+        headPrey = np.where(onBoard, self.preyId[headCell], -1)
+        covered = headPrey >= 0
+        self.coverCells(games[covered], headPrey[covered])
+        self.uncoverCells(games[captured], self.preyCell[captured]) # Captured Prey (Still Covered By The Head)
+
+        full = np.zeros(self.count, dtype = bool)
+        full[captured] = ~self.createNewPrey(games[captured])
+
+        #check whether the game is over (i.e. Game.isGameOver(), unless already won)
+        wall = ~full & ((x <= 0) | (x >= self.width) | (y <= 0) | (y >= self.height))
+        bitten = ~full & ~wall & (self.occupancy[games, headCell] > 1)
+        done = full | wall | bitten
+
+        finished = np.flatnonzero(done)
+        if len(finished):
+            self.lastScore[finished] = self.score[finished]
+            self.lastLength[finished] = self.length[finished]
+            self.lastTicks[finished] = self.ticks[finished]
+            self.lastCause[finished] = np.where(full[finished], FULL, np.where(wall[finished], WALL, SELF))
+            self.lastSeed[finished] = self.seeds[finished]
+            self.reset(finished, np.arange(self.nextSeed, self.nextSeed + len(finished)))
+            self.nextSeed += len(finished)
+        return done
+
+def checkParity(games: int, ticks: int, width: int = WINDOW_WIDTH, height: int = WINDOW_HEIGHT) -> None:
+    """
+        This function steps a batch of games and the equivalent reference games (see `referenceGame()`)
+        with the same random directions, and asserts that heads, bodies, scores, prey and finished games
+        match on every tick.
+    """
+    batch = BatchGame(games, width, height, seed = 0)
+    scalars = [referenceGame(i, width, height) for i in range(games)]
+    nextSeed = games
+    generator = random.Random(0)
+
+    for _ in range(ticks):
+        directions = [generator.randrange(-1, len(DIRECTIONS)) for _ in range(games)]
+        results = [game.step(DIRECTIONS[d] if d >= 0 else None) for game, d in zip(scalars, directions)]
+        done = batch.step(directions)
+        heads = batch.heads()
+        for i, game in enumerate(scalars):
+            assert bool(done[i]) == (not results[i]), f"game {i} finished differently"
+            if done[i]:
+                assert batch.lastScore[i] == game.score, f"game {i} score differs"
+                assert batch.lastLength[i] == len(game.snakeCoordinates), f"game {i} length differs"
+                assert batch.lastCause[i] == game.cause, f"game {i} cause differs"
+                scalars[i] = game = referenceGame(nextSeed, width, height)
+                nextSeed += 1
+            else:
+                assert tuple(heads[i].tolist()) == game.snakeCoordinates[-1], f"game {i} head differs"
+                assert batch.score[i] == game.score, f"game {i} score differs"
+                assert batch.snakeCoordinates(i) == list(game.snakeCoordinates), f"game {i} body differs"
+            assert tuple(batch.preyCoordinates[i].tolist()) == game.preyCoordinates, f"game {i} prey differs"
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description = "Check that a batch plays the same games as the scalar engine.")
+    parser.add_argument("--games", type = int, default = 64, help = "games stepped in lockstep")
+    parser.add_argument("--ticks", type = int, default = 2000, help = "ticks stepped")
+    parser.add_argument("--width", type = int, default = WINDOW_WIDTH, help = "board width")
+    parser.add_argument("--height", type = int, default = WINDOW_HEIGHT, help = "board height")
+    args = parser.parse_args()
+
+    checkParity(args.games, args.ticks, args.width, args.height)
+    print(f"parity : {args.games} batched and reference games match over {args.ticks} ticks")
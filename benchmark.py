@@ -0,0 +1,870 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This program benchmarks the headless game engine (see `engine.py`).
+
+    Usage : python benchmark.py {length, batch, contention, viewport, polyline, raster, ipc, broadcast, fork, arena, autopilot} [--ticks N] [--width W] [--height H] [--games G] [--seconds S]
+                                [--designs D,...] [--lengths L,...] [--rates R,...] [--json FILE]
+
+    The "length" benchmark measures the cost of a single tick as the snake grows.
+    The snake follows a Hamiltonian cycle of the board (i.e. a serpentine path
+    which returns along the first column), so it never collides with itself, even when
+    its body fills every cell but one. The per-tick cost should stay flat from
+    a length of 5 up to a full board.
+
+    The "batch" benchmark measures the throughput of the batched engine (see `batch.py`)
+    against stepping the same scalar games one at a time. Its parity with the scalar engine
+    is checked separately (i.e. python batch.py).
+
+    The "contention" benchmark compares the two ways `alternative.py` shares the game state with the gui :
+    the per-field locks and semaphores (`SharedState`) and the single-writer snapshots (`SnapshotState`).
+    A game thread plays as fast as it can while a reader thread reads the state as the `Gui` class does, without Tkinter.
+    It reports the ticks and reads per second, the time the reader waited for locks, and the number of torn
+    states read (i.e. a score which does not match the length of the snake).
+
+    The "viewport" benchmark measures the cost of preparing a frame on a 10000 x 10000 cell board as the snake grows,
+    when only the runs of the body within the viewport are drawn (see `viewport.py`), against flattening the whole body
+    for a single canvas line. The culled cost should follow the number of segments on screen while the full one grows with the length,
+    for the mean frame and for the worst one (i.e. a periodic keyframe).
+
+    The "polyline" benchmark measures the cost of a frame of the canvas line as the snake grows along the Hamiltonian cycle
+    of a 100 x 100 cell board : applying the "move" task and passing the points through Tcl (i.e. the marshalling of
+    canvas.coords(), with a `Tcl` interpreter instead of a canvas), for every segment (`SnakeBuffer`) against the corners only
+    (`PolylineBuffer`). The corner cost should follow the number of turns of the body (i.e. about 2 per 100 segments).
+
+    The "raster" benchmark measures the cost of a frame of the offscreen renderer (see `raster.py`) on the same cycle :
+    the dirty rectangles of a tick against redrawing the whole frame, and the frames per second of `renderBatch()`
+    for a batch of --games games.
+
+    The "ipc" benchmark drives each IPC design headlessly (i.e. the Tk main loop is replaced by a consumer thread
+    woken up the same way) for every combination of snake length and tick rate (ticks/s, 0 for as fast as possible) :
+        - "queue" : the `queue.Queue` of `original.py`
+        - "mailbox" : the coalescing `Mailbox` of `original.py --mailbox`
+        - "locks" : the locks and semaphores of `alternative.py` (`SharedState`)
+        - "snapshot" : the single-writer snapshots of `alternative.py --snapshot` (`SnapshotState`)
+        - "asyncio" : the `asyncio.Queue` of `asynchronous.py`, with the game and the consumer as coroutines of a single thread
+    The snake follows a Hamiltonian cycle without prey, so its length is constant. Each run reports the ticks per second,
+    the producer to consumer latency percentiles, the tick jitter (i.e. the lateness of each tick, at a fixed rate), the time waited for locks, the queue depth (i.e. items pending at each wakeup),
+    the CPU time per tick and the memory per body segment (i.e. of the game and the consumer state, from `tracemalloc`).
+    With --json, the results are also written as a JSON document along with the configuration and the platform,
+    so that they can be compared between commits.
+
+    The "broadcast" benchmark streams a game (see `ipcGame()`) at 100 ticks/s to increasing numbers of local spectators
+    (see `broadcast.py`), each reading in a thread of its own, along with a stalled subscriber which never reads.
+    It reports the CPU time of a tick on the game thread, the tick jitter, the tick to spectator latency, the lines dropped
+    for the stalled subscriber, and whether every spectator ends with the same body as the game.
+    It first checks that a spectator lagging behind a snake of 2000 segments is sent a whole state in place of the
+    lines dropped and catches up with the game, and reports the largest CPU time of a tick meanwhile (see `checkBroadcastLag()`).
+
+    The "fork" benchmark measures the cost of saving, restoring and forking games of increasing length (see --lengths) :
+    `Game.toBytes()` and `Game.fromBytes()` against `pickle`, and `Game.fork()` against `copy.deepcopy()`,
+    along with the size of the saved state against the pickled game.
+
+    The "arena" benchmark measures the cost of a tick of an arena of bots (see `arena.py`) on a 600 x 600 cell board,
+    for increasing numbers of snakes and spawn lengths. The cost per snake should stay flat as the bodies grow.
+
+    The "autopilot" benchmark plays headless games steered by the autopilot (see `autopilot.py`) on boards of increasing size,
+    and reports the score, the planning time percentiles per tick against the budget, and how often the path was
+    reused, repaired or planned again. Since paths are planned with the tick each body cell is freed, they are seldom
+    blocked in these games, so it first checks the repair on a game built to block the path (see `checkAutopilotRepair()`).
+"""
+
+import argparse, asyncio, random, threading, time
+from collections import deque
+
+from engine import SNAKE_ICON_WIDTH, KEYFRAME_INTERVAL, DIRECTIONS, Game, PolylineBuffer, SnakeBuffer, TickScheduler
+
+IPC_DESIGNS = ("queue", "mailbox", "locks", "snapshot", "asyncio")
+
+def hamiltonianCycle(game: Game) -> list:
+    """
+        This function returns the coordinates of a Hamiltonian cycle on the grid
+        the snake moves on (i.e. steps of snakeIconWidth starting from the initial head).
+        The number of rows must be even for the serpentine to close.
+    """
+    step = game.snakeIconWidth
+    headX, headY = game.snakeCoordinates[-1]
+    columns = [x for x in range(headX % step, game.width, step) if x > 0]
+    rows = [y for y in range(headY % step, game.height, step) if y > 0]
+    rows = rows[:len(rows) - len(rows) % 2]
+
+    cycle = [(columns[0], y) for y in rows] # Down The First Column
+    for i, y in enumerate(reversed(rows)): # Serpentine Back Up The Other Columns
+        ordered = columns[1:] if i % 2 == 0 else columns[:0:-1]
+        cycle.extend((x, y) for x in ordered)
+    return cycle
+
+def directionTo(point: tuple, nextPoint: tuple) -> str:
+    """
+        This function returns the direction leading from a point to its neighbour.
+    """
+    if nextPoint[0] < point[0]:
+        return "Left"
+    elif nextPoint[0] > point[0]:
+        return "Right"
+    elif nextPoint[1] < point[1]:
+        return "Up"
+    return "Down"
+
+def benchmarkLength(ticks: int, width: int, height: int) -> list:
+    """
+        This function times `ticks` moves of snakes of increasing length on a board
+        of the given size, and returns a list of (length, nanoseconds per tick) tuples.
+    """
+    game = Game(width, height, seed = 0)
+    cycle = hamiltonianCycle(game)
+    turns = {point: directionTo(point, cycle[(i + 1) % len(cycle)]) for i, point in enumerate(cycle)}
+    lengths = sorted({5, 50, 200, len(cycle) // 2, len(cycle) - 1})
+
+    results = []
+    for length in lengths:
+        game = Game(width, height, seed = 0, preyCount = 0) # No Prey (Constant Length)
+        game.setSnakeCoordinates(cycle[:length])
+        game.direction = turns[cycle[length - 1]]
+
+        start = time.perf_counter_ns()
+        for _ in range(ticks):
+            game.step(turns[game.snakeCoordinates[-1]])
+        elapsed = time.perf_counter_ns() - start
+        assert game.gameNotOver
+        results.append((length, elapsed / ticks))
+    return results
+
+def benchmarkBatch(games: int, ticks: int, width: int, height: int) -> tuple:
+    """
+        This function times `ticks` lockstep ticks of a batch of games, and the same number
+        of game ticks stepped one scalar game at a time.
+        It returns the (batched, scalar) throughputs in game ticks per second.
+    """
+    from batch import BatchGame, referenceGame
+
+    generator = random.Random(0)
+    directions = [[generator.randrange(-1, len(DIRECTIONS)) for _ in range(games)] for _ in range(64)]
+
+    batch = BatchGame(games, width, height, seed = 0)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        batch.step(directions[tick % 64])
+    batched = games * ticks / (time.perf_counter() - start)
+
+    scalars = [referenceGame(i, width, height) for i in range(games)]
+    start = time.perf_counter()
+    for tick in range(ticks):
+        row = directions[tick % 64]
+        for i, game in enumerate(scalars):
+            if not game.step(DIRECTIONS[row[i]] if row[i] >= 0 else None):
+                scalars[i] = referenceGame(i, width, height)
+    scalar = games * ticks / (time.perf_counter() - start)
+    return batched, scalar
+
+def benchmarkContention(seconds: float, width: int, height: int) -> dict:
+    """
+        This function runs a game thread and a reader thread for `seconds` with each state sharing scheme,
+        and returns their metrics by scheme name.
+    """
+    from alternative import SharedState, SnapshotState
+    from rollout import greedyPolicy
+
+    def write(state, stop: threading.Event, metrics: dict) -> None:
+        game = Game(width, height, seed = 0)
+        game.attach(state)
+        while not stop.is_set():
+            if not game.step(greedyPolicy(game)):
+                game = Game(width, height, seed = game.ticks)
+                game.attach(state)
+            metrics["ticks"] += 1
+
+    def readLocks(state: SharedState, stop: threading.Event, metrics: dict) -> None:
+        length, score = 0, 0
+        while not stop.is_set():
+            read = False
+            if state.full["move"].acquire(blocking = False):
+                start = time.perf_counter()
+                state.locks["move"].acquire()
+                metrics["lock wait s"] += time.perf_counter() - start
+                length = state.snake.length
+                state.locks["move"].release()
+                read = True
+            if state.full["score"].acquire(blocking = False):
+                start = time.perf_counter()
+                state.locks["score"].acquire()
+                metrics["lock wait s"] += time.perf_counter() - start
+                score = state.score
+                state.locks["score"].release()
+                read = True
+            if read:
+                metrics["reads"] += 1
+                metrics["torn"] += (length - 5 != score)
+            time.sleep(0) # Yield To The Game Thread Between Polls
+
+    def readSnapshots(state: SnapshotState, stop: threading.Event, metrics: dict) -> None:
+        version = 0
+        while not stop.is_set():
+            frame = state.frame
+            if frame.version != version:
+                version = frame.version
+                metrics["reads"] += 1
+                metrics["torn"] += (frame.snakeLength - 5 != frame.score)
+            time.sleep(0) # Yield To The Game Thread Between Polls
+
+    results = {}
+    for name, state, read in (("locks", SharedState(), readLocks), ("snapshot", SnapshotState(), readSnapshots)):
+        metrics = {"ticks": 0, "reads": 0, "torn": 0, "lock wait s": 0.0}
+        stop = threading.Event()
+        threads = [threading.Thread(target = write, args = (state, stop, metrics)),
+                   threading.Thread(target = read, args = (state, stop, metrics))]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        metrics["ticks/s"] = metrics.pop("ticks") / seconds
+        metrics["reads/s"] = metrics.pop("reads") / seconds
+        results[name] = metrics
+    return results
+
+def benchmarkViewport(ticks: int, width: int, height: int) -> list:
+    """
+        This function times `ticks` frames of a viewport of the given size following snakes of increasing length
+        on a 10000 x 10000 cell board, and returns a list of
+        (length, segments on screen, culled ns per frame, culled worst ns, full ns per frame) tuples.
+        The body is laid out as a serpentine of rows of 1000 cells, and the head moves away from it.
+        Every KEYFRAME_INTERVAL ticks, the move is replaced by a keyframe of the whole body as the game sends it,
+        so the worst frame of the culled buffer is the cost of a keyframe.
+    """
+    from viewport import Camera, CulledSnakeBuffer
+
+    step = SNAKE_ICON_WIDTH
+    boardSize = 10000 * step
+    results = []
+    for length in (1000, 10000, 100000):
+        body = []
+        for row in range(-(-length // 1000)):
+            xs = range(step, 1001 * step, step) if row % 2 == 0 else range(1000 * step, 0, -step)
+            body.extend((x, (row + 1) * step) for x in xs)
+        body = body[:length]
+        headX, headY = body[-1]
+        moves = []
+        current = deque(body)
+        for i in range(ticks):
+            current.popleft()
+            current.append((headX + 2 * step * (1 + i), headY + step)) # Away From The Body
+            if (i + 1) % KEYFRAME_INTERVAL == 0:
+                moves.append({"keyframe": tuple(current)})
+            else:
+                moves.append({"move": (*current[-1], True)})
+
+        camera = Camera(width, height, boardSize, boardSize)
+        snake = CulledSnakeBuffer(max(width, height))
+        snake.apply({"keyframe": body})
+        visible = 0
+        worst = 0
+        start = time.perf_counter_ns()
+        for move in moves:
+            frameStart = time.perf_counter_ns()
+            snake.apply(move)
+            camera.follow(*snake.head())
+            for run in snake.visibleRuns(camera.view(step)):
+                visible += len(camera.toCanvas(run)) // 2
+            worst = max(worst, time.perf_counter_ns() - frameStart)
+        culled = (time.perf_counter_ns() - start) / ticks
+
+        snake = SnakeBuffer()
+        snake.apply({"keyframe": body})
+        start = time.perf_counter_ns()
+        for move in moves:
+            snake.apply(move)
+            tuple(snake.points) # Arguments Of A Single canvas.coords() Call
+        full = (time.perf_counter_ns() - start) / ticks
+        results.append((length, visible / ticks, culled, worst, full))
+    return results
+
+def benchmarkPolyline(ticks: int) -> list:
+    """
+        This function times `ticks` frames of the canvas line of snakes of increasing length
+        following the Hamiltonian cycle of a 100 x 100 cell board, and returns a list of
+        (length, points per frame, full ns per frame, corners ns per frame) tuples.
+    """
+    from tkinter import Tcl
+
+    tcl = Tcl()
+    step = SNAKE_ICON_WIDTH
+    game = Game(100 * step, 100 * step, seed = 0, preyCount = 0)
+    cycle = hamiltonianCycle(game)
+    results = []
+    for length in (100, 1000, 5000, len(cycle) - 1):
+        moves = [{"move": (*cycle[(length + i) % len(cycle)], True)} for i in range(ticks)]
+        timings = []
+        for snake in (SnakeBuffer(), PolylineBuffer()):
+            snake.apply({"keyframe": cycle[:length]})
+            points = 0
+            start = time.perf_counter_ns()
+            for move in moves:
+                snake.apply(move)
+                points += len(tcl.call("list", *snake.points)) // 2 # Arguments Of canvas.coords()
+            timings.append((time.perf_counter_ns() - start) / ticks)
+        results.append((length, points / ticks, *timings))
+    return results
+
+def benchmarkRaster(ticks: int, games: int) -> tuple:
+    """
+        This function times `ticks` frames of a `Rasterizer` following snakes of increasing length along the
+        Hamiltonian cycle of a 100 x 100 cell board, and returns a list of
+        (length, dirty ns per frame, full ns per frame) tuples, along with the frames per second
+        of `renderBatch()` for a batch of the given number of games.
+    """
+    from batch import BatchGame
+    from raster import Rasterizer, renderBatch
+
+    step = SNAKE_ICON_WIDTH
+    game = Game(100 * step, 100 * step, seed = 0, preyCount = 0)
+    cycle = hamiltonianCycle(game)
+    results = []
+    for length in (100, 1000, 5000):
+        moves = [{"move": (*cycle[(length + i) % len(cycle)], True)} for i in range(ticks)]
+        rasterizer = Rasterizer(game.width, game.height, step)
+        rasterizer({"keyframe": cycle[:length]})
+        start = time.perf_counter_ns()
+        for move in moves:
+            rasterizer(move)
+        dirty = (time.perf_counter_ns() - start) / ticks
+        whole = (0, 0, game.width, game.height)
+        start = time.perf_counter_ns()
+        for move in moves[:max(1, ticks // 100)]:
+            rasterizer.redraw(whole)
+        full = (time.perf_counter_ns() - start) / max(1, ticks // 100)
+        results.append((length, dirty, full))
+
+    batch = BatchGame(games, seed = 0)
+    frames = renderBatch(batch)
+    start = time.perf_counter()
+    for _ in range(ticks // 10):
+        batch.step()
+        renderBatch(batch, out = frames)
+    batchRate = games * (ticks // 10) / (time.perf_counter() - start)
+    return results, batchRate
+
+def ipcGame(length: int) -> tuple:
+    """
+        This function returns a game without prey whose snake of the given length follows a Hamiltonian cycle
+        on the smallest square board fitting it, along with the direction to take from each cell of the cycle.
+    """
+    side = 4
+    while True:
+        size = side * SNAKE_ICON_WIDTH + 20
+        game = Game(size, size, seed = 0, preyCount = 0)
+        cycle = hamiltonianCycle(game)
+        if len(cycle) > length:
+            break
+        side += 2
+    turns = {point: directionTo(point, cycle[(i + 1) % len(cycle)]) for i, point in enumerate(cycle)}
+    game.setSnakeCoordinates(cycle[:length])
+    game.direction = turns[cycle[length - 1]]
+    return game, turns
+
+def ipcChannel(design: str) -> tuple:
+    """
+        This function returns the (observer, consume, depth, wakeup) of an IPC design.
+        The observer is attached to the game, and sets the wakeup event after each value produced.
+        consume(metrics) reads the state as the gui does (i.e. including the canvas coordinates of the body),
+        and returns the time produced of the latest move read, or None.
+        depth() returns the number of items pending.
+    """
+    from original import Mailbox
+    from alternative import SharedState, SnapshotState
+
+    wakeup = threading.Event()
+    if design in ("queue", "mailbox"):
+        import queue
+        channel = queue.Queue() if design == "queue" else Mailbox()
+        snake = PolylineBuffer()
+        def observer(task: dict) -> None:
+            channel.put((time.perf_counter(), task))
+            wakeup.set()
+        def consume(metrics: dict) -> float:
+            movedAt = None
+            try:
+                while True:
+                    producedAt, task = channel.get_nowait()
+                    if snake.apply(task):
+                        movedAt = producedAt
+                    channel.task_done()
+            except queue.Empty:
+                if movedAt is not None:
+                    tuple(snake.points) # Arguments Of canvas.coords()
+            return movedAt
+        return observer, consume, channel.qsize, wakeup
+
+    if design == "locks":
+        state = SharedState()
+        state.wakeup = wakeup.set
+        def consume(metrics: dict) -> float:
+            movedAt = None
+            if state.full["move"].acquire(blocking = False):
+                start = time.perf_counter()
+                state.locks["move"].acquire()
+                metrics["lock wait s"] += time.perf_counter() - start
+                tuple(state.snake.points) # canvas.coords() Inside The Critical Section
+                movedAt = state.moveProducedAt
+                state.locks["move"].release()
+            for name in ("prey", "score"):
+                if state.full[name].acquire(blocking = False):
+                    start = time.perf_counter()
+                    state.locks[name].acquire()
+                    metrics["lock wait s"] += time.perf_counter() - start
+                    state.locks[name].release()
+            return movedAt
+        return state, consume, lambda: state.full["move"]._value, wakeup # Pending Permits
+
+    if design == "snapshot":
+        state = SnapshotState()
+        state.wakeup = wakeup.set
+        drawn = [0] # Version Of The Last Frame Read
+        def consume(metrics: dict) -> float:
+            frame = state.frame
+            if frame.version == drawn[0]:
+                return None
+            drawn[0] = frame.version
+            tuple(frame.snakePoints)
+            return frame.producedAt
+        return state, consume, lambda: state.frame.version - drawn[0], wakeup
+
+    if design == "asyncio":
+        channel = asyncio.Queue()
+        wakeup = asyncio.Event() # Only Awaited On The Thread Of The Event Loop
+        snake = PolylineBuffer()
+        def observer(task: dict) -> None:
+            channel.put_nowait((time.perf_counter(), task))
+            wakeup.set()
+        def consume(metrics: dict) -> float:
+            movedAt = None
+            try:
+                while True:
+                    producedAt, task = channel.get_nowait()
+                    if snake.apply(task):
+                        movedAt = producedAt
+                    channel.task_done()
+            except asyncio.QueueEmpty:
+                if movedAt is not None:
+                    tuple(snake.points) # Arguments Of canvas.coords()
+            return movedAt
+        return observer, consume, channel.qsize, wakeup
+
+    raise ValueError(f"unknown IPC design: {design}")
+
+def ipcMemory(design: str, length: int) -> float:
+    """
+        This function returns the memory (bytes) allocated per body segment by a game and the state of an IPC design,
+        as the difference between a snake of the given length and a single segment on the same board.
+    """
+    import tracemalloc
+
+    def allocated(game: Game) -> int:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        observer, consume, depth, wakeup = ipcChannel(design)
+        game.setSnakeCoordinates(list(game.snakeCoordinates)) # Indices Allocated While Traced
+        game.attach(observer)
+        consume({"lock wait s": 0.0})
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return size
+
+    game, turns = ipcGame(length)
+    if length < 2:
+        return None
+    short = Game(game.width, game.height, seed = 0, preyCount = 0)
+    short.setSnakeCoordinates([game.snakeCoordinates[-1]])
+    return (allocated(game) - allocated(short)) / (length - 1)
+
+def benchmarkIpc(design: str, length: int, rate: float, seconds: float) -> dict:
+    """
+        This function runs a game thread producing ticks at the given rate (ticks/s, 0 for as fast as possible)
+        and a consumer thread reading them through an IPC design for `seconds`, and returns its metrics.
+        The "asyncio" design runs them as coroutines of an event loop on the calling thread instead.
+    """
+    from instrumentation import LatencyRecorder
+
+    game, turns = ipcGame(length)
+    observer, consume, depth, wakeup = ipcChannel(design)
+    latency = LatencyRecorder(window = 100000)
+    metrics = {"ticks": 0, "lock wait s": 0.0, "producer cpu s": 0.0}
+    depths = []
+    producers = [] # Scheduler Of The Producer (None Without A Rate)
+    stop = threading.Event()
+
+    def produce() -> None:
+        game.attach(observer)
+        scheduler = TickScheduler(1 / rate) if rate else None
+        producers.append(scheduler)
+        start = time.thread_time()
+        while not stop.is_set():
+            for _ in range(scheduler.wait() if scheduler else 1):
+                game.step(turns[game.snakeCoordinates[-1]])
+                metrics["ticks"] += 1
+        metrics["producer cpu s"] = time.thread_time() - start
+
+    def consumeLoop() -> None:
+        while not stop.is_set():
+            if not wakeup.wait(0.05):
+                continue
+            wakeup.clear() # Values Produced From Now On Wake Up Again
+            depths.append(depth())
+            movedAt = consume(metrics)
+            if movedAt is not None:
+                latency.record(time.perf_counter() - movedAt)
+
+    async def produceAsync() -> None:
+        game.attach(observer)
+        scheduler = TickScheduler(1 / rate) if rate else None
+        producers.append(scheduler)
+        while not stop.is_set():
+            for _ in range(await scheduler.waitAsync() if scheduler else 1):
+                start = time.thread_time()
+                game.step(turns[game.snakeCoordinates[-1]])
+                metrics["producer cpu s"] += time.thread_time() - start # Same Thread As The Consumer
+                metrics["ticks"] += 1
+            if not scheduler:
+                await asyncio.sleep(0) # Yield To The Consumer
+
+    async def consumeAsync() -> None:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(wakeup.wait(), 0.05)
+            except asyncio.TimeoutError:
+                continue
+            wakeup.clear()
+            depths.append(depth())
+            movedAt = consume(metrics)
+            if movedAt is not None:
+                latency.record(time.perf_counter() - movedAt)
+
+    async def runAsync() -> None:
+        tasks = [asyncio.create_task(produceAsync()), asyncio.create_task(consumeAsync())]
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    if design == "asyncio":
+        asyncio.run(runAsync())
+    else:
+        threads = [threading.Thread(target = produce), threading.Thread(target = consumeLoop)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+
+    ticks = max(1, metrics["ticks"])
+    summary = latency.summary()
+    jitter = producers[0].metrics() if producers and producers[0] else None
+    return {
+        "design": design,
+        "length": length,
+        "rate": rate,
+        "ticks/s": metrics["ticks"] / elapsed,
+        "reads": summary["count"],
+        "latency mean ms": summary["mean ms"],
+        "latency p50 ms": summary["p50 ms"],
+        "latency p99 ms": summary["p99 ms"],
+        "latency max ms": summary["max ms"],
+        "jitter mean ms": 1000 * jitter["mean jitter"] if jitter else None,
+        "jitter max ms": 1000 * jitter["max jitter"] if jitter else None,
+        "lock wait s": metrics["lock wait s"] if design == "locks" else None,
+        "depth mean": sum(depths) / max(1, len(depths)),
+        "depth max": max(depths, default = 0),
+        "cpu us/tick": 1e6 * cpu / ticks,
+        "producer cpu us/tick": 1e6 * metrics["producer cpu s"] / ticks,
+        "bytes/segment": ipcMemory(design, length),
+    }
+
+def benchmarkBroadcast(subscribers: int, length: int, seconds: float, rate: float = 100.0) -> dict:
+    """
+        This function streams a game with a snake of the given length at the given tick rate to `subscribers`
+        spectators and a stalled subscriber over a Unix socket for the given duration, and returns its metrics.
+    """
+    import os, socket, tempfile
+    from broadcast import Broadcaster, Spectator
+    from instrumentation import LatencyRecorder
+
+    game, turns = ipcGame(length)
+    address = f"unix:{os.path.join(tempfile.gettempdir(), f'snake-broadcast-{os.getpid()}.sock')}"
+    broadcaster = Broadcaster(game, address, sendBuffer = 1 << 14) # The Stalled Subscriber Fills It Quickly
+    spectators = [Spectator(address) for _ in range(subscribers)]
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(broadcaster.address) # Never Reads
+    latency = LatencyRecorder(window = 100000)
+    def watch(spectator: Spectator) -> None:
+        while spectator.receive():
+            latency.record(spectator.latency)
+    threads = [threading.Thread(target = watch, args = (spectator,), daemon = True) for spectator in spectators]
+    for thread in threads:
+        thread.start()
+    while broadcaster.metrics()["subscribers"] < subscribers + 1: # Accepted By The Server Thread
+        time.sleep(0.001)
+
+    scheduler = TickScheduler(1 / rate)
+    tickTime = 0.0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for _ in range(scheduler.wait()):
+            start = time.thread_time() # CPU Of The Game Thread Only (i.e. Not The Server And Spectator Threads)
+            game.step(turns[game.snakeCoordinates[-1]])
+            tickTime += time.thread_time() - start
+    time.sleep(0.2) # Spectators Catch Up
+
+    body = list(game.snakeCoordinates)
+    consistent = all(list(zip(*[iter(spectator.snake.points)] * 2)) == body for spectator in spectators)
+    metrics = broadcaster.metrics()
+    broadcaster.close()
+    for thread in threads:
+        thread.join()
+    for spectator in spectators:
+        spectator.close()
+    stalled.close()
+    summary = latency.summary()
+    return {"subscribers": subscribers, "length": length, "ticks": game.ticks,
+            "tick cpu us": 1e6 * tickTime / max(1, game.ticks),
+            "jitter max ms": 1000 * scheduler.maxJitter,
+            "latency p50 ms": summary["p50 ms"], "latency p99 ms": summary["p99 ms"],
+            "lines": metrics["lines"], "states": metrics["states"], "dropped": metrics["dropped"],
+            "consistent": consistent}
+
+def checkBroadcastLag(length: int, maxPending: int = 16, maxTicks: int = 100000) -> dict:
+    """
+        This function plays a game with a snake of the given length to a spectator which does not read
+        until its pending lines overflow maxPending (i.e. once the kernel buffers are full too), then reads
+        until it has caught up. It asserts that the spectator was sent a whole state in place of the lines dropped,
+        and ends with the same body as the game. It returns the ticks played, the lines dropped,
+        the states received and the largest CPU time of a tick on the game thread.
+    """
+    import os, tempfile
+    from broadcast import Broadcaster, Spectator
+
+    game, turns = ipcGame(length)
+    address = f"unix:{os.path.join(tempfile.gettempdir(), f'snake-lag-{os.getpid()}.sock')}"
+    broadcaster = Broadcaster(game, address, maxPending = maxPending, sendBuffer = 1 << 14)
+    spectator = Spectator(address, timeout = 10.0)
+    while broadcaster.metrics()["subscribers"] < 1: # Accepted By The Server Thread
+        time.sleep(0.001)
+
+    tickTime = 0.0
+    def step() -> None:
+        nonlocal tickTime
+        start = time.thread_time()
+        game.step(turns[game.snakeCoordinates[-1]])
+        tickTime = max(tickTime, time.thread_time() - start)
+        time.sleep(0.0001) # Lets The Server Thread Keep Up
+    while broadcaster.metrics()["dropped"] == 0 and game.ticks < maxTicks: # Stalled
+        step()
+    for _ in range(maxPending): # Lagging Behind The State Sent
+        step()
+    while spectator.tick != game.ticks:
+        assert spectator.receive(), "the broadcast was closed"
+
+    metrics = broadcaster.metrics()
+    consistent = list(zip(*[iter(spectator.snake.points)] * 2)) == list(game.snakeCoordinates)
+    broadcaster.close()
+    spectator.close()
+    assert metrics["dropped"] > 0, "the spectator never lagged"
+    assert spectator.states >= 2, "no whole state was sent in place of the lines dropped"
+    assert consistent, "the spectator does not have the body of the game"
+    return {"length": length, "ticks": game.ticks, "dropped": metrics["dropped"], "states": spectator.states,
+            "tick cpu max us": 1e6 * tickTime}
+
+def benchmarkFork(length: int, repeats: int) -> dict:
+    """
+        This function times saving, restoring and forking a game whose snake has the given length,
+        and returns the microseconds per operation and the size of the saved state in bytes.
+    """
+    import copy, pickle
+
+    game = ipcGame(length)[0]
+    def timed(operation) -> float:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            operation()
+        return 1e6 * (time.perf_counter() - start) / repeats
+
+    data, pickled = game.toBytes(), pickle.dumps(game)
+    return {
+        "length": length,
+        "toBytes us": timed(game.toBytes),
+        "fromBytes us": timed(lambda: Game.fromBytes(data)),
+        "pickle.dumps us": timed(lambda: pickle.dumps(game)),
+        "pickle.loads us": timed(lambda: pickle.loads(pickled)),
+        "fork us": timed(game.fork),
+        "deepcopy us": timed(lambda: copy.deepcopy(game)),
+        "bytes": len(data),
+        "pickled bytes": len(pickled),
+    }
+
+def benchmarkArena(ticks: int) -> list:
+    """
+        This function times `ticks` ticks of arenas of bots which respawn when they die, once their snakes
+        have grown, and returns a list of (snakes, spawn length, mean length, nanoseconds per snake per tick) tuples.
+    """
+    from arena import Arena
+
+    results = []
+    for snakes in (10, 100, 1000):
+        for spawnLength in (5, 50, 500):
+            arena = Arena(600 * SNAKE_ICON_WIDTH, 600 * SNAKE_ICON_WIDTH, snakes = snakes, seed = 0,
+                          spawnLength = spawnLength, respawn = True)
+            for _ in range(spawnLength): # Grown
+                arena.step()
+            start = time.perf_counter_ns()
+            for _ in range(ticks):
+                arena.step()
+            elapsed = time.perf_counter_ns() - start
+            meanLength = sum(len(snake.body) for snake in arena.snakes) / snakes
+            results.append((snakes, spawnLength, meanLength, elapsed / ticks / snakes))
+    return results
+
+def checkAutopilotRepair() -> int:
+    """
+        This function plays a game in which the cached path of the autopilot is blocked on purpose, and asserts
+        that the path is repaired (i.e. not planned again) and followed to the prey without any collision.
+        The body stands across the board in a single column, so the only short path to the prey runs through
+        the body cell freed on the very tick the head enters it. A second prey is then placed on the path,
+        so the snake grows on the way and that cell is freed a tick later than planned.
+        It returns the number of cells of the repaired path.
+    """
+    from autopilot import Autopilot
+
+    game = Game(300, 300, seed = 0, preyCount = 0)
+    cell = lambda column, row: (game.cellOrigin[0] + column * SNAKE_ICON_WIDTH, game.cellOrigin[1] + row * SNAKE_ICON_WIDTH)
+    def placePrey(preyCell: tuple) -> None:
+        half = game.preyIconWidth // 2
+        game.prey[preyCell] = (preyCell[0] - half, preyCell[1] - half, preyCell[0] + half, preyCell[1] + half)
+        game.coverCells(preyCell)
+
+    game.setSnakeCoordinates([cell(3, row) for row in range(20)] + [cell(2, 19), cell(2, 18)]) # Tail At The Top
+    game.direction = "Up"
+    placePrey(cell(4, 9))
+    autopilot = Autopilot(game, budget = 1.0) # Plans On Attach
+    assert autopilot.target == cell(4, 9) and cell(3, 9) in autopilot.path, "unexpected planned path"
+    placePrey(cell(2, 14)) # On The Path (i.e. The Tail Stays In Place For One More Tick)
+
+    pathLength = 0
+    while cell(4, 9) in game.prey:
+        assert game.step(), "the snake collided"
+        if autopilot.counts["repaired"] and not pathLength:
+            pathLength = len(autopilot.path)
+    assert autopilot.counts["repaired"] == 1, "the path was not repaired"
+    assert game.score == 2 and autopilot.counts["replanned"] == 2, "the path was not followed" # Planned Again For The Next Prey Only
+    return pathLength
+
+def benchmarkAutopilot(ticks: int) -> list:
+    """
+        This function plays `ticks` ticks of games steered by the autopilot on square boards of increasing size,
+        and returns a list of (cells per side, score, autopilot metrics) tuples.
+    """
+    import gc
+    from autopilot import Autopilot
+
+    results = []
+    for side in (20, 100, 1000):
+        game = Game(side * SNAKE_ICON_WIDTH, side * SNAKE_ICON_WIDTH, seed = 0)
+        gc.freeze() # Board Indices Out Of Full Collections
+        autopilot = Autopilot(game)
+        while game.ticks < ticks and game.step():
+            pass
+        results.append((side, game.score, autopilot.metrics()))
+        gc.unfreeze()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark the headless snake game engine.")
+    parser.add_argument("benchmark", nargs = "?", choices = ("length", "batch", "contention", "viewport", "polyline", "raster", "ipc", "broadcast", "fork", "arena", "autopilot"), default = "length")
+    parser.add_argument("--ticks", type = int, default = 100000, help = "ticks timed per measurement")
+    parser.add_argument("--games", type = int, default = 1000, help = "games stepped in lockstep (batch, raster)")
+    parser.add_argument("--seconds", type = float, default = 3.0, help = "duration of each measurement (contention, ipc, broadcast)")
+    parser.add_argument("--width", type = int, default = 500, help = "board width")
+    parser.add_argument("--height", type = int, default = 300, help = "board height")
+    parser.add_argument("--designs", default = ",".join(IPC_DESIGNS), help = "IPC designs to compare (ipc)")
+    parser.add_argument("--lengths", default = "5,500,5000", help = "snake lengths (ipc, fork)")
+    parser.add_argument("--subscribers", default = "1,10,50", help = "numbers of spectators (broadcast)")
+    parser.add_argument("--rates", default = "0,100", help = "tick rates in ticks/s, 0 for as fast as possible (ipc)")
+    parser.add_argument("--json", default = None, help = "file to write the results to as JSON (ipc)")
+    args = parser.parse_args()
+
+    if args.benchmark == "length":
+        print(f"{'length':>8} {'ns/tick':>10}")
+        for length, nanoseconds in benchmarkLength(args.ticks, args.width, args.height):
+            print(f"{length:>8} {nanoseconds:>10.0f}")
+    elif args.benchmark == "batch":
+        ticks = max(1, args.ticks // args.games)
+        batched, scalar = benchmarkBatch(args.games, ticks, args.width, args.height)
+        print(f"batched : {batched:>12.0f} game ticks/s")
+        print(f"scalar  : {scalar:>12.0f} game ticks/s")
+    elif args.benchmark == "contention":
+        for name, metrics in benchmarkContention(args.seconds, args.width, args.height).items():
+            print(f"{name:>8} : " + ", ".join(f"{key} {value:.6g}" for key, value in metrics.items()))
+    elif args.benchmark == "viewport":
+        print(f"{'length':>8} {'on screen':>10} {'culled ns/frame':>16} {'culled worst ns':>16} {'full ns/frame':>14}")
+        for length, visible, culled, worst, full in benchmarkViewport(min(args.ticks, 2000), args.width, args.height):
+            print(f"{length:>8} {visible:>10.0f} {culled:>16.0f} {worst:>16.0f} {full:>14.0f}")
+    elif args.benchmark == "polyline":
+        print(f"{'length':>8} {'corners':>8} {'full ns/frame':>14} {'corners ns/frame':>17}")
+        for length, points, full, corners in benchmarkPolyline(min(args.ticks, 2000)):
+            print(f"{length:>8} {points:>8.0f} {full:>14.0f} {corners:>17.0f}")
+    elif args.benchmark == "raster":
+        results, batchRate = benchmarkRaster(min(args.ticks, 2000), args.games)
+        print(f"{'length':>8} {'dirty ns/frame':>15} {'full ns/frame':>14}")
+        for length, dirty, full in results:
+            print(f"{length:>8} {dirty:>15.0f} {full:>14.0f}")
+        print(f"batch of {args.games} : {batchRate:.0f} frames/s (game ticks and frames)")
+    elif args.benchmark == "broadcast":
+        result = checkBroadcastLag(2000)
+        print("lagging spectator : " + ", ".join(f"{key} {value:.6g}" if isinstance(value, float) else f"{key} {value}"
+                                                 for key, value in result.items()))
+        for subscribers in map(int, args.subscribers.split(",")):
+            result = benchmarkBroadcast(subscribers, 500, args.seconds)
+            print(", ".join(f"{key} {value:.6g}" if isinstance(value, float) else f"{key} {value}"
+                            for key, value in result.items()))
+    elif args.benchmark == "fork":
+        for length in map(int, args.lengths.split(",")):
+            result = benchmarkFork(length, max(1, min(1000, args.ticks // length)))
+            print(", ".join(f"{key} {value:.6g}" if isinstance(value, float) else f"{key} {value}"
+                            for key, value in result.items()))
+    elif args.benchmark == "arena":
+        print(f"{'snakes':>8} {'spawn length':>13} {'mean length':>12} {'ns/snake/tick':>14}")
+        for snakes, spawnLength, meanLength, nanoseconds in benchmarkArena(min(args.ticks, 500)):
+            print(f"{snakes:>8} {spawnLength:>13} {meanLength:>12.1f} {nanoseconds:>14.0f}")
+    elif args.benchmark == "autopilot":
+        print(f"repair : blocked path repaired and followed to the prey ({checkAutopilotRepair()} cells left)")
+        for side, score, metrics in benchmarkAutopilot(min(args.ticks, 20000)):
+            print(f"{side}x{side} cells : score {score}, " + ", ".join(
+                f"{key} {value:.3g}" if isinstance(value, float) else f"{key} {value}" for key, value in metrics.items()))
+    elif args.benchmark == "ipc":
+        import json, os, platform, sys
+
+        results = []
+        for length in map(int, args.lengths.split(",")):
+            for rate in map(float, args.rates.split(",")):
+                for design in args.designs.split(","):
+                    result = benchmarkIpc(design, length, rate, args.seconds)
+                    results.append(result)
+                    print(", ".join(f"{key} {value:.6g}" if isinstance(value, float) else f"{key} {value}"
+                                    for key, value in result.items()))
+        if args.json:
+            document = {
+                "benchmark": "ipc",
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "platform": {"python": sys.version.split()[0], "implementation": platform.python_implementation(),
+                             "system": platform.platform(), "cpus": os.cpu_count()},
+                "config": {"seconds": args.seconds, "designs": args.designs.split(","),
+                           "lengths": [int(length) for length in args.lengths.split(",")],
+                           "rates": [float(rate) for rate in args.rates.split(",")]},
+                "results": results,
+            }
+            with open(args.json, "w") as file:
+                json.dump(document, file, indent = 2)
@@ -0,0 +1,393 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This program streams a running game of the headless game engine (see `engine.py`) to local spectators.
+
+    Usage : python broadcast.py ADDRESS [--seconds S]
+
+    The `Broadcaster` class is attached to a game as an observer, and serves any number of subscribers on a Unix socket
+    (e.g. unix:/tmp/snake.sock) or a TCP socket on the loopback interface (e.g. 127.0.0.1:7000).
+    The tasks of each tick are serialized once, as a line of JSON {"tick": ..., "at": ..., "tasks": [...]} (i.e. the
+    "move", "keyframe", "prey", "captured", "score" and "game_over" tasks of the `Game` class), and the same bytes
+    are queued for every subscriber. A subscriber first receives the whole state of the game, as a line
+    {"tick": ..., "at": ..., "state": {"snake": [...], "prey": [...], "score": ..., "gameOver": ...}}.
+
+    The game thread never serializes nor writes anything : it only appends the tasks of the tick to a journal,
+    and wakes up the server thread. The server thread serializes each tick of the journal, applies it to a mirror
+    of the game state (i.e. the body, prey, score and whether the game is over, as of that tick), and appends the line
+    to a bounded buffer per subscriber, which it sends with non-blocking writes. When the buffer of a slow subscriber
+    is full, its pending lines are dropped and replaced by a line of the whole state, built from the mirror on the
+    server thread (i.e. it skips to the latest tick). So the game pays O(1) per tick whatever the number of subscribers,
+    the length of the snake or how far they lag, and a spectator never stalls the superloop.
+    The "at" field is the time.monotonic() of the tick, so that local subscribers can measure their latency.
+
+    The `Spectator` class is a subscriber which rebuilds the state of the game from the stream (e.g. for dashboards
+    and replay tools). From the command line, it prints the tick, score and length of the snake every second.
+"""
+
+import json, os, selectors, socket, threading, time
+from collections import deque
+
+from engine import SnakeBuffer
+
+MAX_PENDING = 256     #lines buffered per subscriber before it is dropped to the whole state
+
+def parseAddress(address: str) -> tuple:
+    """
+        This function returns the socket family and address of "unix:PATH" or "HOST:PORT" (i.e. a loopback host).
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    host = host or "127.0.0.1"
+    if host not in ("127.0.0.1", "localhost", "::1"):
+        raise ValueError(f"spectators are only served on the loopback interface: {address}")
+    return (socket.AF_INET6 if ":" in host else socket.AF_INET), (host, int(port))
+
+def encode(message: dict) -> bytes:
+    """
+        This function serializes a message as a line of JSON.
+    """
+    return json.dumps(message, separators = (",", ":")).encode() + b"\n"
+
+class Subscriber():
+    '''
+        This class holds the connection of a spectator and its bounded buffer of lines to send.
+    '''
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.pending = deque() # Lines Not Yet Sent
+        self.current = None # Line Being Sent
+        self.offset = 0 # Bytes Of The Current Line Already Sent
+        self.needsState = True # Sent The Whole State On The Next Tick
+        self.dropped = 0 # Lines Dropped While Lagging
+        self.writing = False # Registered For Write Events
+
+class Broadcaster():
+    '''
+        This class serves a game to spectators from a thread of its own (see the module documentation).
+        It is attached to the game as an observer, and closed with close().
+    '''
+    def __init__(self, game, address: str, maxPending: int = MAX_PENDING, sendBuffer: int = None):
+        """
+            This initializer listens on the address and starts the server thread, then attaches to the game.
+            The sendBuffer (bytes) bounds the kernel buffer of each subscriber too (i.e. the default of the system otherwise).
+        """
+        self.game = game
+        self.maxPending = maxPending
+        self.sendBuffer = sendBuffer
+        family, self.address = parseAddress(address)
+        if family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address) # Left Over By A Previous Run
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        if family != socket.AF_UNIX:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(self.address)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.wakeReader, self.wakeWriter = socket.socketpair()
+        self.wakeReader.setblocking(False)
+        self.wakeWriter.setblocking(False)
+
+        self.lock = threading.Lock() # Subscribers And Counters (i.e. Read By metrics())
+        self.subscribers = []
+        self.tasks = [] # Tasks Of The Current Tick
+        self.journal = deque() # (Tick, Time, Tasks) Appended By The Game Thread, Popped By The Server Thread
+        #mirror of the game state as of the latest tick of the journal served (i.e. owned by the server thread)
+        self.snake = deque()
+        self.prey = {} # Prey Rectangles (i.e. An Ordered Set)
+        self.score = 0
+        self.gameOver = False
+        self.lines = 0 # Lines Serialized (i.e. Once Per Tick)
+        self.states = 0 # Whole States Serialized
+        self.dropped = 0 # Lines Dropped For Lagging Subscribers
+        self.running = True
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.selector.register(self.wakeReader, selectors.EVENT_READ)
+        self.thread = threading.Thread(target = self.serve, daemon = True)
+        self.thread.start()
+        game.attach(self)
+
+    def __call__(self, task: dict) -> None:
+        """
+            This method is called by the game with every task it produces.
+            On the "move" or "keyframe" task ending a tick, the tasks of the tick are appended to the journal
+            and the server thread is woken up, in O(1).
+        """
+        self.tasks.append(task)
+        if not ("move" in task or "keyframe" in task):
+            return
+        self.journal.append((self.game.ticks, time.monotonic(), self.tasks))
+        self.tasks = []
+        try:
+            self.wakeWriter.send(b"\0")
+        except (BlockingIOError, OSError): # Already Woken Up (i.e. Pipe Full) Or Closed
+            pass
+
+    def state(self, tick: int, at: float) -> bytes:
+        """
+            This method serializes the whole state of the game from the mirror (i.e. as of the given tick).
+        """
+        self.states += 1
+        return encode({"tick": tick, "at": at, "state": {
+            "snake": list(self.snake), "prey": list(self.prey), "score": self.score, "gameOver": self.gameOver}})
+
+    def mirror(self, tasks: list) -> None:
+        """
+            This method applies the tasks of a tick to the mirror of the game state.
+        """
+        for task in tasks:
+            if "move" in task:
+                x, y, dropped = task["move"]
+                if dropped:
+                    self.snake.popleft()
+                self.snake.append((x, y))
+            elif "keyframe" in task:
+                self.snake = deque(task["keyframe"])
+            elif "prey" in task:
+                self.prey[task["prey"]] = None
+            elif "captured" in task:
+                self.prey.pop(task["captured"], None)
+            elif "score" in task:
+                self.score = task["score"]
+            elif "game_over" in task:
+                self.gameOver = True
+
+    def publish(self) -> None:
+        """
+            This method serializes the ticks of the journal once each, and queues them for every subscriber
+            (or the whole state, for those which need it), on the server thread.
+        """
+        while self.journal:
+            tick, at, tasks = self.journal.popleft()
+            self.mirror(tasks)
+            if not self.subscribers:
+                continue
+            line = encode({"tick": tick, "at": at, "tasks": tasks})
+            state = None
+            with self.lock:
+                self.lines += 1
+                for subscriber in self.subscribers:
+                    if len(subscriber.pending) >= self.maxPending: # Lagging (i.e. Skip To The Latest Tick)
+                        subscriber.dropped += len(subscriber.pending)
+                        self.dropped += len(subscriber.pending)
+                        subscriber.pending.clear()
+                        subscriber.needsState = True
+                    if subscriber.needsState:
+                        state = state or self.state(tick, at) # Serialized Once Per Tick
+                        subscriber.pending.append(state)
+                        subscriber.needsState = False
+                    else:
+                        subscriber.pending.append(line)
+
+    def serve(self) -> None:
+        """
+            This method is the main loop of the server thread : it accepts subscribers,
+            sends their buffers as the sockets accept them, and drops the closed connections.
+        """
+        while self.running:
+            for key, events in self.selector.select():
+                if key.fileobj is self.listener:
+                    self.accept()
+                elif key.fileobj is self.wakeReader:
+                    try:
+                        while self.wakeReader.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    self.publish()
+                else:
+                    subscriber = key.data
+                    if events & selectors.EVENT_READ and not self.receive(subscriber):
+                        continue
+                    if events & selectors.EVENT_WRITE:
+                        self.send(subscriber)
+            with self.lock:
+                subscribers = list(self.subscribers)
+            for subscriber in subscribers:
+                if not subscriber.writing:
+                    self.send(subscriber)
+
+    def accept(self) -> None:
+        """
+            This method accepts a new subscriber, which receives the whole state on the next tick.
+        """
+        try:
+            connection, _ = self.listener.accept()
+        except (BlockingIOError, OSError):
+            return
+        connection.setblocking(False)
+        if self.sendBuffer is not None:
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sendBuffer)
+        subscriber = Subscriber(connection)
+        self.selector.register(connection, selectors.EVENT_READ, subscriber)
+        with self.lock:
+            self.subscribers.append(subscriber)
+
+    def receive(self, subscriber: Subscriber) -> bool:
+        """
+            This method discards the bytes sent by a subscriber, and drops it once it has closed its connection.
+            It returns whether the subscriber is still connected.
+        """
+        try:
+            if subscriber.connection.recv(4096):
+                return True
+        except BlockingIOError:
+            return True
+        except OSError:
+            pass
+        self.drop(subscriber)
+        return False
+
+    def send(self, subscriber: Subscriber) -> None:
+        """
+            This method sends as much of the buffer of a subscriber as its socket accepts without blocking,
+            and waits for write events while some of it is left.
+        """
+        while True:
+            if subscriber.current is None:
+                with self.lock:
+                    if not subscriber.pending:
+                        break
+                    subscriber.current = subscriber.pending.popleft()
+                subscriber.offset = 0
+            try:
+                subscriber.offset += subscriber.connection.send(memoryview(subscriber.current)[subscriber.offset:])
+            except BlockingIOError:
+                break
+            except OSError:
+                self.drop(subscriber)
+                return
+            if subscriber.offset < len(subscriber.current):
+                break
+            subscriber.current = None
+        writing = subscriber.current is not None
+        if writing != subscriber.writing:
+            subscriber.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self.selector.modify(subscriber.connection, events, subscriber)
+
+    def drop(self, subscriber: Subscriber) -> None:
+        """
+            This method closes the connection of a subscriber.
+        """
+        with self.lock:
+            if subscriber not in self.subscribers:
+                return
+            self.subscribers.remove(subscriber)
+        self.selector.unregister(subscriber.connection)
+        subscriber.connection.close()
+
+    def metrics(self) -> dict:
+        """
+            This method returns the number of subscribers, the lines and whole states serialized,
+            and the lines dropped for lagging subscribers (i.e. including those which left).
+        """
+        with self.lock:
+            return {"subscribers": len(self.subscribers), "lines": self.lines, "states": self.states,
+                    "dropped": self.dropped}
+
+    def close(self) -> None:
+        """
+            This method detaches from the game, stops the server thread and closes every connection.
+        """
+        if self in self.game.observers:
+            self.game.detach(self)
+        self.running = False
+        try:
+            self.wakeWriter.send(b"\0")
+        except OSError:
+            pass
+        self.thread.join()
+        for subscriber in list(self.subscribers):
+            self.drop(subscriber)
+        self.selector.close()
+        self.listener.close()
+        self.wakeReader.close()
+        self.wakeWriter.close()
+        if isinstance(self.address, str):
+            os.unlink(self.address)
+
+class Spectator():
+    '''
+        This class subscribes to a broadcast and rebuilds the state of the game from it.
+    '''
+    def __init__(self, address: str, timeout: float = None):
+        family, address = parseAddress(address)
+        self.connection = socket.socket(family, socket.SOCK_STREAM)
+        self.connection.settimeout(timeout)
+        self.connection.connect(address)
+        self.file = self.connection.makefile("rb")
+        self.snake = SnakeBuffer()
+        self.prey = set()
+        self.score = 0
+        self.gameOver = False
+        self.tick = None
+        self.lines = 0
+        self.states = 0
+        self.latency = None # Of The Latest Line (sec)
+
+    def receive(self) -> bool:
+        """
+            This method reads and applies the next line of the broadcast.
+            It returns False once the broadcast is closed.
+        """
+        line = self.file.readline()
+        if not line:
+            return False
+        self.apply(json.loads(line))
+        return True
+
+    def apply(self, message: dict) -> None:
+        """
+            This method applies a line of the broadcast (i.e. the tasks of a tick, or the whole state).
+        """
+        self.lines += 1
+        self.tick = message["tick"]
+        self.latency = time.monotonic() - message["at"]
+        if "state" in message:
+            state = message["state"]
+            self.states += 1
+            self.snake.apply({"keyframe": state["snake"]})
+            self.prey = set(map(tuple, state["prey"]))
+            self.score = state["score"]
+            self.gameOver = state["gameOver"]
+            return
+        for task in message["tasks"]:
+            if "prey" in task:
+                self.prey.add(tuple(task["prey"]))
+            elif "captured" in task:
+                self.prey.discard(tuple(task["captured"]))
+            elif "score" in task:
+                self.score = task["score"]
+            elif "game_over" in task:
+                self.gameOver = True
+            else:
+                self.snake.apply(task)
+
+    def close(self) -> None:
+        self.file.close()
+        self.connection.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description = "Watch a snake game broadcast by python original.py --broadcast ADDRESS.")
+    parser.add_argument("address", help = "address of the broadcast (unix:PATH or HOST:PORT)")
+    parser.add_argument("--seconds", type = float, default = None, help = "time to watch for (default: until the game is over)")
+    args = parser.parse_args()
+
+    spectator = Spectator(args.address)
+    start = printed = time.monotonic()
+    while spectator.receive() and not spectator.gameOver:
+        if time.monotonic() - printed >= 1.0:
+            printed = time.monotonic()
+            print(f"tick {spectator.tick}, score {spectator.score}, length {len(spectator.snake.points) // 2}, "
+                  f"latency {1000 * spectator.latency:.3f} ms")
+        if args.seconds is not None and printed - start >= args.seconds:
+            break
+    print(f"tick {spectator.tick}, score {spectator.score}, game over {spectator.gameOver}, "
+          f"lines {spectator.lines}, states {spectator.states}")
+    spectator.close()
@@ -0,0 +1,911 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This module implements the headless game engine shared by both
+    IPC designs (i.e. `original.py` and `alternative.py`).
+
+    The `Game` class holds no reference to Tkinter or to module-level globals.
+    The board size, seed and tick rate are constructor arguments, so any number
+    of games can be run in a single process without a display (e.g. batch simulations,
+    benchmarks and bots).
+
+    Front-ends attach to the engine as optional observers. Each observer is a callable
+    which receives the same task dictionaries that were originally added to the `gameQueue`
+    (i.e. {"game_over": True}, {"prey": (...)}, {"score": ...}), except for the movement of the snake.
+    Since a game may hold many prey at once, a "prey" task adds the given prey rectangle, and a
+    "captured" task removes it.
+
+    Instead of shipping the whole body every tick, a "move" task is a delta (x, y, dropped) holding
+    the new head and whether the tail was dropped (i.e. False when the snake grows).
+    The whole body is only sent in a "keyframe" task, when an observer attaches and every keyframeInterval ticks.
+    The `SnakeBuffer` class rebuilds the flat coordinates of the body from these tasks, and the `PolylineBuffer` class
+    only keeps the corners of the body (i.e. the canvas line of a long snake gets O(turns) points instead of O(length)).
+    The "move" or "keyframe" task is always the last task of a tick, so observers may use it to publish a consistent state.
+
+    The state of a game is saved to compact bytes by `Game.saveState()` (i.e. the body as a packed `array("h")`, the prey,
+    the free cell index, the direction, score, tick and the state of the random number generator), and `Game.toBytes()`
+    adds the board, so that `Game.fromBytes()` restores a game without pickling. `Game.fork()` clones a game
+    for look-ahead search by copying its containers (i.e. O(length) copies in C, no re-indexing).
+    The `Checkpoint` observer saves a running game from another thread (e.g. the Tk main loop) at the end of its next tick.
+
+    The arrow keys do not set the direction directly : each press is queued with the time it was pressed
+    (at most INPUT_QUEUE_LIMIT of them), and each tick applies the first queued press which turns the snake
+    (i.e. presses of the current direction or of its opposite are dropped). Two presses within a tick are therefore
+    applied on two ticks, and a quick Left, Up, Right never reverses the snake into its body.
+    The time from a press to the tick applying it is recorded in the inputLatency data field.
+"""
+
+import asyncio, os, random, struct, threading, time
+from array import array
+from collections import Counter, deque
+from itertools import chain, filterfalse
+
+from instrumentation import LatencyRecorder
+
+#some default constants for the game
+WINDOW_WIDTH = 500
+WINDOW_HEIGHT = 300
+SNAKE_ICON_WIDTH = 15
+PREY_ICON_WIDTH = 10
+SPEED = 0.15     #speed of snake updates (sec)
+THRESHOLD = 15     #minimum distance of the prey from the walls
+KEYFRAME_INTERVAL = 100     #ticks between "keyframe" tasks
+FREE_INDEX_LIMIT = 1 << 20     #prey cells above which the prey are placed by rejection sampling (i.e. large boards)
+INPUT_QUEUE_LIMIT = 3     #key presses waiting for a tick (i.e. further presses are dropped)
+
+#prey cells of an empty board (and their index), by board
+preyCellCache = {}
+
+DIRECTIONS = ("Left", "Right", "Up", "Down")
+OPPOSITES = {"Left": "Right", "Right": "Left", "Up": "Down", "Down": "Up"}
+
+#layouts of the saved state of a game (see Game.saveState() and Game.toBytes())
+#board : magic, version, width, height, snake icon width, prey icon width, prey count, seed, speed, keyframe interval
+BOARD_FORMAT = struct.Struct("<4sHiiiiiqdI")
+#state : tick, score, direction, game not over, cause, coordinate and free cell typecodes, body length, prey,
+#free cells (-1 if not indexed), latest prey cell
+STATE_FORMAT = struct.Struct("<IiBBBccIIiii")
+STATE_MAGIC = b"SNKS"
+STATE_VERSION = 1
+
+#causes of a finished game
+ALIVE = 0
+WALL = 1
+SELF = 2
+FULL = 3     #no free cell is left for the prey (i.e. the game is won)
+
+def isCaptured(snakeCoordinates: tuple, preyCoordinates: tuple, snakeIconWidth: int = SNAKE_ICON_WIDTH) -> bool:
+    """
+        This function checks whether the head of the snake
+        (i.e. a square of snakeIconWidth centred on snakeCoordinates)
+        overlaps the prey rectangle (x0, y0, x1, y1).
+    """
+    captureCoordinates = (
+        snakeCoordinates[0] - snakeIconWidth // 2, # x0
+        snakeCoordinates[1] - snakeIconWidth // 2, # y0
+        snakeCoordinates[0] + snakeIconWidth // 2, # x1
+        snakeCoordinates[1] + snakeIconWidth // 2 # y1
+    )
+
+    isCaptured: bool = False
+    # Checks if Snake Coordinates are in Prey Coordinates (instance where Prey could be much larger than Snake)
+    if (captureCoordinates[0] <= preyCoordinates[2] and captureCoordinates[1] <= preyCoordinates[3]) and (captureCoordinates[0] >= preyCoordinates[0] and captureCoordinates[1] >= preyCoordinates[1]): # Snake Point 0 "inside" Prey
+        isCaptured = True
+    elif (captureCoordinates[2] >= preyCoordinates[0] and captureCoordinates[3] >= preyCoordinates[1]) and (captureCoordinates[2] <= preyCoordinates[2] and captureCoordinates[3] <= preyCoordinates[3]): # Snake Point 1 "inside" Prey
+        isCaptured = True
+    # Checks if Prey Coordinates are in Snake Coordinates (instance where Snake could be much larger than Prey)
+    elif (preyCoordinates[2] >= captureCoordinates[0] and preyCoordinates[3] >= captureCoordinates[1]) and (preyCoordinates[2] <= captureCoordinates[2] and preyCoordinates[3] <= captureCoordinates[3]): # Prey Point 0 "inside" Snake
+        isCaptured = True
+    elif (preyCoordinates[0] <= captureCoordinates[2] and preyCoordinates[1] <= captureCoordinates[3]) and (preyCoordinates[0] >= captureCoordinates[0] and preyCoordinates[1] >= captureCoordinates[1]): # Prey Point 1 "inside" Snake
+        isCaptured = True
+    return isCaptured
+
+class TickScheduler():
+    '''
+        This class implements a drift-free fixed-timestep scheduler for the superloop.
+        Tick deadlines are multiples of the period from the start on the monotonic clock,
+        so the time taken by a tick or a late wakeup never delays the following deadlines.
+
+        When the loop falls behind by more than a period, the catch up policy decides
+        what happens to the missed ticks :
+            - "skip" : run a single tick and drop the missed ones
+            - "burst" : run the missed ticks back to back (at most maxCatchUp of them)
+    '''
+    def __init__(self, period: float, catchUp: str = "skip", maxCatchUp: int = 5,
+                 clock = time.monotonic, sleep = time.sleep):
+        """
+            This initializer sets the period (sec) and catch up policy of the scheduler,
+            and schedules the first tick one period from now.
+        """
+        if catchUp not in ("skip", "burst"):
+            raise ValueError(f"unknown catch up policy: {catchUp}")
+        self.period = period
+        self.catchUp = catchUp
+        self.maxCatchUp = maxCatchUp
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = clock() + period
+
+        #live metrics (sec), read by other threads through metrics()
+        self.ticks = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.lastOverrun = 0.0
+        self.maxOverrun = 0.0
+        self.lastJitter = 0.0
+        self.maxJitter = 0.0
+        self.totalJitter = 0.0
+
+    def wait(self) -> int:
+        """
+            This method blocks until the next tick deadline and returns
+            the number of ticks to run now (i.e. more than 1 only when catching up).
+        """
+        delay = self.deadline - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        return self.advance(delay > 0)
+
+    async def waitAsync(self) -> int:
+        """
+            This method is the coroutine version of wait() : it awaits asyncio.sleep()
+            until the next tick deadline, so that other coroutines of the event loop run meanwhile.
+        """
+        delay = self.deadline - self.clock()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self.advance(delay > 0)
+
+    def advance(self, onTime: bool) -> int:
+        """
+            This method records the lateness of the current tick (i.e. once its deadline has passed),
+            schedules the next deadline and returns the number of ticks to run now.
+        """
+        now = self.clock()
+        if onTime:
+            self.lastOverrun = 0.0
+        else: # Previous Tick Finished After This Deadline
+            self.overruns += 1
+            self.lastOverrun = now - self.deadline
+            self.maxOverrun = max(self.maxOverrun, self.lastOverrun)
+
+        lateness = now - self.deadline
+        self.lastJitter = lateness
+        self.maxJitter = max(self.maxJitter, lateness)
+        self.totalJitter += lateness
+
+        due = 1 + int(lateness // self.period) # Deadlines Passed (Including This One)
+        ticks = 1 if self.catchUp == "skip" else min(due, self.maxCatchUp)
+        self.skipped += due - ticks
+        self.ticks += ticks
+        self.deadline += due * self.period
+        return ticks
+
+    def metrics(self) -> dict:
+        """
+            This method returns a snapshot of the tick overrun and jitter metrics.
+        """
+        return {
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "last overrun": self.lastOverrun,
+            "max overrun": self.maxOverrun,
+            "last jitter": self.lastJitter,
+            "max jitter": self.maxJitter,
+            "mean jitter": self.totalJitter / max(1, self.ticks),
+        }
+
+class SnakeBuffer():
+    '''
+        This class rebuilds the body of the snake from "keyframe" and "move" tasks,
+        as the flat coordinates (x0, y0, x1, y1, ...) expected by a canvas line.
+        Applying a "move" task costs O(1), regardless of the length of the snake.
+    '''
+    def __init__(self):
+        self.points = deque()
+
+    def apply(self, task: dict) -> bool:
+        """
+            This method applies a "keyframe" or "move" task to the buffer,
+            and returns whether the task was one of these.
+        """
+        if "move" in task:
+            x, y, dropped = task["move"]
+            if dropped:
+                self.points.popleft()
+                self.points.popleft()
+            self.points.append(x)
+            self.points.append(y)
+        elif "keyframe" in task:
+            self.points = deque(coord for point in task["keyframe"] for coord in point)
+        else:
+            return False
+        return True
+
+class PolylineBuffer():
+    '''
+        This class rebuilds the body of the snake from "keyframe" and "move" tasks like the `SnakeBuffer` class,
+        but only keeps the corners of the canvas line : the tail, the points where the step between
+        segments changes (i.e. the turns) and the head.
+        The body is held as runs of equal steps [dx, dy, count] from the tail, so the head advances
+        and the tail retracts in O(1), and a canvas line gets O(turns) points instead of O(length).
+    '''
+    def __init__(self):
+        self.points = deque() # Tail, End Of Each Run (i.e. Corners And Head)
+        self.runs = deque() # [dx, dy, count] Per Run Of Equal Steps, Tail First
+        self.length = 0 # Body Segments
+
+    def apply(self, task: dict) -> bool:
+        """
+            This method applies a "keyframe" or "move" task to the buffer,
+            and returns whether the task was one of these.
+        """
+        if "move" in task:
+            x, y, dropped = task["move"]
+            self.advance(x, y) # Before The Tail Retracts (i.e. Never Empty)
+            if dropped:
+                self.retract()
+        elif "keyframe" in task:
+            self.points = deque()
+            self.runs = deque()
+            self.length = 0
+            for x, y in task["keyframe"]:
+                self.advance(x, y)
+        else:
+            return False
+        return True
+
+    def advance(self, x: int, y: int) -> None:
+        """
+            This method adds a new head, which extends the last run if it continues in the same step.
+        """
+        points = self.points
+        self.length += 1
+        if not points:
+            points.extend((x, y))
+            return
+        dx, dy = x - points[-2], y - points[-1]
+        run = self.runs[-1] if self.runs else None
+        if run is not None and run[0] == dx and run[1] == dy: # Straight On (i.e. Move The Head Point)
+            run[2] += 1
+            points[-2] = x
+            points[-1] = y
+        else: # Turn (i.e. The Previous Head Becomes A Corner)
+            self.runs.append([dx, dy, 1])
+            points.append(x)
+            points.append(y)
+
+    def retract(self) -> None:
+        """
+            This method removes the tail, which moves one step along the first run.
+        """
+        self.length -= 1
+        run = self.runs[0]
+        run[2] -= 1
+        if run[2] == 0: # Tail Reaches The First Corner
+            self.runs.popleft()
+            self.points.popleft()
+            self.points.popleft()
+        else:
+            self.points[0] += run[0]
+            self.points[1] += run[1]
+
+class Checkpoint():
+    '''
+        This class saves a running game to a file at the end of its next tick (i.e. on the thread playing it),
+        so that a consistent state is saved whichever thread requests it.
+        It is attached to the game as an observer.
+    '''
+    def __init__(self, game):
+        self.game = game
+        self.lock = threading.Lock()
+        self.path = None # Requested Save
+        game.attach(self)
+
+    def request(self, path: str) -> None:
+        """
+            This method requests the game to be saved to the file at the end of its next tick.
+        """
+        with self.lock:
+            self.path = path
+
+    def __call__(self, task: dict) -> None:
+        """
+            This method is called by the game with every task it produces.
+            On the "move" or "keyframe" task ending a tick, it writes the requested save atomically.
+        """
+        if self.path is None or not ("move" in task or "keyframe" in task):
+            return
+        with self.lock:
+            path, self.path = self.path, None
+        temporaryPath = path + ".tmp"
+        with open(temporaryPath, "wb") as file:
+            file.write(self.game.toBytes())
+        os.replace(temporaryPath, path)
+
+class Game():
+    '''
+        This class implements most of the game functionalities.
+        It is independent of any graphic user interface.
+    '''
+    def __init__(self, width: int = WINDOW_WIDTH, height: int = WINDOW_HEIGHT,
+                 seed = None, speed: float = SPEED,
+                 snakeIconWidth: int = SNAKE_ICON_WIDTH, preyIconWidth: int = PREY_ICON_WIDTH,
+                 keyframeInterval: int = KEYFRAME_INTERVAL, preyCount: int = 1):
+        """
+           This initializer sets the board dimensions, the random number generator
+           and the tick period (sec) of the game.
+           Without a seed, a random one is drawn and kept in the seed data field,
+           so that every game can be reproduced (e.g. replayed).
+           It also sets the initial snake coordinate list, movement
+           direction, and arranges for the first prey (i.e. preyCount of them) to be created.
+        """
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.snakeIconWidth = snakeIconWidth
+        self.preyIconWidth = preyIconWidth
+        self.keyframeInterval = keyframeInterval
+        self.preyCount = preyCount
+        self.seed = seed if seed is not None else random.randrange(1 << 63)
+        self.random = random.Random(self.seed) # Seeded Per Instance (Reproducible Runs)
+        self.resetRuntime()
+
+        self.score: int = 0
+        self.ticks: int = 0
+        #the prey rectangles on the board, by grid cell (i.e. a spatial hash of the prey)
+        self.prey = {}
+        self.preyCoordinates = None # Latest Prey Placed
+        #starting length and location of the snake
+        #note that it is a deque of tuples, each being an
+        # (x, y) tuple (tail first, head last). Initially its size is 5 tuples.
+        initialCoordinates = [(width - 5 - 10 * i, 55) for i in range(5)]
+        #the head only ever visits the cells of the grid through its starting coordinate
+        self.cellOrigin = (initialCoordinates[-1][0] % snakeIconWidth, initialCoordinates[-1][1] % snakeIconWidth)
+        self.setSnakeCoordinates(initialCoordinates)
+        #initial direction of the snake
+        self.direction = "Left"
+        self.gameNotOver = True
+        self.cause = ALIVE
+
+        self.createNewPrey(preyCount) # Generate First Prey
+
+    #fields which are not part of the state of a game (see resetRuntime())
+    runtimeFields = ("observers", "scheduler", "inputs", "inputLock", "inputsDropped", "inputLatency")
+
+    def resetRuntime(self) -> None:
+        """
+            This method sets the runtimeFields of a new game : its observers, the scheduler of its superloop,
+            and its key presses. These are bound to the running game, so they are set anew rather than
+            copied by fork() or pickled.
+        """
+        self.observers = []
+        self.scheduler = None
+        #key presses waiting for a tick, as (direction, time pressed) tuples (see queueDirection())
+        self.inputs = deque()
+        self.inputLock = threading.Lock() # Pressed On The Tk Thread, Popped On The Game Thread
+        self.inputsDropped = 0
+        self.inputLatency = LatencyRecorder() # Key Press To Applied Move
+
+    def setSnakeCoordinates(self, snakeCoordinates) -> None:
+        """
+            This method replaces the snake body (tail first, head last)
+            and rebuilds the occupancy and free cell indices from it.
+            The occupancy index counts the body segments on each coordinate,
+            so that moving, growing and self-collision checks are O(1).
+            The free cell index holds the cells of the grid the prey may be placed on
+            (i.e. THRESHOLD away from the walls and not covered by the body or another prey) in a list,
+            along with the position of each of them in that list, so that a cell is
+            added or removed in O(1) (i.e. by swapping it with the last one).
+            On large boards (i.e. more than FREE_INDEX_LIMIT prey cells), the free cell list is not built
+            (i.e. freeCells is None), and only the covered cells are counted.
+        """
+        self.snakeCoordinates = deque(snakeCoordinates)
+        self.occupancy = {}
+        for point in self.snakeCoordinates:
+            self.occupancy[point] = self.occupancy.get(point, 0) + 1
+
+        step = self.snakeIconWidth
+        self.preyColumns, self.preyRows = (
+            range(origin + max(0, -(-(THRESHOLD - origin) // step)) * step, size - THRESHOLD + 1, step)
+            for origin, size in zip(self.cellOrigin, (self.width, self.height)))
+        self.preyCellCount = len(self.preyColumns) * len(self.preyRows)
+
+        if self.preyCellCount > FREE_INDEX_LIMIT:
+            self.freeCells = self.freeIndex = None
+        else:
+            cells, index = self.preyCells()
+            self.freeCells = cells.copy()
+            self.freeIndex = index.copy()
+        self.cover = {} # Number Of Segments And Prey Covering Each Prey Cell
+        for point in self.snakeCoordinates:
+            self.coverCells(point)
+        for cell in self.prey:
+            self.coverCells(cell)
+
+    def preyCells(self) -> tuple:
+        """
+            This method returns the prey cells of the board (i.e. the free cell index of an empty board),
+            as a list and the position of each cell in that list.
+            These are shared by all games on the same board, and must not be modified.
+        """
+        board = (self.width, self.height, self.snakeIconWidth, self.cellOrigin)
+        if board not in preyCellCache:
+            cells = [(x, y) for y in self.preyRows for x in self.preyColumns]
+            preyCellCache[board] = (cells, {cell: i for i, cell in enumerate(cells)})
+        return preyCellCache[board]
+
+    def isPreyCell(self, cell: tuple) -> bool:
+        """
+            This method checks whether a cell of the grid is THRESHOLD away from the walls.
+        """
+        return (THRESHOLD <= cell[0] <= self.width - THRESHOLD) and (THRESHOLD <= cell[1] <= self.height - THRESHOLD)
+
+    def coveredCells(self, point: tuple) -> list:
+        """
+            This method returns the prey cells overlapped by a body segment.
+            This is the cell of the segment itself, except for segments off the grid
+            (i.e. the starting body), which overlap up to four cells.
+        """
+        step = self.snakeIconWidth
+        offsetX, offsetY = (point[0] - self.cellOrigin[0]) % step, (point[1] - self.cellOrigin[1]) % step
+        if offsetX == 0 and offsetY == 0: # On The Grid (i.e. Every Segment Added By move())
+            return (point,) if self.isPreyCell(point) else ()
+        xs = (point[0] - offsetX,) if offsetX == 0 else (point[0] - offsetX, point[0] - offsetX + step)
+        ys = (point[1] - offsetY,) if offsetY == 0 else (point[1] - offsetY, point[1] - offsetY + step)
+        return [(x, y) for y in ys for x in xs if self.isPreyCell((x, y))]
+
+    def coverCells(self, point: tuple) -> None:
+        """
+            This method removes the cells overlapped by a new body segment from the free cell index.
+        """
+        for cell in self.coveredCells(point):
+            count = self.cover.get(cell, 0)
+            self.cover[cell] = count + 1
+            if count == 0 and self.freeCells is not None: # Swap With Last Free Cell And Remove
+                index = self.freeIndex.pop(cell)
+                last = self.freeCells.pop()
+                if last != cell:
+                    self.freeCells[index] = last
+                    self.freeIndex[last] = index
+
+    def uncoverCells(self, point: tuple) -> None:
+        """
+            This method adds the cells no longer overlapped by any body segment back to the free cell index.
+        """
+        for cell in self.coveredCells(point):
+            count = self.cover[cell] - 1
+            if count == 0:
+                del self.cover[cell]
+                if self.freeCells is not None:
+                    self.freeIndex[cell] = len(self.freeCells)
+                    self.freeCells.append(cell)
+            else:
+                self.cover[cell] = count
+
+    def saveState(self, direction: str = None) -> bytes:
+        """
+            This method encodes the state of the game as bytes : the body and the prey cells as a packed
+            array("h") (or array("i") on boards too large for it), the order of the free cell index
+            (so that a restored game draws the same prey), and the state of the random number generator.
+            The direction defaults to the current one.
+        """
+        coordinateType = "h" if max(self.width, self.height) + self.snakeIconWidth < 1 << 15 else "i"
+        freeType = "H" if self.preyCellCount < 1 << 16 else "I"
+        freeCells = -1
+        free = array(freeType)
+        if self.freeCells is not None:
+            cells, index = self.preyCells()
+            free = array(freeType, map(index.__getitem__, self.freeCells))
+            freeCells = len(free)
+        latest = (-1, -1)
+        if self.preyCoordinates is not None:
+            latest = ((self.preyCoordinates[0] + self.preyCoordinates[2]) // 2,
+                      (self.preyCoordinates[1] + self.preyCoordinates[3]) // 2)
+
+        body = array(coordinateType, chain.from_iterable(self.snakeCoordinates))
+        prey = array(coordinateType, chain.from_iterable(self.prey))
+        version, randomState, gauss = self.random.getstate()
+        return b"".join((
+            STATE_FORMAT.pack(self.ticks, self.score, DIRECTIONS.index(direction or self.direction),
+                              self.gameNotOver, self.cause, coordinateType.encode(), freeType.encode(),
+                              len(self.snakeCoordinates), len(self.prey), freeCells, *latest),
+            body.tobytes(), prey.tobytes(), free.tobytes(),
+            array("I", randomState).tobytes(), struct.pack("<d", gauss if gauss is not None else float("nan")),
+        ))
+
+    def loadState(self, data) -> None:
+        """
+            This method restores a state encoded by saveState() on the same board.
+            The observers are sent a new keyframe, prey and score.
+        """
+        (ticks, score, direction, gameNotOver, cause, coordinateType, freeType, bodyLength, preyLength,
+         freeCells, latestX, latestY) = STATE_FORMAT.unpack_from(data)
+        offset = STATE_FORMAT.size
+        def integers(typecode: str, count: int) -> array:
+            nonlocal offset
+            values = array(typecode)
+            values.frombytes(data[offset:offset + values.itemsize * count])
+            offset += values.itemsize * count
+            return values
+
+        body = integers(coordinateType.decode(), 2 * bodyLength)
+        prey = integers(coordinateType.decode(), 2 * preyLength)
+        free = integers(freeType.decode(), max(0, freeCells))
+        randomState = integers("I", 625)
+        gauss, = struct.unpack_from("<d", data, offset)
+
+        for preyCoordinates in self.prey.values():
+            self.notify({"captured" : preyCoordinates})
+        half = self.preyIconWidth // 2
+        self.prey = {(x, y): (x - half, y - half, x + half, y + half) for x, y in zip(prey[0::2], prey[1::2])}
+        #the indices are counted in bulk rather than rebuilt segment by segment (see setSnakeCoordinates())
+        self.snakeCoordinates = deque(zip(body[0::2], body[1::2]))
+        self.occupancy = dict.fromkeys(self.snakeCoordinates, 1)
+        if len(self.occupancy) < len(self.snakeCoordinates): # Overlapping Segments (i.e. Self Collision)
+            self.occupancy = dict(Counter(self.snakeCoordinates))
+        points = chain(self.snakeCoordinates, self.prey)
+        self.freeCells = self.freeIndex = None
+        if freeCells < 0:
+            self.cover = dict(Counter(chain.from_iterable(map(self.coveredCells, points))))
+        else: # Same Free Cells In The Same Order (i.e. Same Prey Drawn)
+            cells, index = self.preyCells()
+            points = list(points)
+            onCells = list(filter(index.__contains__, points)) # Segments And Prey Covering Only Their Own Cell
+            self.cover = dict.fromkeys(onCells, 1)
+            if len(self.cover) < len(onCells):
+                self.cover = dict(Counter(onCells))
+            for cell in chain.from_iterable(map(self.coveredCells, filterfalse(index.__contains__, points))):
+                self.cover[cell] = self.cover.get(cell, 0) + 1
+            self.freeCells = list(map(cells.__getitem__, free))
+            self.freeIndex = dict(zip(self.freeCells, range(len(self.freeCells))))
+        self.random.setstate((3, tuple(randomState), None if gauss != gauss else gauss))
+        self.preyCoordinates = (latestX - half, latestY - half, latestX + half, latestY + half) if latestX >= 0 else None
+        self.ticks = ticks
+        self.score = score
+        self.direction = DIRECTIONS[direction]
+        self.gameNotOver = bool(gameNotOver)
+        self.cause = cause
+
+        for preyCoordinates in self.prey.values():
+            self.notify({"prey" : preyCoordinates})
+        self.notify({"score" : self.score})
+        self.notify({"keyframe" : tuple(self.snakeCoordinates)})
+
+    def toBytes(self) -> bytes:
+        """
+            This method encodes the board and the state of the game as bytes (e.g. to save a game in progress).
+        """
+        return BOARD_FORMAT.pack(STATE_MAGIC, STATE_VERSION, self.width, self.height, self.snakeIconWidth,
+                                 self.preyIconWidth, self.preyCount, self.seed, self.speed,
+                                 self.keyframeInterval) + self.saveState()
+
+    @classmethod
+    def fromBytes(cls, data) -> "Game":
+        """
+            This method returns a new game restored from bytes encoded by toBytes().
+        """
+        (magic, version, width, height, snakeIconWidth, preyIconWidth, preyCount, seed, speed,
+         keyframeInterval) = BOARD_FORMAT.unpack_from(data)
+        if magic != STATE_MAGIC or version != STATE_VERSION:
+            raise ValueError("not a saved game")
+        game = cls(width, height, seed = seed, speed = speed, snakeIconWidth = snakeIconWidth,
+                   preyIconWidth = preyIconWidth, keyframeInterval = keyframeInterval, preyCount = 0)
+        game.preyCount = preyCount
+        game.loadState(memoryview(data)[BOARD_FORMAT.size:])
+        return game
+
+    def __getstate__(self) -> dict:
+        """
+            This method returns the state of the game without its runtimeFields (i.e. to pickle or copy it),
+            nor the hooks installed on the instance (e.g. by the instrumentation).
+        """
+        return {name: value for name, value in self.__dict__.items()
+                if name not in self.runtimeFields and not hasattr(type(self), name)}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+            This method restores the state of a game with new runtimeFields (i.e. without observers).
+        """
+        self.__dict__.update(state)
+        self.resetRuntime()
+
+    def fork(self) -> "Game":
+        """
+            This method returns an independent copy of the game (e.g. for look-ahead search), without observers.
+            Its containers are copied as they are (i.e. in O(length), plus the free cell index on small boards),
+            rather than rebuilt or pickled.
+        """
+        clone = type(self).__new__(type(self)) # Subclasses Included
+        clone.__dict__.update(self.__dict__)
+        for name in [name for name in clone.__dict__ if hasattr(type(self), name)]: # Hooks Installed On The Instance
+            del clone.__dict__[name]
+        clone.resetRuntime() # Not Shared With The Game Forked (e.g. Its Key Press Statistics)
+        clone.random = random.Random()
+        clone.random.setstate(self.random.getstate())
+        clone.snakeCoordinates = self.snakeCoordinates.copy()
+        clone.occupancy = self.occupancy.copy()
+        clone.cover = self.cover.copy()
+        clone.prey = self.prey.copy()
+        if self.freeCells is not None:
+            clone.freeCells = self.freeCells.copy()
+            clone.freeIndex = self.freeIndex.copy()
+        return clone
+
+    def attach(self, observer) -> None:
+        """
+            This method attaches an observer (i.e. a callable accepting a task dictionary)
+            to the game. The observer is immediately sent the current prey, snake and score
+            so that it starts from the same state as the game.
+        """
+        self.observers.append(observer)
+        for preyCoordinates in self.prey.values():
+            observer({"prey": preyCoordinates})
+        observer({"score": self.score})
+        observer({"keyframe": tuple(self.snakeCoordinates)})
+
+    def detach(self, observer) -> None:
+        """
+            This method detaches a previously attached observer.
+        """
+        self.observers.remove(observer)
+
+    def notify(self, task: dict) -> None:
+        """
+            This method sends a task to every attached observer.
+        """
+        for observer in self.observers:
+            observer(task)
+
+    def superloop(self, catchUp: str = "skip") -> None:
+        """
+            This method implements a main loop
+            of the game. It constantly generates "move"
+            tasks to cause the constant movement of the snake.
+            The speed data field sets how often the move tasks
+            are generated, on the deadlines of a TickScheduler
+            (i.e. the time taken by move() does not slow the game down).
+            Its metrics are available through the scheduler data field.
+        """
+        self.scheduler = TickScheduler(self.speed, catchUp)
+        while self.gameNotOver:
+            for _ in range(self.scheduler.wait()):
+                if not self.gameNotOver:
+                    break
+                self.move()
+
+    async def asyncSuperloop(self, catchUp: str = "skip") -> None:
+        """
+            This method is the coroutine version of superloop(), which runs the game
+            on an asyncio event loop (i.e. on the thread of that loop, alongside other coroutines)
+            instead of a dedicated thread.
+        """
+        self.scheduler = TickScheduler(self.speed, catchUp)
+        while self.gameNotOver:
+            for _ in range(await self.scheduler.waitAsync()):
+                if not self.gameNotOver:
+                    break
+                self.move()
+
+    def step(self, direction: str = None) -> bool:
+        """
+            This method advances the game by a single tick without any delay.
+            If a direction is given, it is applied with the same rules as an
+            arrow key press before moving.
+            It returns whether the game is still running.
+        """
+        if direction is not None:
+            self.changeDirection(direction)
+        if self.gameNotOver:
+            self.move()
+        return self.gameNotOver
+
+    def changeDirection(self, direction: str) -> None:
+        """
+            This method sets the movement direction,
+            ignoring reversals into the snake's own body.
+        """
+        if direction not in OPPOSITES or OPPOSITES[direction] == self.direction:
+            return
+        self.direction = direction
+
+    def queueDirection(self, direction: str, pressedAt: float = None) -> bool:
+        """
+            This method queues a direction pressed at the given time (perf_counter, now by default)
+            for the next ticks (see nextInput()). It may be called from any thread.
+            A repeated press of the latest queued direction (e.g. key auto-repeat) is ignored,
+            and a press is dropped when INPUT_QUEUE_LIMIT presses are already waiting.
+            It returns whether the press was queued.
+        """
+        if direction not in OPPOSITES:
+            return False
+        with self.inputLock:
+            if self.inputs and self.inputs[-1][0] == direction:
+                return False
+            if len(self.inputs) >= INPUT_QUEUE_LIMIT:
+                self.inputsDropped += 1
+                return False
+            self.inputs.append((direction, time.perf_counter() if pressedAt is None else pressedAt))
+        return True
+
+    def nextInput(self, direction: str) -> str:
+        """
+            This method pops the queued presses until one turns away from the given direction
+            (i.e. neither the same direction nor its opposite), records the time since it was pressed,
+            and returns its direction, or None if no queued press turns.
+        """
+        with self.inputLock:
+            while self.inputs:
+                turn, pressedAt = self.inputs.popleft()
+                if turn != direction and turn != OPPOSITES[direction]:
+                    break
+            else:
+                return None
+        self.inputLatency.record(time.perf_counter() - pressedAt)
+        return turn
+
+    def whenAnArrowKeyIsPressed(self, e) -> None:
+        """
+            This method is bound to the arrow keys
+            and is called when one of those is clicked.
+            It queues the movement direction based on
+            the key that was pressed by the gamer,
+            to be applied by the next tick which may turn to it.
+        """
+        self.queueDirection(e.keysym)
+
+    def move(self) -> None:
+        """
+            This method implements what is needed to be done
+            for the movement of the snake.
+            It generates a new snake coordinate.
+            If based on this new movement, a prey has been
+            captured (i.e. looked up by the new head in the
+            spatial hash of the prey in O(1)), it sends a task
+            for the updated score and also creates a new prey.
+            It also calls a corresponding method to check if
+            the game should be over.
+            The snake coordinates list (representing its length
+            and position) should be correctly updated.
+            Observers are sent the change of the body as a "move" delta,
+            or the whole body as a periodic "keyframe".
+            At most one queued key press is applied per tick.
+        """
+        if self.inputs: # Key Presses Since The Previous Tick
+            turn = self.nextInput(self.direction)
+            if turn is not None:
+                self.direction = turn
+        NewSnakeCoordinates = self.calculateNewCoordinates()
+        self.ticks += 1
+
+        occupancy = self.occupancy
+        cellPrey = self.prey.get(NewSnakeCoordinates) # Prey Only Overlap The Head On The Same Cell
+        preyCaptured = cellPrey is not None and isCaptured(NewSnakeCoordinates, cellPrey, self.snakeIconWidth)
+        if preyCaptured:
+            self.snakeCoordinates.append(NewSnakeCoordinates) # Append New Snake Head
+            occupancy[NewSnakeCoordinates] = occupancy.get(NewSnakeCoordinates, 0) + 1
+            self.coverCells(NewSnakeCoordinates)
+            self.removePrey(NewSnakeCoordinates)
+
+            self.score += 1
+            self.notify({"score" : self.score})
+            self.createNewPrey()
+        else:
+            tail = self.snakeCoordinates.popleft() # Move Snake
+            if occupancy[tail] == 1:
+                del occupancy[tail]
+            else:
+                occupancy[tail] -= 1
+            self.uncoverCells(tail)
+            self.snakeCoordinates.append(NewSnakeCoordinates)
+            occupancy[NewSnakeCoordinates] = occupancy.get(NewSnakeCoordinates, 0) + 1
+            self.coverCells(NewSnakeCoordinates)
+        if self.gameNotOver: # Not Already Won (i.e. No Free Cell Left For The Prey)
+            self.isGameOver(NewSnakeCoordinates)
+        if not self.observers:
+            return
+        if self.ticks % self.keyframeInterval == 0:
+            self.notify({"keyframe" : tuple(self.snakeCoordinates)})
+        else:
+            self.notify({"move" : (*NewSnakeCoordinates, not preyCaptured)})
+
+    def calculateNewCoordinates(self) -> tuple:
+        """
+            This method calculates and returns the new
+            coordinates to be added to the snake
+            coordinates list based on the movement
+            direction and the current coordinate of
+            head of the snake.
+            It is used by the move() method.
+        """
+        lastX, lastY = self.snakeCoordinates[-1]
+        if self.direction == "Left":
+            lastX -= self.snakeIconWidth
+        elif self.direction == "Right":
+            lastX += self.snakeIconWidth
+        elif self.direction == "Up":
+            lastY -= self.snakeIconWidth
+        else:
+            lastY += self.snakeIconWidth
+        return (lastX, lastY)
+
+    def isGameOver(self, snakeCoordinates: tuple) -> None:
+        """
+            This method checks if the game is over by
+            checking if now the snake has passed any wall
+            or if it has bit itself (i.e. the new head is
+            counted more than once in the occupancy index).
+            If that is the case, it updates the gameNotOver
+            and cause fields and also sends a "game_over" task.
+        """
+        x, y = snakeCoordinates
+
+        x_collision: bool = (x <= 0) or (x >= self.width)
+        y_collision: bool = (y <= 0) or (y >= self.height)
+
+        if (x_collision) or (y_collision) or (self.occupancy.get((x, y), 0) > 1): # Head Shares Coordinate With Body
+            self.gameNotOver = False
+            self.cause = WALL if (x_collision) or (y_collision) else SELF
+            self.notify({"game_over" : True})
+        return
+
+    def removePrey(self, cell: tuple) -> None:
+        """
+            This method removes the prey on the given cell from the spatial hash,
+            frees its cell and sends a "captured" task with its rectangle coordinates.
+        """
+        preyCoordinates = self.prey.pop(cell)
+        self.uncoverCells(cell)
+        self.notify({"captured" : preyCoordinates})
+
+    def randomFreeCell(self) -> tuple:
+        """
+            This method draws a prey cell not covered by any body segment or prey uniformly at random
+            (i.e. from the free cell index, or by rejection sampling on large boards).
+            At least one cell must be free.
+        """
+        if self.freeCells is not None:
+            return self.freeCells[self.random.randrange(len(self.freeCells))]
+        cell = (self.random.choice(self.preyColumns), self.random.choice(self.preyRows))
+        while cell in self.cover: # Rejection Sampling
+            cell = (self.random.choice(self.preyColumns), self.random.choice(self.preyRows))
+        return cell
+
+    def createNewPrey(self, count: int = 1) -> None:
+        """
+            This methods picks an x and a y randomly as the coordinate
+            of the new prey and uses that to calculate the
+            coordinates (x - PREY_ICON_WIDTH // 2, y - PREY_ICON_WIDTH // 2,
+            x + PREY_ICON_WIDTH // 2, y + PREY_ICON_WIDTH // 2).
+            It then adds the prey to the spatial hash, updates the self.preyCoordinates
+            data field and sends a "prey" task with the calculated rectangle coordinates as its value.
+            The coordinate is drawn uniformly from the free cell index in O(1),
+            so the prey is never placed inside the body or another prey, however full the board is.
+            To make playing the game easier, the x and y are THRESHOLD
+            away from the walls.
+            Many prey may be respawned at once with count, each costing O(1).
+            On large boards, random cells are drawn until one is not covered, which takes
+            O(1) attempts on average as long as most of the board is free.
+            If no free cell is left and no prey remains, the game is over (i.e. won).
+        """
+        for _ in range(count):
+            if len(self.cover) >= self.preyCellCount: # No Free Cell Left
+                if not self.prey:
+                    self.gameNotOver = False
+                    self.cause = FULL
+                    self.notify({"game_over" : True})
+                return
+
+            generatedCoordinates: tuple = self.randomFreeCell()
+            self.preyCoordinates: tuple = (
+                generatedCoordinates[0] - self.preyIconWidth // 2, # x0
+                generatedCoordinates[1] - self.preyIconWidth // 2, # y0
+                generatedCoordinates[0] + self.preyIconWidth // 2, # x1
+                generatedCoordinates[1] + self.preyIconWidth // 2 # y1
+            )
+            self.prey[generatedCoordinates] = self.preyCoordinates
+            self.coverCells(generatedCoordinates)
+
+            self.notify({"prey" : self.preyCoordinates})
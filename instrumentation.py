@@ -0,0 +1,318 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This module implements the measurement helpers shared by the game front-ends and benchmarks.
+    It does not depend on Tkinter.
+
+    The `Stats` class is the runtime instrumentation of a running game. It records named HDR-style histograms
+    (i.e. a fixed number of log-linear buckets, so recording is O(1) and memory is bounded however long the game runs)
+    and reads named gauges, and exposes them through snapshot(), or as a JSON or Prometheus text file flushed periodically.
+    Hooks are installed by wrapping the methods of the given instances (see `Stats.instrument()`), and locks by
+    wrapping them with the `TimedLock` class. Nothing is wrapped unless the instrumentation is enabled,
+    so the game runs exactly the same code as before when it is disabled.
+"""
+
+import json, os, re, threading, time
+from collections import deque
+
+class LatencyRecorder():
+    '''
+        This class records latency samples (sec), such as the time from a game tick
+        to the corresponding pixels being drawn.
+        The count, mean and maximum cover every sample, while the percentiles are
+        computed from a bounded window of the most recent samples.
+    '''
+    def __init__(self, window: int = 10000):
+        """
+            This initializer sets the number of recent samples kept for the percentiles.
+        """
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen = window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __getstate__(self) -> dict:
+        """
+            This method returns the state of the recorder without its lock (i.e. to pickle or copy it).
+        """
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+            This method restores the state of a recorder with a new lock.
+        """
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """
+            This method adds a latency sample (sec).
+        """
+        with self.lock:
+            self.samples.append(latency)
+            self.count += 1
+            self.total += latency
+            self.max = max(self.max, latency)
+
+    def percentile(self, fraction: float) -> float:
+        """
+            This method returns the given percentile (i.e. 0.5 for the median)
+            of the recent samples, or 0 if there are none.
+        """
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> dict:
+        """
+            This method returns the count, and the mean, median, 99th percentile
+            and maximum latencies in milliseconds.
+        """
+        return {
+            "count": self.count,
+            "mean ms": 1000 * self.total / max(1, self.count),
+            "p50 ms": 1000 * self.percentile(0.50),
+            "p99 ms": 1000 * self.percentile(0.99),
+            "max ms": 1000 * self.max,
+        }
+
+class Histogram():
+    '''
+        This class implements an HDR-style histogram of non-negative integer values (e.g. nanoseconds).
+        Values below 2 ** subBucketBits are counted exactly, and larger values in buckets whose
+        width doubles every 2 ** (subBucketBits - 1) buckets (i.e. a relative error below 2 % by default).
+        Each value is scaled by scale when reported (e.g. 1e-9 for nanoseconds in seconds).
+        It is meant to be recorded by a single thread (concurrent writers may rarely lose a count).
+    '''
+    def __init__(self, scale: float = 1.0, subBucketBits: int = 7, maxExponent: int = 40):
+        self.scale = scale
+        self.subBucketBits = subBucketBits
+        self.halfSubBuckets = 1 << (subBucketBits - 1)
+        self.counts = [0] * ((maxExponent + 2) * self.halfSubBuckets)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """
+            This method adds a value in O(1).
+        """
+        exponent = value.bit_length() - self.subBucketBits
+        if exponent <= 0:
+            index = value
+        else:
+            index = (exponent + 1) * self.halfSubBuckets + (value >> exponent) - self.halfSubBuckets
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def valueAt(self, index: int) -> int:
+        """
+            This method returns the lowest value counted in the bucket at the given index.
+        """
+        if index < 2 * self.halfSubBuckets:
+            return index
+        exponent = index // self.halfSubBuckets - 1
+        return (index - exponent * self.halfSubBuckets) << exponent
+
+    def percentile(self, fraction: float) -> float:
+        """
+            This method returns the given percentile (i.e. 0.5 for the median) of the
+            recorded values (scaled), or 0 if there are none.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.valueAt(index), self.max) * self.scale
+        return self.max * self.scale
+
+    def summary(self) -> dict:
+        """
+            This method returns the count, and the mean, median, 90th, 99th and 99.9th percentiles
+            and maximum of the recorded values (scaled).
+        """
+        return {
+            "count": self.count,
+            "mean": self.scale * self.total / max(1, self.count),
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+            "p999": self.percentile(0.999),
+            "max": self.scale * self.max,
+        }
+
+class TimedLock():
+    '''
+        This class wraps a lock (or semaphore) to record the time waited to acquire it,
+        and the time it was held, in the "lock wait" and "lock hold" histograms of the given name.
+    '''
+    def __init__(self, lock, stats, name: str):
+        self.lock = lock
+        self.wait = stats.histogram(f"lock wait {name}", 1e-9)
+        self.hold = stats.histogram(f"lock hold {name}", 1e-9)
+        self.acquiredAt = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        """
+            This method acquires the wrapped lock, recording the time waited.
+        """
+        start = time.perf_counter_ns()
+        acquired = self.lock.acquire(blocking, timeout)
+        if acquired:
+            self.acquiredAt = time.perf_counter_ns()
+            self.wait.record(self.acquiredAt - start)
+        return acquired
+
+    def release(self) -> None:
+        """
+            This method releases the wrapped lock, recording the time it was held.
+        """
+        self.hold.record(time.perf_counter_ns() - self.acquiredAt)
+        self.lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exception) -> None:
+        self.release()
+
+class Stats():
+    '''
+        This class implements the in-process stats of a running game : named histograms
+        recorded by the hooks, and named gauges (i.e. callables read when the stats are read).
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.gauges = {}
+        self.flusher = None
+
+    def histogram(self, name: str, scale: float = 1.0) -> Histogram:
+        """
+            This method returns the histogram of the given name, creating it if needed.
+        """
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(scale)
+            return self.histograms[name]
+
+    def gauge(self, name: str, read) -> None:
+        """
+            This method adds a gauge whose value is returned by read() when the stats are read.
+        """
+        with self.lock:
+            self.gauges[name] = read
+
+    def timed(self, name: str, function, before = None):
+        """
+            This method returns a wrapper of the function recording its duration (sec) in the named histogram.
+            If given, before() is called ahead of each call (e.g. to record a queue backlog).
+        """
+        histogram = self.histogram(name, 1e-9)
+        def wrapper(*args, **kwargs):
+            if before is not None:
+                before()
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter_ns() - start)
+        return wrapper
+
+    def instrument(self, instance, methodNames, prefix: str = "", before = None) -> None:
+        """
+            This method installs timing hooks on the given methods of an instance only
+            (i.e. the class and its other instances are untouched). Since the methods are looked up
+            on the instance, the calls made by its other methods are timed as well.
+        """
+        for methodName in methodNames:
+            setattr(instance, methodName, self.timed(prefix + methodName, getattr(instance, methodName), before))
+
+    def sample(self, name: str, read):
+        """
+            This method returns a callable recording read() in the named histogram (e.g. as the before hook of instrument()).
+        """
+        histogram = self.histogram(name)
+        return lambda: histogram.record(read())
+
+    def snapshot(self) -> dict:
+        """
+            This method returns the current histogram summaries and gauge values.
+        """
+        with self.lock:
+            histograms, gauges = dict(self.histograms), dict(self.gauges)
+        return {
+            "time": time.time(),
+            "histograms": {name: histogram.summary() for name, histogram in histograms.items()},
+            "gauges": {name: read() for name, read in gauges.items()},
+        }
+
+    def toPrometheus(self) -> str:
+        """
+            This method returns the current stats in the Prometheus text format (i.e. histograms as summaries,
+            with the durations in seconds).
+        """
+        def metricName(name: str) -> str:
+            return "snake_" + re.sub(r"[^a-zA-Z0-9_]", "_", name.lower())
+
+        snapshot = self.snapshot()
+        lines = []
+        for name, summary in snapshot["histograms"].items():
+            metric = metricName(name)
+            if self.histograms[name].scale == 1e-9: # Durations
+                metric += "_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99"), ("0.999", "p999")):
+                lines.append(f'{metric}{{quantile="{quantile}"}} {summary[key]:.9g}')
+            lines.append(f"{metric}_sum {summary['mean'] * summary['count']:.9g}")
+            lines.append(f"{metric}_count {summary['count']}")
+        for name, value in snapshot["gauges"].items():
+            metric = metricName(name)
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value:.9g}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self, path: str) -> None:
+        """
+            This method writes the current stats to the file, in the Prometheus text format if its
+            extension is .prom (JSON otherwise). The file is replaced atomically, so readers never see a partial one.
+        """
+        if path.endswith(".prom"):
+            text = self.toPrometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent = 2)
+        temporaryPath = path + ".tmp"
+        with open(temporaryPath, "w") as file:
+            file.write(text)
+        os.replace(temporaryPath, path)
+
+    def startFlushing(self, path: str, period: float = 1.0) -> None:
+        """
+            This method flushes the stats to the file every period (sec) from a daemon thread.
+        """
+        def flushLoop() -> None:
+            while True:
+                time.sleep(period)
+                self.flush(path)
+        self.flusher = threading.Thread(target = flushLoop, daemon = True)
+        self.flusher.start()
+
+def instrumentGame(stats: Stats, game) -> None:
+    """
+        This function installs the timing hooks of the engine on a game (i.e. before its superloop starts),
+        and adds the gauges of its ticks and of the ticks skipped by its scheduler (i.e. frames dropped by the game).
+    """
+    stats.instrument(game, ("move", "calculateNewCoordinates", "isGameOver", "createNewPrey"), "game ")
+    stats.gauge("ticks", lambda: game.ticks)
+    stats.gauge("ticks skipped", lambda: game.scheduler.skipped if game.scheduler is not None else 0)
@@ -4,39 +4,102 @@
 """
     This program implements a variety of the snake
     game (https://en.wikipedia.org/wiki/Snake_(video_game_genre))
+
+    Usage : python original.py [--poll] [--mailbox] [--prey N] [--world COLUMNSxROWS] [--stats FILE] [--seed N] [--record FILE]
+                             [--save FILE] [--resume FILE] [--autopilot] [--broadcast ADDRESS] [--freeze]
+
+    The queue handler is woken up by the game thread as soon as a task is added to the queue, instead of polling
+    the queue every 100 ms : the game thread only sets an event, which the Tk main loop checks every WAKEUP_CHECK ms
+    (i.e. the game thread never calls into Tk, which is not thread-safe and would block it while the gui redraws).
+    Wakeups are coalesced, so the queue is handled once no matter how many tasks are produced before
+    the main loop checks. The --poll option restores the polling design for comparison.
+    In both cases, the latency from each "move" task to the redrawn canvas is printed on exit.
+
+    The --mailbox option replaces the unbounded `gameQueue` with a `Mailbox`, which coalesces tasks by type
+    (i.e. only the latest "score" is kept) so that a stalled Tk main loop does not replay every stale frame.
+
+    The --prey option places N prey on the board at once. Only the canvas items of the prey
+    which were added or captured are created or deleted.
+
+    The --world option plays on a board of the given number of cells (e.g. 10000x10000), shown through a
+    WINDOW_WIDTH x WINDOW_HEIGHT viewport which follows the head (see `viewport.py`).
+    Only the runs of the body and the prey within the viewport are sent to the canvas.
+
+    The --stats option instruments the game and the queue handler (see `instrumentation.py`), and flushes
+    their timings, the queue backlog and the frames dropped to the file every second (as Prometheus text if it ends with .prom).
+
+    The --record option records the game into a replay file (see `replay.py`), which can be replayed with python replay.py FILE.
+    The seed of the game is printed on exit, and can be given back with the --seed option.
+
+    Pressing "s" saves the game in progress to the --save file (snake.save by default) at the end of the next tick
+    (see `Checkpoint` in `engine.py`), and the --resume option plays a saved game from where it was saved.
+
+    The --autopilot option steers the snake towards the prey (see `autopilot.py`), within a quarter of each tick.
+    The arrow keys still steer it, and its planning time per tick is printed on exit.
+
+    The --broadcast option streams the game to local spectators on a Unix socket (unix:PATH) or a loopback TCP port
+    (127.0.0.1:PORT), e.g. python broadcast.py ADDRESS (see `broadcast.py`).
+
+    The --freeze option moves every object allocated at startup (e.g. the board indices of a large --world)
+    out of the collections of the garbage collector while the game runs, so that they do not pause the game thread.
 """
 
-import threading
+import threading, time
 import queue        #the thread-safe queue from Python standard library
+from collections import deque
 
 from tkinter import Tk, Canvas, Button
-import random, time
+
+from autopilot import Autopilot
+from broadcast import Broadcaster
+from engine import WINDOW_WIDTH, WINDOW_HEIGHT, SNAKE_ICON_WIDTH, Checkpoint, Game, PolylineBuffer, SnakeBuffer
+from instrumentation import LatencyRecorder, Stats, instrumentGame
+from replay import Recorder
+from viewport import Camera, TileIndex, CulledSnakeBuffer
+
+BACKGROUND_COLOUR = "black"   #you may change this colour if you wish
+ICON_COLOUR = "blue"        #you may change this colour if you wish
+WAKEUP_CHECK = 5     #interval (ms) at which the Tk main loop checks for tasks added by the game thread
+ARENA_COLOURS = ("green", "yellow", "orange", "red", "purple", "cyan", "white", "pink")   #colours of the bots of an arena
 
 class Gui():
     """
         This class takes care of the game's graphic user interface (gui)
         creation and termination.
     """
-    def __init__(self):
+    def __init__(self, game: Game, viewport: tuple = None):
         """
             The initializer instantiates the main window and
-            creates the starting icons for the snake and the prey,
-            and displays the initial gamer score.
+            creates the starting icon for the snake (the prey icons are
+            created as the prey are added), and displays the initial gamer score.
+            The canvas is sized after the board of the given game, unless a smaller
+            viewport (width, height) is given. In that case, a camera follows the head
+            and only the body and prey within the viewport are drawn.
         """
         #some GUI constants
         scoreTextXLocation = 60
         scoreTextYLocation = 15
         textColour = "white"
+        #camera over the board (i.e. None if the whole board is shown)
+        self.camera = None
+        width, height = game.width, game.height
+        if viewport is not None and (viewport[0] < game.width or viewport[1] < game.height):
+            self.camera = Camera(*viewport, game.width, game.height)
+            width, height = self.camera.width, self.camera.height
+            self.preyIndex = TileIndex(max(width, height)) # Prey Centres On The Board
+        self.padding = game.snakeIconWidth # Drawn Beyond The Edges Of The Viewport
         #instantiate and create gui
         self.root = Tk()
-        self.canvas = Canvas(self.root, width = WINDOW_WIDTH,
-            height = WINDOW_HEIGHT, bg = BACKGROUND_COLOUR)
+        self.canvas = Canvas(self.root, width = width,
+            height = height, bg = BACKGROUND_COLOUR)
         self.canvas.pack()
-        #create starting game icons for snake and the prey
+        #create starting game icon for snake, and the prey icons by prey coordinates
         self.snakeIcon = self.canvas.create_line(
-            (0, 0), (0, 0), fill=ICON_COLOUR, width=SNAKE_ICON_WIDTH)
-        self.preyIcon = self.canvas.create_rectangle(
-            0, 0, 0, 0, fill=ICON_COLOUR, outline=ICON_COLOUR)
+            (0, 0), (0, 0), fill=ICON_COLOUR, width=game.snakeIconWidth)
+        self.snakeIcons = [self.snakeIcon] # One Per Run Of The Body Within The Viewport
+        self.drawnRuns = 1
+        self.snakeIconWidth = game.snakeIconWidth
+        self.preyIcons = {}
         #display starting score of 0
         self.score = self.canvas.create_text(
             scoreTextXLocation, scoreTextYLocation, fill=textColour,
@@ -45,6 +108,65 @@ class Gui():
         for key in ("Left", "Right", "Up", "Down"):
             self.root.bind(f"<Key-{key}>", game.whenAnArrowKeyIsPressed)
 
+    def addPrey(self, preyCoordinates: tuple) -> None:
+        """
+            This method creates the icon of a new prey
+            (i.e. only if it is within the viewport, if there is a camera).
+        """
+        canvasCoordinates = preyCoordinates
+        if self.camera is not None:
+            x0, y0, x1, y1 = preyCoordinates
+            x, y = (x0 + x1) // 2, (y0 + y1) // 2
+            self.preyIndex.add(preyCoordinates, (x, y))
+            viewX0, viewY0, viewX1, viewY1 = self.camera.view(self.padding)
+            if not (viewX0 <= x <= viewX1 and viewY0 <= y <= viewY1):
+                return
+            canvasCoordinates = self.camera.toCanvas(preyCoordinates)
+        self.preyIcons[preyCoordinates] = self.canvas.create_rectangle(
+            *canvasCoordinates, fill=ICON_COLOUR, outline=ICON_COLOUR)
+
+    def removePrey(self, preyCoordinates: tuple) -> None:
+        """
+            This method deletes the icon of a captured prey.
+        """
+        if self.camera is not None:
+            self.preyIndex.remove(preyCoordinates)
+        preyIcon = self.preyIcons.pop(preyCoordinates, None)
+        if preyIcon is not None:
+            self.canvas.delete(preyIcon)
+
+    def drawView(self, snake: CulledSnakeBuffer) -> None:
+        """
+            This method moves the camera after the head, and redraws the runs of the body within the viewport
+            (i.e. one line icon per run, reusing the icons of the previous frame).
+            The prey icons are only moved, created or deleted if the camera moved.
+        """
+        moved = self.camera.follow(*snake.head())
+        view = self.camera.view(self.padding)
+        runs = snake.visibleRuns(view)
+        for i, run in enumerate(runs):
+            if i == len(self.snakeIcons):
+                self.snakeIcons.append(self.canvas.create_line(
+                    (0, 0), (0, 0), fill=ICON_COLOUR, width=self.snakeIconWidth))
+            if len(run) == 2: # Single Segment
+                run = run * 2
+            self.canvas.coords(self.snakeIcons[i], *self.camera.toCanvas(run))
+        for snakeIcon in self.snakeIcons[len(runs):self.drawnRuns]: # Hide Icons Of Runs Out Of View
+            self.canvas.coords(snakeIcon, 0, 0, 0, 0)
+        self.drawnRuns = len(runs)
+
+        if moved:
+            visible = set(self.preyIndex.query(view))
+            for preyCoordinates in self.preyIcons.keys() - visible:
+                self.canvas.delete(self.preyIcons.pop(preyCoordinates))
+            for preyCoordinates in visible:
+                canvasCoordinates = self.camera.toCanvas(preyCoordinates)
+                if preyCoordinates in self.preyIcons:
+                    self.canvas.coords(self.preyIcons[preyCoordinates], *canvasCoordinates)
+                else:
+                    self.preyIcons[preyCoordinates] = self.canvas.create_rectangle(
+                        *canvasCoordinates, fill=ICON_COLOUR, outline=ICON_COLOUR)
+
     def gameOver(self) -> None:
         """
             This method is used at the end to display a
@@ -55,232 +177,318 @@ class Gui():
             command=self.root.destroy)
         self.canvas.create_window(200, 100, anchor="nw", window=gameOverButton)
 
+class Mailbox():
+    """
+        This class implements a bounded latest-value channel from the game to the gui.
+        It is a drop-in replacement for the `gameQueue` consumed by the queue handler,
+        whose items are (time produced, task) pairs.
+
+        Tasks are coalesced by type : only the latest "score" is kept,
+        and "game_over" is always delivered (last). The "prey" and "captured" tasks are kept
+        as a set delta (i.e. a prey captured before its "prey" task is delivered cancels it). Since "move" tasks are deltas,
+        up to maxMoves of them are kept in order; beyond that they are collapsed into
+        a single "keyframe" of the current body, which the mailbox tracks with its own buffer.
+        The number of tasks dropped or coalesced this way is counted in the coalesced data field.
+    """
+    def __init__(self, maxMoves: int = 64):
+        self.lock = threading.Lock()
+        self.maxMoves = maxMoves
+        self.latest = {} # Latest Item Per Task Type ("score")
+        self.preyChanges = {} # Pending "prey" Or "captured" Item Per Prey Coordinates
+        self.moves = deque() # Pending Move Deltas
+        self.snake = SnakeBuffer()
+        self.keyframeAt = None # Time Produced Of A Pending Keyframe
+        self.gameOver = None
+        self.coalesced = 0
+
+    def put(self, item: tuple) -> None:
+        """
+            This method adds a (time produced, task) item, coalescing it
+            with the pending items of the same type.
+        """
+        producedAt, task = item
+        with self.lock:
+            if "game_over" in task:
+                self.gameOver = item
+            elif self.snake.apply(task):
+                if self.keyframeAt is not None: # Absorbed By The Pending Keyframe
+                    self.coalesced += 1
+                    self.keyframeAt = producedAt
+                elif "keyframe" in task or len(self.moves) >= self.maxMoves:
+                    self.coalesced += len(self.moves)
+                    self.moves.clear()
+                    self.keyframeAt = producedAt
+                else:
+                    self.moves.append(item)
+            elif "prey" in task or "captured" in task:
+                preyCoordinates = task.get("prey", task.get("captured"))
+                if self.preyChanges.pop(preyCoordinates, None) is not None: # Added And Captured Cancel Out
+                    self.coalesced += 2
+                else:
+                    self.preyChanges[preyCoordinates] = item
+            else:
+                key = next(iter(task))
+                if key in self.latest:
+                    self.coalesced += 1
+                self.latest[key] = item
+
+    def get_nowait(self) -> tuple:
+        """
+            This method removes and returns the next (time produced, task) item.
+            It raises the queue.Empty exception if there is none.
+        """
+        with self.lock:
+            if self.latest:
+                return self.latest.pop(next(iter(self.latest)))
+            if self.preyChanges:
+                return self.preyChanges.pop(next(iter(self.preyChanges)))
+            if self.keyframeAt is not None:
+                points = iter(self.snake.points)
+                item = (self.keyframeAt, {"keyframe": tuple(zip(points, points))})
+                self.keyframeAt = None
+                return item
+            if self.moves:
+                return self.moves.popleft()
+            if self.gameOver is not None:
+                item, self.gameOver = self.gameOver, None
+                return item
+        raise queue.Empty
+
+    def task_done(self) -> None:
+        """
+            This method is kept for compatibility with queue.Queue.
+        """
+
+    def qsize(self) -> int:
+        """
+            This method returns the number of pending items.
+        """
+        with self.lock:
+            return (len(self.latest) + len(self.preyChanges) + len(self.moves) + (self.keyframeAt is not None)
+                + (self.gameOver is not None))
+
 class QueueHandler():
     """
         This class implements the queue handler for the game.
     """
-    def __init__(self):
+    def __init__(self, gameQueue, gui: Gui, polling: bool = False):
         self.queue = gameQueue
         self.gui = gui
+        self.polling = polling
+        if gui.camera is not None:
+            self.snake = CulledSnakeBuffer(max(gui.camera.width, gui.camera.height)) # Body Indexed By Tiles
+        else:
+            self.snake = PolylineBuffer() # Corners Rebuilt From Move Deltas
+        self.latency = LatencyRecorder() # Move Task To Redrawn Canvas
+        self.pending = threading.Event() # Coalesces Wakeups
         self.queueHandler()
+        if not polling:
+            self.checkWakeup()
+
+    def put(self, task: dict) -> None:
+        """
+            This method is attached to the game as an observer.
+            It adds the task to the queue along with the time it was produced,
+            and sets the wakeup event checked by the Tk main loop (see checkWakeup()).
+            It may be called from any thread, and never calls into Tk.
+        """
+        self.queue.put((time.perf_counter(), task))
+        if not self.polling:
+            self.pending.set()
+
+    def checkWakeup(self) -> None:
+        """
+            This method runs on the Tk main loop every WAKEUP_CHECK ms, and handles the queue
+            if a task was added since it was last handled.
+        """
+        if self.pending.is_set():
+            self.queueHandler()
+        self.gui.root.after(WAKEUP_CHECK, self.checkWakeup)
 
     def queueHandler(self) -> None:
         '''
             This method handles the queue by constantly retrieving
             tasks from it and accordingly taking the corresponding
             action.
-            A task could be: game_over, move, prey, score.
+            A task could be: game_over, move, keyframe, prey, captured, score.
             Each item in the queue is a dictionary whose key is
             the task type (for example, "move") and its value is
             the corresponding task value.
-            If the queue.empty exception happens, it schedules
-            to call itself after a short delay.
+            The "move" and "keyframe" tasks update the snake buffer,
+            and the snake icon is redrawn once after the queue is drained.
+            If the queue.empty exception happens, it returns until the next task
+            is found by checkWakeup() (or, in the polling design, schedules to call
+            itself after a short delay).
         '''
+        self.pending.clear() # Tasks Added From Now On Wake Up Again
+        movedAt = None
         try:
             while True:
-                task = self.queue.get_nowait()
+                producedAt, task = self.queue.get_nowait()
                 if "game_over" in task:
-                    gui.gameOver()
-                elif "move" in task:
-                    points = [x for point in task["move"] for x in point]
-                    gui.canvas.coords(gui.snakeIcon, *points)
+                    self.gui.gameOver()
+                elif self.snake.apply(task):
+                    movedAt = producedAt
                 elif "prey" in task:
-                    gui.canvas.coords(gui.preyIcon, *task["prey"])
+                    self.gui.addPrey(task["prey"])
+                elif "captured" in task:
+                    self.gui.removePrey(task["captured"])
                 elif "score" in task:
-                    gui.canvas.itemconfigure(
-                        gui.score, text=f"Your Score: {task['score']}")
+                    self.gui.canvas.itemconfigure(
+                        self.gui.score, text=f"Your Score: {task['score']}")
                 self.queue.task_done()
         except queue.Empty:
-            gui.root.after(100, self.queueHandler)
-class Game():
-    '''
-        This class implements most of the game functionalities.
-    '''
-    def __init__(self):
-        """
-           This initializer sets the initial snake coordinate list, movement
-           direction, and arranges for the first prey to be created.
-        """
-        self.queue = gameQueue
-        self.score = 0
-        #starting length and location of the snake
-        #note that it is a list of tuples, each being an
-        # (x, y) tuple. Initially its size is 5 tuples.
-        self.snakeCoordinates = [(495, 55), (485, 55), (475, 55),
-                                 (465, 55), (455, 55)]
-        #initial direction of the snake
-        self.direction = "Left"
-        self.gameNotOver = True
-        self.createNewPrey()
-
-    def superloop(self) -> None:
-        """
-            This method implements a main loop
-            of the game. It constantly generates "move"
-            tasks to cause the constant movement of the snake.
-            Use the SPEED constant to set how often the move tasks
-            are generated.
-        """
-        SPEED = 0.15     #speed of snake updates (sec)
-        while self.gameNotOver:
-            #complete the method implementation below
-            time.sleep(SPEED)
-            self.move()
+            if movedAt is not None:
+                if self.gui.camera is not None:
+                    self.gui.drawView(self.snake)
+                else:
+                    self.gui.canvas.coords(self.gui.snakeIcon, *self.snake.points)
+                self.gui.root.after_idle(self.drawn, movedAt) # Runs After The Canvas Redraw
+            if self.polling:
+                self.gui.root.after(100, self.queueHandler)
 
-    def whenAnArrowKeyIsPressed(self, e) -> None:
-        """
-            This method is bound to the arrow keys
-            and is called when one of those is clicked.
-            It sets the movement direction based on
-            the key that was pressed by the gamer.
-            Use as is.
+    def drawn(self, producedAt: float) -> None:
         """
-        currentDirection = self.direction
-        #ignore invalid keys
-        if (currentDirection == "Left" and e.keysym == "Right" or
-            currentDirection == "Right" and e.keysym == "Left" or
-            currentDirection == "Up" and e.keysym == "Down" or
-            currentDirection == "Down" and e.keysym == "Up"):
-            return
-        self.direction = e.keysym
-
-    def move(self) -> None:
-        """
-            This method implements what is needed to be done
-            for the movement of the snake.
-            It generates a new snake coordinate.
-            If based on this new movement, the prey has been
-            captured, it adds a task to the queue for the updated
-            score and also creates a new prey.
-            It also calls a corresponding method to check if
-            the game should be over.
-            The snake coordinates list (representing its length
-            and position) should be correctly updated.
+            This method records the latency from a "move" task
+            being produced to the canvas being redrawn.
         """
+        self.latency.record(time.perf_counter() - producedAt)
 
-        def isCaptured(snakeCoordinates: tuple, preyCoordinates: list) -> bool:
-            captureCoordinates = (
-                snakeCoordinates[0] - SNAKE_ICON_WIDTH // 2, # x0
-                snakeCoordinates[1] - SNAKE_ICON_WIDTH // 2, # y0
-                snakeCoordinates[0] + SNAKE_ICON_WIDTH // 2, # x1
-                snakeCoordinates[1] + SNAKE_ICON_WIDTH // 2 # y1
-            )
-
-            isCaptured: bool = False
-            # Checks if Snake Coordinates are in Prey Coordinates (instance where Prey could be much larger than Snake)
-            if (captureCoordinates[0] <= preyCoordinates[2] and captureCoordinates[1] <= preyCoordinates[3]) and (captureCoordinates[0] >= preyCoordinates[0] and captureCoordinates[1] >= preyCoordinates[1]): # Snake Point 0 "inside" Prey
-                isCaptured = True
-            elif (captureCoordinates[2] >= preyCoordinates[0] and captureCoordinates[3] >= preyCoordinates[1]) and (captureCoordinates[2] <= preyCoordinates[2] and captureCoordinates[3] <= preyCoordinates[3]): # Snake Point 1 "inside" Prey
-                isCaptured = True
-            # Checks if Prey Coordinates are in Snake Coordinates (instance where Snake could be much larger than Prey)
-            elif (preyCoordinates[2] >= captureCoordinates[0] and preyCoordinates[3] >= captureCoordinates[1]) and (preyCoordinates[2] <= captureCoordinates[2] and preyCoordinates[3] <= captureCoordinates[3]): # Prey Point 0 "inside" Snake
-                isCaptured = True
-            elif (preyCoordinates[0] <= captureCoordinates[2] and preyCoordinates[1] <= captureCoordinates[3]) and (preyCoordinates[0] >= captureCoordinates[0] and preyCoordinates[1] >= captureCoordinates[1]): # Prey Point 1 "inside" Snake
-                isCaptured = True
-            return isCaptured
-
-        NewSnakeCoordinates = self.calculateNewCoordinates()
-        #complete the method implementation below
-
-        if isCaptured(snakeCoordinates = NewSnakeCoordinates, preyCoordinates = gui.canvas.coords(gui.preyIcon)): # Access from GUI:
-            self.snakeCoordinates = [*self.snakeCoordinates, NewSnakeCoordinates] # Append New Snake Head
-
-            self.score += 1
-            gameQueue.put({"score" : self.score})
-            self.createNewPrey()
-        else:
-            self.snakeCoordinates = [*self.snakeCoordinates[1:], NewSnakeCoordinates] # Move Snake
-        self.isGameOver(NewSnakeCoordinates)
-        gameQueue.put({"move" :  self.snakeCoordinates})
-
-    def calculateNewCoordinates(self) -> tuple:
-        """
-            This method calculates and returns the new
-            coordinates to be added to the snake
-            coordinates list based on the movement
-            direction and the current coordinate of
-            head of the snake.
-            It is used by the move() method.
-        """
-        lastX, lastY = self.snakeCoordinates[-1]
-        #complete the method implementation below
-        if self.direction == "Left":
-            lastX -= SNAKE_ICON_WIDTH
-        elif self.direction == "Right":
-            lastX += SNAKE_ICON_WIDTH
-        elif self.direction == "Up":
-            lastY -= SNAKE_ICON_WIDTH
-        else:
-            lastY += SNAKE_ICON_WIDTH
-        return (lastX, lastY)
+class ArenaQueueHandler(QueueHandler):
+    """
+        This class implements the queue handler for an arena of many snakes (see `arena.py`).
+        Each snake is drawn as its own canvas line, and only the lines of the snakes
+        which moved are redrawn once the queue is drained.
+        The score shown is the one of the human snake, if any.
+    """
+    def __init__(self, gameQueue, gui: Gui, humans: int = 0, polling: bool = False):
+        self.humans = humans
+        self.snakes = {} # Body Buffer Per Snake
+        self.snakeIcons = {} # Canvas Line Per Snake
+        super().__init__(gameQueue, gui, polling)
 
-    def isGameOver(self, snakeCoordinates: tuple) -> None:
-        """
-            This method checks if the game is over by
-            checking if now the snake has passed any wall
-            or if it has bit itself.
-            If that is the case, it updates the gameNotOver
-            field and also adds a "game_over" task to the queue.
-        """
-        x, y = snakeCoordinates
-        #complete the method implementation below
+    def queueHandler(self) -> None:
+        '''
+            This method handles the queue like QueueHandler.queueHandler(), routing the tasks of each
+            snake (i.e. with a "snake" id) to its own buffer. The line of a dead snake is deleted.
+        '''
+        self.pending.clear() # Tasks Added From Now On Wake Up Again
+        movedAt = None
+        moved = set()
+        try:
+            while True:
+                producedAt, task = self.queue.get_nowait()
+                snakeId = task.get("snake")
+                if "game_over" in task:
+                    self.gui.gameOver()
+                elif "died" in task:
+                    self.snakes.pop(snakeId, None)
+                    moved.discard(snakeId)
+                    if snakeId in self.snakeIcons:
+                        self.gui.canvas.delete(self.snakeIcons.pop(snakeId))
+                elif "prey" in task:
+                    self.gui.addPrey(task["prey"])
+                elif "captured" in task:
+                    self.gui.removePrey(task["captured"])
+                elif "score" in task:
+                    if snakeId < self.humans:
+                        self.gui.canvas.itemconfigure(
+                            self.gui.score, text=f"Your Score: {task['score']}")
+                elif self.snakes.setdefault(snakeId, PolylineBuffer()).apply(task):
+                    moved.add(snakeId)
+                    movedAt = producedAt
+                self.queue.task_done()
+        except queue.Empty:
+            for snakeId in moved:
+                points = tuple(self.snakes[snakeId].points)
+                if len(points) == 2: # A Line Needs Two Points
+                    points += points
+                if snakeId in self.snakeIcons:
+                    self.gui.canvas.coords(self.snakeIcons[snakeId], *points)
+                else:
+                    colour = ICON_COLOUR if snakeId < self.humans else ARENA_COLOURS[snakeId % len(ARENA_COLOURS)]
+                    self.snakeIcons[snakeId] = self.gui.canvas.create_line(
+                        *points, fill=colour, width=self.gui.snakeIconWidth)
+            if movedAt is not None:
+                self.gui.root.after_idle(self.drawn, movedAt) # Runs After The Canvas Redraw
+            if self.polling:
+                self.gui.root.after(100, self.queueHandler)
 
-        x_collision: bool = (x <= 0) or (x >= WINDOW_WIDTH)
-        y_collision: bool = (y <= 0) or (y >= WINDOW_HEIGHT)
+if __name__ == "__main__":
+    import gc, sys
 
-        if (x_collision) or (y_collision) or ((x, y) in self.snakeCoordinates[:-1]):
-            self.gameNotOver = False
-            gameQueue.put({"game_over" : True})
-        return
+    if "--mailbox" in sys.argv:
+        gameQueue = Mailbox()     #instantiate a coalescing mailbox instead of the queue
+    else:
+        gameQueue = queue.Queue()     #instantiate a queue object using python's queue class
 
-    def createNewPrey(self) -> None:
-        """
-            This methods picks an x and a y randomly as the coordinate
-            of the new prey and uses that to calculate the
-            coordinates (x - 5, y - 5, x + 5, y + 5). [you need to replace 5 with a constant]
-            It then adds a "prey" task to the queue with the calculated
-            rectangle coordinates as its value. This is used by the
-            queue handler to represent the new prey.
-            To make playing the game easier, set the x and y to be THRESHOLD
-            away from the walls.
-        """
-        THRESHOLD = 15
+    preyCount = int(sys.argv[sys.argv.index("--prey") + 1]) if "--prey" in sys.argv else 1
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None
+    if "--resume" in sys.argv:
+        with open(sys.argv[sys.argv.index("--resume") + 1], "rb") as file:
+            game = Game.fromBytes(file.read())        #restore the saved game (i.e. its board, prey and random state)
+    elif "--world" in sys.argv:
+        columns, rows = map(int, sys.argv[sys.argv.index("--world") + 1].split("x"))
+        game = Game(columns * SNAKE_ICON_WIDTH, rows * SNAKE_ICON_WIDTH, seed = seed, preyCount = preyCount)
+    else:
+        game = Game(seed = seed, preyCount = preyCount)        #instantiate the game object
 
-        generatedCoordinates: tuple = (
-            random.randint(THRESHOLD, WINDOW_WIDTH - THRESHOLD),  # Generate X Coordinate Threshold Away From Walls
-            random.randint(THRESHOLD, WINDOW_HEIGHT - THRESHOLD)  # Generate Y Coordinate Threshold Away From Walls
-        )
+    #record the game before any observer can see it move
+    recorder = Recorder(game, sys.argv[sys.argv.index("--record") + 1]) if "--record" in sys.argv else None
 
-        preyCoordinates: tuple = (
-            generatedCoordinates[0] - PREY_ICON_WIDTH // 2, # x0
-            generatedCoordinates[1] - PREY_ICON_WIDTH // 2, # y0
-            generatedCoordinates[0] + PREY_ICON_WIDTH // 2, # x1
-            generatedCoordinates[1] + PREY_ICON_WIDTH // 2 # y1
-        )
+    gui = Gui(game, viewport = (WINDOW_WIDTH, WINDOW_HEIGHT))    #instantiate the game user interface
 
-        gameQueue.put({"prey" : preyCoordinates})
+    queueHandler = QueueHandler(gameQueue, gui, polling = "--poll" in sys.argv)  #instantiate the queue handler
 
-if __name__ == "__main__":
-    #some constants for our GUI
-    WINDOW_WIDTH = 500
-    WINDOW_HEIGHT = 300
-    SNAKE_ICON_WIDTH = 15
-    PREY_ICON_WIDTH = 10
-    #add the specified constant PREY_ICON_WIDTH here
+    game.attach(queueHandler.put)  #the queue observes the game
 
-    BACKGROUND_COLOUR = "black"   #you may change this colour if you wish
-    ICON_COLOUR = "blue"        #you may change this colour if you wish
+    #save the game at the end of the next tick when "s" is pressed
+    savePath = sys.argv[sys.argv.index("--save") + 1] if "--save" in sys.argv else "snake.save"
+    checkpoint = Checkpoint(game)
+    gui.root.bind("<Key-s>", lambda e: checkpoint.request(savePath))
 
-    gameQueue = queue.Queue()     #instantiate a queue object using python's queue class
+    stats = None
+    if "--stats" in sys.argv:
+        statsPath = sys.argv[sys.argv.index("--stats") + 1]
+        stats = Stats()     #hooks are only installed when the stats are requested
+        instrumentGame(stats, game)
+        stats.instrument(queueHandler, ("queueHandler",), "gui ",
+            before = stats.sample("queue backlog", gameQueue.qsize))
+        stats.gauge("tick to pixel p99 s", lambda: queueHandler.latency.percentile(0.99))
+        stats.gauge("key to move p99 s", lambda: game.inputLatency.percentile(0.99))
+        if isinstance(gameQueue, Mailbox):
+            stats.gauge("tasks coalesced", lambda: gameQueue.coalesced)
+        stats.startFlushing(statsPath)
 
-    game = Game()        #instantiate the game object
+    #serve the game to local spectators, which never stall the game thread
+    broadcaster = Broadcaster(game, sys.argv[sys.argv.index("--broadcast") + 1]) if "--broadcast" in sys.argv else None
 
-    gui = Gui()    #instantiate the game user interface
+    #steer the snake on the game thread, at the end of each tick
+    autopilot = Autopilot(game, stats = stats) if "--autopilot" in sys.argv else None
 
-    QueueHandler()  #instantiate the queue handler
+    #keep the garbage collector from traversing the board indices (i.e. pauses of the game on large boards)
+    if "--freeze" in sys.argv:
+        gc.freeze()
 
     #start a thread with the main loop of the game
     threading.Thread(target = game.superloop, daemon=True).start()
 
     #start the GUI's own event loop
-    gui.root.mainloop()
\ No newline at end of file
+    gui.root.mainloop()
+    if "--freeze" in sys.argv:
+        gc.unfreeze()
+
+    print("tick to pixel latency :", queueHandler.latency.summary())
+    print("key to move latency :", game.inputLatency.summary(), "dropped", game.inputsDropped)
+    if isinstance(gameQueue, Mailbox):
+        print("coalesced tasks :", gameQueue.coalesced)
+    if stats is not None:
+        stats.flush(statsPath)
+    if recorder is not None:
+        recorder.close()
+    if autopilot is not None:
+        print("autopilot :", autopilot.metrics())
+    if broadcaster is not None:
+        print("broadcast :", broadcaster.metrics())
+        broadcaster.close()
+    print("seed :", game.seed)
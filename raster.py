@@ -0,0 +1,372 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This program renders games of the headless game engine (see `engine.py`) into NumPy frames, without Tk.
+
+    Usage : python raster.py [--replay FILE [--seek TICK]] [--world COLUMNSxROWS] [--seed N] [--ticks N]
+                             [--png DIRECTORY | --video FILE] [--every N]
+
+    The `Rasterizer` class draws the same scene as the `Gui` class of `original.py` (i.e. the snake line of
+    snakeIconWidth, the prey rectangles and the score) into a reusable (height, width, 3) uint8 frame buffer.
+    It is attached to a game as an observer, and only redraws the rectangles changed by the tasks of each tick
+    (i.e. the squares of the new head and of the dropped tail, the prey captured or placed, and the score).
+    The snake is drawn as the square of each segment, so the ends and turns of its line are square where Tk
+    draws butt ends and round joins.
+
+    The `renderBatch()` function renders every game of a `BatchGame` (see `batch.py`) at once with vectorized
+    operations, one cell per cellSize pixels, for observations of many games (e.g. bot training).
+
+    The `PngWriter` and `VideoWriter` classes stream frames to a sequence of PNG files, or to a single raw RGB
+    (or YUV4MPEG2, with a .y4m extension) video file, with the standard library only.
+    From the command line, a recorded game (see `replay.py`) or a game steered by the autopilot (see `autopilot.py`)
+    is rendered to one of these (e.g. for the review of an incident).
+
+    *Note that this module requires NumPy, unlike the rest of the game.*
+"""
+
+import os, struct, zlib
+from collections import deque
+
+import numpy as np
+
+from engine import SNAKE_ICON_WIDTH
+
+#colours of the Gui class (i.e. BACKGROUND_COLOUR, ICON_COLOUR and its score text in original.py), as RGB
+BACKGROUND_RGB = (0, 0, 0)
+ICON_RGB = (0, 0, 255)
+TEXT_RGB = (255, 255, 255)
+
+#centre of the score text of the Gui class, and the scale of its glyphs
+SCORE_LOCATION = (60, 15)
+TEXT_SCALE = 2
+
+#glyphs of the score text, as rows of 3 pixels
+FONT = {
+    " ": ("000", "000", "000", "000", "000"),
+    ":": ("000", "010", "000", "010", "000"),
+    "Y": ("101", "101", "010", "010", "010"),
+    "S": ("111", "100", "111", "001", "111"),
+    "o": ("000", "111", "101", "101", "111"),
+    "u": ("000", "101", "101", "101", "111"),
+    "r": ("000", "111", "100", "100", "100"),
+    "c": ("000", "111", "100", "100", "111"),
+    "e": ("000", "111", "111", "100", "111"),
+    "0": ("111", "101", "101", "101", "111"),
+    "1": ("010", "110", "010", "010", "111"),
+    "2": ("111", "001", "111", "100", "111"),
+    "3": ("111", "001", "111", "001", "111"),
+    "4": ("101", "101", "111", "001", "001"),
+    "5": ("111", "100", "111", "001", "111"),
+    "6": ("111", "100", "111", "101", "111"),
+    "7": ("111", "001", "001", "001", "001"),
+    "8": ("111", "101", "111", "101", "111"),
+    "9": ("111", "101", "111", "001", "111"),
+}
+
+def textMask(text: str, scale: int = TEXT_SCALE) -> np.ndarray:
+    """
+        This function returns the pixels of a text as a boolean array (i.e. glyphs of FONT, one column apart).
+    """
+    glyphs = [np.array([[pixel == "1" for pixel in row] + [False] for row in FONT[character]])
+              for character in text]
+    mask = np.hstack(glyphs)[:, :-1]
+    return mask.repeat(scale, axis = 0).repeat(scale, axis = 1)
+
+class Rasterizer():
+    '''
+        This class rasterizes the scene of a game into a frame buffer, from the tasks it is sent as an observer.
+        The frame data field is the same array on every tick, so it must be copied to be kept.
+    '''
+    def __init__(self, width: int, height: int, snakeIconWidth: int = SNAKE_ICON_WIDTH, score: bool = True):
+        """
+            This initializer allocates the frame buffer of a board of the given size, and the masks
+            it is redrawn from : the number of snake squares, the prey and the text covering each pixel.
+            Without score, the score text is not drawn.
+        """
+        self.width = width
+        self.height = height
+        self.half = snakeIconWidth // 2
+        self.frame = np.empty((height, width, 3), dtype = np.uint8)
+        self.frame[:] = BACKGROUND_RGB
+        self.cover = np.zeros((height, width), dtype = np.uint8) # Snake Squares Per Pixel
+        self.preyMask = np.zeros((height, width), dtype = bool)
+        self.textMask = np.zeros((height, width), dtype = bool)
+        self.showScore = score
+        self.textRectangle = None
+        self.body = deque() # Tail First, Head Last
+        self.dirty = [] # Rectangles (x0, y0, x1, y1) Redrawn At The End Of The Tick
+        self.frames = 0
+        self.gameOver = False
+        self.onFrame = None # Called With The Frame At The End Of Each Tick
+
+    def clip(self, x0: int, y0: int, x1: int, y1: int) -> tuple:
+        """
+            This method returns the rectangle [x0, x1) x [y0, y1) clipped to the frame, or None if it is outside.
+        """
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(self.width, x1), min(self.height, y1)
+        return (x0, y0, x1, y1) if x0 < x1 and y0 < y1 else None
+
+    def square(self, point: tuple) -> tuple:
+        """
+            This method returns the clipped rectangle of the square of a body segment.
+        """
+        x, y = point
+        return self.clip(x - self.half, y - self.half, x + self.half + 1, y + self.half + 1)
+
+    def __call__(self, task: dict) -> None:
+        """
+            This method is called by the game with every task it produces.
+            The masks are updated as the tasks arrive, and the dirty rectangles are redrawn
+            on the "move" or "keyframe" task ending each tick.
+        """
+        if "move" in task:
+            x, y, dropped = task["move"]
+            self.moveHead((x, y), dropped)
+            self.endTick()
+        elif "keyframe" in task:
+            body = task["keyframe"]
+            dropped = len(body) == len(self.body)
+            if (len(self.body) > 1 and len(body) - len(self.body) in (0, 1) and body[-2] == self.body[-1]
+                    and body[0] == self.body[1 if dropped else 0]): # One Tick Ahead (i.e. The Periodic Keyframe)
+                self.moveHead(body[-1], dropped)
+            elif tuple(self.body) != tuple(body): # Discontinuity (e.g. A State Loaded)
+                for point in self.body:
+                    self.paintSegment(point, -1)
+                self.body = deque(body)
+                for point in self.body:
+                    self.paintSegment(point, 1)
+            self.endTick()
+        elif "prey" in task or "captured" in task:
+            x0, y0, x1, y1 = task.get("prey") or task["captured"]
+            rectangle = self.clip(x0, y0, x1 + 1, y1 + 1) # Outline Included
+            if rectangle is not None:
+                self.preyMask[rectangle[1]:rectangle[3], rectangle[0]:rectangle[2]] = "prey" in task
+                self.dirty.append(rectangle)
+        elif "score" in task:
+            self.setScore(task["score"])
+        elif "game_over" in task:
+            self.gameOver = True
+
+    def moveHead(self, head: tuple, dropped: bool) -> None:
+        """
+            This method adds a new head, and removes the tail if it was dropped.
+        """
+        if dropped:
+            self.paintSegment(self.body.popleft(), -1)
+        self.body.append(head)
+        self.paintSegment(head, 1)
+
+    def paintSegment(self, point: tuple, count: int) -> None:
+        """
+            This method adds (count = 1) or removes (count = -1) the square of a body segment.
+        """
+        rectangle = self.square(point)
+        if rectangle is not None:
+            x0, y0, x1, y1 = rectangle
+            if count > 0:
+                self.cover[y0:y1, x0:x1] += 1
+            else:
+                self.cover[y0:y1, x0:x1] -= 1
+            self.dirty.append(rectangle)
+
+    def setScore(self, score: int) -> None:
+        """
+            This method replaces the score text, centred on SCORE_LOCATION.
+        """
+        if not self.showScore:
+            return
+        if self.textRectangle is not None:
+            x0, y0, x1, y1 = self.textRectangle
+            self.textMask[y0:y1, x0:x1] = False
+            self.dirty.append(self.textRectangle)
+        mask = textMask(f"Your Score: {score}")
+        x0, y0 = SCORE_LOCATION[0] - mask.shape[1] // 2, SCORE_LOCATION[1] - mask.shape[0] // 2
+        self.textRectangle = self.clip(x0, y0, x0 + mask.shape[1], y0 + mask.shape[0])
+        if self.textRectangle is not None:
+            x0c, y0c, x1c, y1c = self.textRectangle
+            self.textMask[y0c:y1c, x0c:x1c] = mask[y0c - y0:y1c - y0, x0c - x0:x1c - x0]
+            self.dirty.append(self.textRectangle)
+
+    def redraw(self, rectangle: tuple) -> None:
+        """
+            This method redraws a rectangle of the frame from the masks (i.e. text over snake over prey).
+        """
+        x0, y0, x1, y1 = rectangle
+        region = self.frame[y0:y1, x0:x1]
+        region[:] = BACKGROUND_RGB
+        region[self.preyMask[y0:y1, x0:x1]] = ICON_RGB
+        region[self.cover[y0:y1, x0:x1] > 0] = ICON_RGB
+        region[self.textMask[y0:y1, x0:x1]] = TEXT_RGB
+
+    def endTick(self) -> None:
+        """
+            This method redraws the dirty rectangles of the tick, and passes the frame to onFrame.
+        """
+        for rectangle in self.dirty:
+            self.redraw(rectangle)
+        self.dirty.clear()
+        self.frames += 1
+        if self.onFrame is not None:
+            self.onFrame(self.frame)
+
+def renderBatch(batch, cellSize: int = 1, out: np.ndarray = None) -> np.ndarray:
+    """
+        This function renders every game of a `BatchGame` into an array of shape
+        (count, rows * cellSize, columns * cellSize, 3) and type uint8, with the colours of the `Gui` class
+        and one cell of the board per cellSize x cellSize pixels (i.e. the segments of the starting body
+        are drawn on their nearest cell). The frames are written into out when it is given (i.e. reused).
+    """
+    count, capacity = batch.count, batch.capacity
+    games = np.arange(count)
+    offsets = np.arange(int(batch.length.max()))
+    segments = (batch.headIndex[:, None] - offsets[None, :]) % capacity
+    valid = offsets[None, :] < batch.length[:, None]
+    points = batch.body[games[:, None], segments][valid] # Every Segment Of Every Game
+    owners = np.broadcast_to(games[:, None], valid.shape)[valid]
+    cells = (points - batch.origin + batch.snakeIconWidth // 2) // batch.snakeIconWidth # Nearest Cell
+    cells[:, 0] = cells[:, 0].clip(0, batch.columns - 1)
+    cells[:, 1] = cells[:, 1].clip(0, batch.rows - 1)
+
+    colours = np.zeros((count, batch.rows, batch.columns), dtype = np.uint8) # 0 : Background, 1 : Icon
+    prey = batch.preyCellCoordinates[batch.preyCell]
+    preyCells = (prey - batch.origin) // batch.snakeIconWidth
+    colours[games, preyCells[:, 1], preyCells[:, 0]] = 1
+    colours[owners, cells[:, 1], cells[:, 0]] = 1
+
+    palette = np.array((BACKGROUND_RGB, ICON_RGB), dtype = np.uint8)
+    shape = (count, batch.rows * cellSize, batch.columns * cellSize, 3)
+    if out is None:
+        out = np.empty(shape, dtype = np.uint8)
+    #each cell is broadcast to its block of pixels, without an upscaled copy of the frames
+    blocks = out.reshape(count, batch.rows, cellSize, batch.columns, cellSize, 3)
+    blocks[...] = palette[colours][:, :, None, :, None, :]
+    return out
+
+def pngBytes(frame: np.ndarray) -> bytes:
+    """
+        This function encodes an RGB frame as a PNG image.
+    """
+    height, width = frame.shape[:2]
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = np.empty((height, width * 3 + 1), dtype = np.uint8)
+    rows[:, 0] = 0 # No Filter
+    rows[:, 1:] = frame.reshape(height, width * 3)
+    return b"".join((b"\x89PNG\r\n\x1a\n",
+                     chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+                     chunk(b"IDAT", zlib.compress(rows.tobytes(), 1)),
+                     chunk(b"IEND", b"")))
+
+class PngWriter():
+    '''
+        This class writes frames to a sequence of numbered PNG files in a directory.
+    '''
+    def __init__(self, directory: str, prefix: str = "frame"):
+        os.makedirs(directory, exist_ok = True)
+        self.directory = directory
+        self.prefix = prefix
+        self.frames = 0
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+            This method writes a frame to the next file of the sequence (e.g. frame_000000.png).
+        """
+        with open(os.path.join(self.directory, f"{self.prefix}_{self.frames:06d}.png"), "wb") as file:
+            file.write(pngBytes(frame))
+        self.frames += 1
+
+    def close(self) -> None:
+        pass
+
+class VideoWriter():
+    '''
+        This class streams frames of a fixed size to a video file : raw RGB frames one after the other
+        (e.g. ffmpeg -f rawvideo -pix_fmt rgb24 -s WIDTHxHEIGHT -r FPS -i FILE video.mp4),
+        or a YUV4MPEG2 stream with 4:4:4 sampling if the file ends in .y4m (i.e. playable as it is).
+    '''
+    def __init__(self, path: str, width: int, height: int, fps: float = 1 / 0.15):
+        self.file = open(path, "wb")
+        self.width = width
+        self.height = height
+        self.y4m = path.endswith(".y4m")
+        self.frames = 0
+        if self.y4m:
+            numerator, denominator = round(fps * 1000), 1000
+            self.file.write(f"YUV4MPEG2 W{width} H{height} F{numerator}:{denominator} Ip A1:1 C444\n".encode())
+            self.planes = np.empty((3, height, width), dtype = np.uint8)
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+            This method appends a frame to the video file.
+        """
+        if self.y4m:
+            rgb = frame.astype(np.int32)
+            red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+            #BT.601 studio range, in fixed point
+            self.planes[0] = (66 * red + 129 * green + 25 * blue + 128 >> 8) + 16
+            self.planes[1] = (-38 * red - 74 * green + 112 * blue + 128 >> 8) + 128
+            self.planes[2] = (112 * red - 94 * green - 18 * blue + 128 >> 8) + 128
+            self.file.write(b"FRAME\n")
+            self.file.write(self.planes.tobytes())
+        else:
+            self.file.write(frame.tobytes())
+        self.frames += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    from engine import Game
+
+    parser = argparse.ArgumentParser(description = "Render a snake game into frames without a display.")
+    parser.add_argument("--replay", default = None, help = "replay file to render (see python original.py --record FILE)")
+    parser.add_argument("--seek", type = int, default = 0, help = "tick of the replay to start from")
+    parser.add_argument("--world", default = None, help = "board size in cells (COLUMNSxROWS) of a game steered by the autopilot")
+    parser.add_argument("--seed", type = int, default = None, help = "seed of a game steered by the autopilot")
+    parser.add_argument("--ticks", type = int, default = 1000, help = "maximum number of ticks rendered")
+    parser.add_argument("--png", default = None, help = "directory to write a PNG file per frame to")
+    parser.add_argument("--video", default = None, help = "raw RGB video file to write the frames to (YUV4MPEG2 if it ends in .y4m)")
+    parser.add_argument("--every", type = int, default = 1, help = "write one frame every N ticks")
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        from replay import Replay
+        replay = Replay(args.replay)
+        games = replay.play(args.seek)
+        game = next(games)
+    else:
+        from autopilot import Autopilot
+        if args.world is not None:
+            columns, rows = map(int, args.world.split("x"))
+            game = Game(columns * SNAKE_ICON_WIDTH, rows * SNAKE_ICON_WIDTH, seed = args.seed)
+        else:
+            game = Game(seed = args.seed)
+        Autopilot(game)
+        def autopilotGames():
+            while game.step():
+                yield game
+        games = autopilotGames()
+
+    rasterizer = Rasterizer(game.width, game.height, game.snakeIconWidth)
+    if args.png is not None:
+        writer = PngWriter(args.png)
+    elif args.video is not None:
+        writer = VideoWriter(args.video, game.width, game.height, 1 / game.speed)
+    else:
+        writer = None
+    def onFrame(frame: np.ndarray) -> None:
+        if writer is not None and (rasterizer.frames - 1) % args.every == 0:
+            writer.write(frame)
+    rasterizer.onFrame = onFrame
+    game.attach(rasterizer)
+
+    for _ in games:
+        if rasterizer.frames >= args.ticks:
+            break
+    if writer is not None:
+        writer.close()
+        print(f"{writer.frames} frames of {game.width}x{game.height} written")
+    print(f"tick {game.ticks}, score {game.score}")
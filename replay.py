@@ -0,0 +1,291 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This program records and replays games of the headless game engine (see `engine.py`).
+
+    Usage : python replay.py FILE [--seek TICK] [--headless]
+
+    Since the game only draws from its own seeded random number generator, a game is fully determined by
+    its seed and the direction of the snake on each tick. The `Recorder` class is attached to a game as an observer
+    and writes a compact binary replay file :
+        - a header with the seed and the options of the game
+        - a record per direction change (i.e. the direction code and the number of ticks since the previous record, as a varint)
+        - a state keyframe every keyframeInterval ticks (i.e. the whole state of the game, including its random number generator,
+          as saved by `Game.saveState()`)
+        - an end record with the final tick, score and length, followed by an index of the keyframes by tick
+    The direction of each tick is taken from the "move" tasks (i.e. the direction the head actually moved in),
+    so a key pressed while a tick is computed is recorded on the tick it applies to.
+
+    The `Replay` class memory-maps a replay file. Seeking to any tick loads the last keyframe before it
+    and re-simulates at most keyframeInterval ticks, instead of replaying the game from the start.
+    Replays run headlessly at the full speed of the engine (--headless), or paced through the `Gui` of `original.py`.
+"""
+
+import mmap, struct, threading
+from bisect import bisect_right
+
+from engine import BOARD_FORMAT, DIRECTIONS, Game
+
+MAGIC = b"SNKR"
+INDEX_MAGIC = b"SNKI"
+VERSION = 2
+KEYFRAME_INTERVAL = 1000     #ticks between state keyframes of a replay file
+
+#the header of a replay file is the board of the game (i.e. BOARD_FORMAT in engine.py), with MAGIC and VERSION
+#footer : index offset, number of keyframes, magic
+FOOTER = struct.Struct("<QI4s")
+KEYFRAME_HEADER = struct.Struct("<II")
+END = struct.Struct("<Iii")
+INDEX_ENTRY = struct.Struct("<IQ")
+
+#record tags (i.e. 0 to 3 are direction changes, by direction code)
+KEYFRAME = 0x10
+FINISH = 0xFF
+
+def directionOf(head: tuple, newHead: tuple) -> str:
+    """
+        This function returns the direction the head moved in.
+    """
+    if newHead[0] < head[0]:
+        return "Left"
+    elif newHead[0] > head[0]:
+        return "Right"
+    elif newHead[1] < head[1]:
+        return "Up"
+    return "Down"
+
+def writeVarint(value: int) -> bytes:
+    """
+        This function encodes a non-negative integer in 7-bit groups (i.e. 1 byte below 128).
+    """
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+class Recorder():
+    '''
+        This class records a game into a replay file.
+        It is attached to the game as an observer, so it runs on the thread playing the game.
+        The file is completed when the game is over, or when close() is called.
+    '''
+    def __init__(self, game: Game, path: str, keyframeInterval: int = KEYFRAME_INTERVAL):
+        """
+            This initializer writes the header of the replay file and attaches the recorder to the game.
+        """
+        self.game = game
+        self.keyframeInterval = keyframeInterval
+        self.lock = threading.Lock() # close() May Be Called From Another Thread
+        self.file = open(path, "wb")
+        self.file.write(BOARD_FORMAT.pack(MAGIC, VERSION, game.width, game.height, game.snakeIconWidth,
+                                    game.preyIconWidth, game.preyCount, game.seed, game.speed, keyframeInterval))
+        self.index = [] # (Tick, Offset) Per Keyframe
+        self.head = None
+        self.direction = None
+        self.lastTick = 0 # Tick Of The Previous Record
+        game.attach(self)
+
+    def __call__(self, task: dict) -> None:
+        """
+            This method is called by the game with every task it produces.
+            On the "move" or "keyframe" task ending each tick, it records the direction
+            the head moved in if it changed, and a state keyframe every keyframeInterval ticks.
+        """
+        if "move" in task:
+            head = task["move"][:2]
+        elif "keyframe" in task:
+            head = task["keyframe"][-1]
+        else:
+            return
+        with self.lock:
+            if self.file is None:
+                return
+            tick = self.game.ticks
+            if self.head is None: # Attached (i.e. Starting State)
+                self.direction = self.game.direction
+            else:
+                direction = directionOf(self.head, head)
+                if direction != self.direction:
+                    self.file.write(bytes((DIRECTIONS.index(direction),)) + writeVarint(tick - self.lastTick))
+                    self.direction = direction
+                    self.lastTick = tick
+            if self.head is None or tick % self.keyframeInterval == 0:
+                state = self.game.saveState(self.direction)
+                self.index.append((tick, self.file.tell()))
+                self.file.write(bytes((KEYFRAME,)) + KEYFRAME_HEADER.pack(tick, len(state)) + state)
+                self.lastTick = tick
+            self.head = head
+            if not self.game.gameNotOver:
+                self.finish()
+
+    def finish(self) -> None:
+        """
+            This method writes the end record, the keyframe index and the footer, and closes the file.
+        """
+        self.file.write(bytes((FINISH,)) + END.pack(self.game.ticks, self.game.score, len(self.game.snakeCoordinates)))
+        indexOffset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.write(FOOTER.pack(indexOffset, len(self.index), INDEX_MAGIC))
+        self.file.close()
+        self.file = None
+
+    def close(self) -> None:
+        """
+            This method completes the replay file of a game which is not over (e.g. the window was closed).
+        """
+        with self.lock:
+            if self.file is not None:
+                self.finish()
+
+class Replay():
+    '''
+        This class reads a replay file through a memory map.
+    '''
+    def __init__(self, path: str):
+        """
+            This initializer maps the file and reads its header, end record and keyframe index.
+        """
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        (magic, version, width, height, snakeIconWidth, preyIconWidth, preyCount, seed, speed,
+         self.keyframeInterval) = BOARD_FORMAT.unpack_from(self.map)
+        indexOffset, keyframes, indexMagic = FOOTER.unpack_from(self.map, len(self.map) - FOOTER.size)
+        if magic != MAGIC or indexMagic != INDEX_MAGIC or version != VERSION:
+            raise ValueError(f"not a complete replay file: {path}")
+        self.gameOptions = {"width": width, "height": height, "snakeIconWidth": snakeIconWidth,
+                            "preyIconWidth": preyIconWidth, "preyCount": preyCount, "seed": seed, "speed": speed}
+        self.keyframeTicks = []
+        self.keyframeOffsets = []
+        for tick, offset in INDEX_ENTRY.iter_unpack(self.map[indexOffset:indexOffset + keyframes * INDEX_ENTRY.size]):
+            self.keyframeTicks.append(tick)
+            self.keyframeOffsets.append(offset)
+        self.ticks, self.score, self.length = END.unpack_from(self.map, indexOffset - END.size)
+
+    def records(self, offset: int, tick: int):
+        """
+            This method yields the (tag, tick, next offset) of the records from the given offset,
+            following the record of the given tick (i.e. the direction code as the tag of a direction change),
+            up to the end record.
+        """
+        data = self.map
+        while True:
+            tag = data[offset]
+            if tag == KEYFRAME:
+                tick, size = KEYFRAME_HEADER.unpack_from(data, offset + 1)
+                offset += 1 + KEYFRAME_HEADER.size + size
+            elif tag == FINISH:
+                tick = END.unpack_from(data, offset + 1)[0]
+                yield tag, tick, offset
+                return
+            else:
+                delta, shift = 0, 0
+                offset += 1
+                while True:
+                    byte = data[offset]
+                    offset += 1
+                    delta |= (byte & 0x7F) << shift
+                    shift += 7
+                    if byte < 0x80:
+                        break
+                tick += delta
+            yield tag, tick, offset
+
+    def keyframeAt(self, tick: int) -> tuple:
+        """
+            This method returns a game restored from the last keyframe at or before the tick,
+            and the offset of the record following that keyframe.
+        """
+        i = max(0, bisect_right(self.keyframeTicks, tick) - 1)
+        offset = self.keyframeOffsets[i]
+        size = KEYFRAME_HEADER.unpack_from(self.map, offset + 1)[1]
+        start = offset + 1 + KEYFRAME_HEADER.size
+        game = Game(**{**self.gameOptions, "preyCount": 0})
+        game.preyCount = self.gameOptions["preyCount"]
+        game.loadState(memoryview(self.map)[start:start + size])
+        return game, start + size
+
+    def play(self, tick: int = 0):
+        """
+            This method yields the game at the given tick (i.e. after one keyframe load and a short re-simulation),
+            then again after each of the following ticks until the end of the replay.
+            The same game instance is yielded every time, so observers may be attached to it.
+        """
+        game, offset = self.keyframeAt(tick)
+        records = self.records(offset, game.ticks)
+        tag, recordTick, offset = next(records)
+        while True:
+            if game.ticks >= tick:
+                yield game
+            while tag == KEYFRAME: # Only Needed For Seeking
+                tag, recordTick, offset = next(records)
+            if tag == FINISH and game.ticks >= recordTick or not game.gameNotOver:
+                return
+            if tag != FINISH and recordTick == game.ticks + 1: # Direction Change On The Next Tick
+                game.direction = DIRECTIONS[tag]
+                tag, recordTick, offset = next(records)
+            game.step()
+
+    def gameAt(self, tick: int) -> Game:
+        """
+            This method returns the game at the given tick.
+        """
+        return next(self.play(tick))
+
+    def run(self) -> Game:
+        """
+            This method replays the whole game from the start at the full speed of the engine,
+            and returns the game at its end.
+        """
+        for game in self.play(0):
+            pass
+        return game
+
+    def close(self) -> None:
+        """
+            This method unmaps the file.
+        """
+        self.map.close()
+
+if __name__ == "__main__":
+    import argparse, time
+
+    parser = argparse.ArgumentParser(description = "Replay a recorded snake game.")
+    parser.add_argument("file", help = "replay file (see python original.py --record FILE)")
+    parser.add_argument("--seek", type = int, default = 0, help = "tick to start from")
+    parser.add_argument("--headless", action = "store_true", help = "replay at full speed without a display")
+    args = parser.parse_args()
+
+    replay = Replay(args.file)
+    if args.headless:
+        start = time.perf_counter()
+        seekStart = time.perf_counter()
+        replay.gameAt(args.seek)
+        seekTime = time.perf_counter() - seekStart
+        game = replay.run()
+        elapsed = time.perf_counter() - start - seekTime
+        print(f"seek to tick {args.seek} : {1000 * seekTime:.2f} ms")
+        print(f"replayed {game.ticks} ticks in {elapsed:.3f} s ({game.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+        print(f"score {game.score}, length {len(game.snakeCoordinates)} (recorded : score {replay.score}, length {replay.length})")
+    else:
+        import queue
+        from engine import WINDOW_WIDTH, WINDOW_HEIGHT, TickScheduler
+        from original import Gui, QueueHandler
+
+        frames = replay.play(args.seek)
+        game = next(frames)
+        gui = Gui(game, viewport = (WINDOW_WIDTH, WINDOW_HEIGHT))
+        for key in ("Left", "Right", "Up", "Down"): # The Replay Steers The Snake
+            gui.root.unbind(f"<Key-{key}>")
+        queueHandler = QueueHandler(queue.Queue(), gui)
+        game.attach(queueHandler.put)
+
+        def pace() -> None:
+            scheduler = TickScheduler(game.speed)
+            for _ in frames:
+                scheduler.wait()
+        threading.Thread(target = pace, daemon = True).start()
+        gui.root.mainloop()
@@ -0,0 +1,135 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This program runs many seeded headless games (see `engine.py`) across all cores.
+
+    Usage : python rollout.py [--games N] [--workers W] [--max-ticks T] [--csv FILE]
+
+    The only concurrency in the `Gui` front-ends is a single daemon thread running `Game.superloop()`,
+    which cannot use more than one core because of the Global Interpreter Lock (GIL).
+    Here, the seeds are split into shards which are played by a pool of worker processes instead.
+
+    The workers do not send the games back to the parent process. Each of them writes the results
+    of its games into a result buffer in shared memory (i.e. a `multiprocessing.Array` inherited by the pool),
+    with one row of (score, length, ticks survived, cause of death) per seed.
+    Only the number of games played is returned through the pool.
+"""
+
+import argparse, multiprocessing, os
+
+from engine import OPPOSITES, ALIVE, WALL, SELF, FULL, Game
+
+#columns of a row of the result buffer
+SCORE = 0
+LENGTH = 1
+TICKS = 2
+CAUSE = 3
+COLUMNS = 4
+
+CAUSES = {ALIVE: "alive", WALL: "wall", SELF: "self", FULL: "full"}
+
+def greedyPolicy(game: Game) -> str:
+    """
+        This function returns the direction which brings the head of the snake closest to the nearest prey,
+        among the directions which do not immediately run into a wall or the body.
+        The tail is considered free since it moves away on the same tick.
+        It is deterministic, so a seed always plays the same game.
+    """
+    headX, headY = game.snakeCoordinates[-1]
+    preyX, preyY = min(game.prey, key = lambda cell: abs(cell[0] - headX) + abs(cell[1] - headY),
+                       default = (headX, headY)) # Prey Are Keyed By Their Centre
+    step = game.snakeIconWidth
+    tail = game.snakeCoordinates[0]
+
+    candidates = []
+    for direction, (dx, dy) in (("Left", (-step, 0)), ("Right", (step, 0)), ("Up", (0, -step)), ("Down", (0, step))):
+        if OPPOSITES[direction] == game.direction:
+            continue
+        x, y = headX + dx, headY + dy
+        safe = (0 < x < game.width) and (0 < y < game.height) and ((x, y) == tail or (x, y) not in game.occupancy)
+        candidates.append((not safe, abs(preyX - x) + abs(preyY - y), direction))
+    return min(candidates)[2]
+
+def initializeWorker(results) -> None:
+    """
+        This function stores the shared result buffer in each worker process of the pool.
+    """
+    global sharedResults
+    sharedResults = results
+
+def runShard(shard: tuple) -> int:
+    """
+        This function plays the games of a shard, given as (first row, seeds, policy, max ticks, game options),
+        and writes one row per seed into the shared result buffer.
+        It returns the number of games played.
+    """
+    firstRow, seeds, policy, maxTicks, gameOptions = shard
+    for row, seed in enumerate(seeds, start = firstRow):
+        game = Game(seed = seed, **gameOptions)
+        while game.ticks < maxTicks and game.step(policy(game)):
+            pass
+        offset = row * COLUMNS
+        sharedResults[offset + SCORE] = game.score
+        sharedResults[offset + LENGTH] = len(game.snakeCoordinates)
+        sharedResults[offset + TICKS] = game.ticks
+        sharedResults[offset + CAUSE] = game.cause
+    return len(seeds)
+
+def rollout(seeds: list, workers: int = None, policy = greedyPolicy, maxTicks: int = 100000,
+            shardSize: int = 64, **gameOptions) -> list:
+    """
+        This function plays one game per seed on a pool of `workers` processes (all cores by default).
+        The policy must be a top-level function (i.e. picklable) returning the direction of each tick.
+        Games still running after `maxTicks` are stopped and reported as alive.
+        It returns the per-seed table as a list of (seed, score, length, ticks, cause) tuples.
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+    results = multiprocessing.Array("q", len(seeds) * COLUMNS, lock = False) # Shared Memory (No Pickling Per Game)
+    shards = [(first, seeds[first:first + shardSize], policy, maxTicks, gameOptions)
+              for first in range(0, len(seeds), shardSize)]
+
+    with multiprocessing.Pool(workers, initializer = initializeWorker, initargs = (results,)) as pool:
+        played = sum(pool.imap_unordered(runShard, shards))
+    assert played == len(seeds)
+
+    return [(seed, *results[row * COLUMNS:(row + 1) * COLUMNS]) for row, seed in enumerate(seeds)]
+
+def summarize(table: list) -> dict:
+    """
+        This function aggregates a per-seed table into the mean and maximum of the
+        score, length and ticks survived, and the number of games per cause of death.
+    """
+    summary = {"games": len(table)}
+    for name, column in (("score", 1), ("length", 2), ("ticks", 3)):
+        values = [row[column] for row in table]
+        summary[f"mean {name}"] = sum(values) / max(1, len(values))
+        summary[f"max {name}"] = max(values, default = 0)
+    for cause, name in CAUSES.items():
+        summary[f"cause {name}"] = sum(1 for row in table if row[4] == cause)
+    return summary
+
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description = "Play many seeded headless snake games on all cores.")
+    parser.add_argument("--games", type = int, default = 1000, help = "number of games (seeds 0 to N - 1)")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes (default: all cores)")
+    parser.add_argument("--max-ticks", type = int, default = 100000, help = "ticks after which a game is stopped")
+    parser.add_argument("--csv", default = None, help = "file to write the per-seed table to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = rollout(range(args.games), args.workers, maxTicks = args.max_ticks)
+    elapsed = time.perf_counter() - start
+
+    for name, value in summarize(table).items():
+        print(f"{name:>14} : {value:g}")
+    print(f"{'ticks/s':>14} : {sum(row[3] for row in table) / elapsed:.0f}")
+
+    if args.csv:
+        with open(args.csv, "w") as file:
+            file.write("seed,score,length,ticks,cause\n")
+            for seed, score, length, ticks, cause in table:
+                file.write(f"{seed},{score},{length},{ticks},{CAUSES[cause]}\n")
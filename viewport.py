@@ -0,0 +1,184 @@
+# Group#: G6
+# Student Names: Muntakim Rahman, Tomaz Zlindra
+
+"""
+    This module implements the viewport culling used by the game front-ends on large boards.
+    It does not depend on Tkinter.
+
+    The `Camera` class follows the head of the snake over the board, and converts board
+    coordinates to canvas coordinates. The `TileIndex` class is a spatial hash of points
+    by square tiles, so that the points within the view are found without scanning the others.
+    The `CulledSnakeBuffer` class rebuilds the body from the "move" and "keyframe" tasks like the
+    `SnakeBuffer` class, and returns only the runs of the body within the view.
+    The cost of drawing a frame then tracks what is on screen, not the length of the snake or the size of the board.
+"""
+
+from engine import SnakeBuffer
+
+class Camera():
+    '''
+        This class implements a viewport of the given size over the board,
+        which follows the head of the snake.
+        The head is kept within the inner box of the viewport (i.e. margin away from its edges),
+        and the viewport never leaves the board.
+    '''
+    def __init__(self, width: int, height: int, boardWidth: int, boardHeight: int, margin: float = 0.3):
+        """
+            This initializer places the viewport at the top left corner of the board.
+        """
+        self.width = min(width, boardWidth)
+        self.height = min(height, boardHeight)
+        self.boardWidth = boardWidth
+        self.boardHeight = boardHeight
+        self.marginX = int(self.width * margin)
+        self.marginY = int(self.height * margin)
+        self.x = 0
+        self.y = 0
+
+    def follow(self, x: int, y: int) -> bool:
+        """
+            This method scrolls the viewport so that (x, y) is within its inner box,
+            and returns whether it moved.
+        """
+        newX = min(max(self.x, x + self.marginX - self.width), x - self.marginX)
+        newY = min(max(self.y, y + self.marginY - self.height), y - self.marginY)
+        newX = min(max(newX, 0), self.boardWidth - self.width) # Clamp To The Board
+        newY = min(max(newY, 0), self.boardHeight - self.height)
+        moved = (newX, newY) != (self.x, self.y)
+        self.x, self.y = newX, newY
+        return moved
+
+    def view(self, padding: int = 0) -> tuple:
+        """
+            This method returns the board rectangle (x0, y0, x1, y1) within the viewport,
+            grown by padding on each side.
+        """
+        return (self.x - padding, self.y - padding, self.x + self.width + padding, self.y + self.height + padding)
+
+    def toCanvas(self, coordinates) -> list:
+        """
+            This method converts flat board coordinates (x0, y0, x1, y1, ...) to canvas coordinates.
+        """
+        canvasCoordinates = list(coordinates)
+        canvasCoordinates[0::2] = [x - self.x for x in canvasCoordinates[0::2]]
+        canvasCoordinates[1::2] = [y - self.y for y in canvasCoordinates[1::2]]
+        return canvasCoordinates
+
+class TileIndex():
+    '''
+        This class implements a spatial hash of keyed points by square tiles of tileSize.
+        Adding or removing a point costs O(1), and querying a rectangle only visits the
+        points of the tiles it overlaps.
+    '''
+    def __init__(self, tileSize: int):
+        self.tileSize = tileSize
+        self.tiles = {} # Keys Per Tile
+        self.points = {} # Point Per Key
+
+    def add(self, key, point: tuple) -> None:
+        """
+            This method adds a point under the given key.
+        """
+        self.points[key] = point
+        tile = (point[0] // self.tileSize, point[1] // self.tileSize)
+        self.tiles.setdefault(tile, set()).add(key)
+
+    def remove(self, key) -> tuple:
+        """
+            This method removes the point under the given key, and returns it.
+        """
+        point = self.points.pop(key)
+        tile = (point[0] // self.tileSize, point[1] // self.tileSize)
+        keys = self.tiles[tile]
+        keys.discard(key)
+        if not keys:
+            del self.tiles[tile]
+        return point
+
+    def clear(self) -> None:
+        """
+            This method removes every point.
+        """
+        self.tiles.clear()
+        self.points.clear()
+
+    def query(self, view: tuple) -> list:
+        """
+            This method returns the keys of the points within the rectangle (x0, y0, x1, y1).
+        """
+        x0, y0, x1, y1 = view
+        keys = []
+        for tileY in range(y0 // self.tileSize, y1 // self.tileSize + 1):
+            for tileX in range(x0 // self.tileSize, x1 // self.tileSize + 1):
+                for key in self.tiles.get((tileX, tileY), ()):
+                    x, y = self.points[key]
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        keys.append(key)
+        return keys
+
+class CulledSnakeBuffer(SnakeBuffer):
+    '''
+        This class rebuilds the body of the snake like the `SnakeBuffer` class, and also indexes
+        each segment by its position along the body (i.e. increasing from the tail to the head) in a `TileIndex`.
+        Applying a "move" task still costs O(1), regardless of the length of the snake, and so does the periodic
+        "keyframe" sent in place of a move (i.e. the body is only rebuilt from a keyframe on a discontinuity).
+    '''
+    def __init__(self, tileSize: int):
+        super().__init__()
+        self.segments = TileIndex(tileSize)
+        self.tail = 0 # Position Of The Tail
+        self.end = 0 # Position After The Head
+
+    def apply(self, task: dict) -> bool:
+        """
+            This method applies a "keyframe" or "move" task to the buffer and its index,
+            and returns whether the task was one of these.
+        """
+        if "move" in task:
+            x, y, dropped = task["move"]
+            if dropped:
+                self.segments.remove(self.tail)
+                self.tail += 1
+            self.segments.add(self.end, (x, y))
+            self.end += 1
+        elif "keyframe" in task:
+            body = task["keyframe"]
+            length = self.end - self.tail
+            dropped = len(body) == length
+            if (length > 1 and len(body) - length in (0, 1) and tuple(body[-2]) == self.segments.points[self.end - 1]
+                    and tuple(body[0]) == self.segments.points[self.tail + 1 if dropped else self.tail]):
+                return self.apply({"move": (*body[-1], dropped)}) # One Tick Ahead (i.e. The Periodic Keyframe)
+            self.segments.clear()
+            self.tail = self.end
+            for point in task["keyframe"]:
+                self.segments.add(self.end, point)
+                self.end += 1
+        return super().apply(task)
+
+    def head(self) -> tuple:
+        """
+            This method returns the (x, y) coordinates of the head.
+        """
+        return self.segments.points[self.end - 1]
+
+    def visibleRuns(self, view: tuple) -> list:
+        """
+            This method returns the runs of consecutive segments within the rectangle (x0, y0, x1, y1),
+            each as flat coordinates (x0, y0, x1, y1, ...) from the tail to the head.
+            Each run is extended by the segment before and after it, so that its line reaches the edge of the view.
+        """
+        points = self.segments.points
+        runs = []
+        previous = None
+        for position in sorted(self.segments.query(view)):
+            if previous is None or position != previous + 1: # Gap (i.e. The Body Left The View)
+                if previous is not None and previous + 1 < self.end:
+                    runs[-1].extend(points[previous + 1])
+                runs.append([])
+                if position > self.tail:
+                    runs[-1].extend(points[position - 1])
+            runs[-1].extend(points[position])
+            previous = position
+        if previous is not None and previous + 1 < self.end:
+            runs[-1].extend(points[previous + 1])
+        return runs